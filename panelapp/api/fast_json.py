@@ -0,0 +1,129 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Fast JSON renderer and parser for the API
+
+Uses orjson if it's installed (`pip install panelapp[fast-json]`, as the
+production and dev images do), otherwise or for anything orjson can't encode,
+falls back to DRF JSON classes.
+Output matches `rest_framework.renderers.JSONRenderer`: datetimes, lazy
+strings and other types are converted by the same encoder. orjson formats
+floats differently (`1e-7` rather than `1e-07`) and writes NaN as null where
+DRF refuses it, so data containing floats or Decimals is rendered by DRF.
+
+Selected by default in `REST_FRAMEWORK` settings, views can opt out with
+`renderer_classes`.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from psycopg2.extras import Range
+from rest_framework import parsers
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class PanelAppJSONEncoder(JSONEncoder):
+    """DRF JSON encoder which also handles PostgreSQL ranges"""
+
+    def default(self, obj):
+        if isinstance(obj, Range):
+            return [obj.lower, obj.upper]
+        return super().default(obj)
+
+
+_encoder = PanelAppJSONEncoder()
+
+
+def _has_floats(data):
+    """Whether the data contains a float or Decimal, which orjson formats differently"""
+
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, (float, Decimal)):
+            return True
+        if isinstance(obj, dict):
+            stack.extend(obj)
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return False
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    encoder_class = PanelAppJSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None
+            or data is None
+            or indent is not None
+            or self.ensure_ascii
+            or not self.compact
+            or _has_floats(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_encoder.default,
+                # same datetime format as DRF, not RFC 3339 with microseconds
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:
+            # e.g. integers larger than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # escaped by DRF as they aren't valid in JavaScript strings
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class FastJSONParser(parsers.JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if encoding.lower().replace("-", "") != "utf8":
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
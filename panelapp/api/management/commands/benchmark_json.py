@@ -0,0 +1,71 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+import time
+
+import djclick as click
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_json import FastJSONRenderer
+from api.fast_json import orjson
+from api.v1.serializers import PanelSerializer
+from panels.models import GenePanelSnapshot
+
+
+def best_time(render, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        content = render(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(content)
+
+
+@click.command()
+@click.option("--panels", default=5, help="Number of the largest panels to encode")
+@click.option("--repeat", default=5, help="Encode each panel this many times")
+def command(panels, repeat):
+    """Compare API JSON encoding time of the largest panels with each renderer."""
+
+    if orjson is None:
+        click.secho("orjson isn't installed, FastJSONRenderer uses DRF encoder", fg="yellow")
+
+    renderers = [JSONRenderer(), FastJSONRenderer()]
+    largest = sorted(
+        GenePanelSnapshot.objects.get_active_annotated(all=True, internal=True),
+        key=lambda panel: panel.stats.get("number_of_genes", 0),
+        reverse=True,
+    )[:panels]
+
+    for panel in largest:
+        data = PanelSerializer(panel, include_entities=True).data
+        timings = [best_time(renderer.render, data, repeat) for renderer in renderers]
+        click.echo(
+            "{} ({} genes, {:.1f} MB): JSONRenderer {:.1f} ms, FastJSONRenderer {:.1f} ms".format(
+                panel.panel.name,
+                panel.stats.get("number_of_genes", 0),
+                timings[0][1] / 1024 / 1024,
+                timings[0][0] * 1000,
+                timings[1][0] * 1000,
+            )
+        )
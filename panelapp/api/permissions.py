@@ -40,3 +40,14 @@ class IsGELReviewer(permissions.BasePermission):
             and hasattr(request.user, "reviewer")
             and request.user.reviewer.is_GEL()
         )
+
+
+class IsVerifiedReviewer(permissions.BasePermission):
+    """Requires user to be an authenticated GEL or verified external reviewer."""
+
+    def has_permission(self, request, view):
+        return (
+            request.user.is_authenticated
+            and hasattr(request.user, "reviewer")
+            and request.user.reviewer.is_verified()
+        )
@@ -21,6 +21,11 @@
 ## specific language governing permissions and limitations
 ## under the License.
 ##
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
 from rest_framework import serializers
 from panels.models import GenePanelSnapshot
 from panels.models import GenePanelEntrySnapshot
@@ -31,6 +36,9 @@ from panels.models import Comment
 from panels.models import Evaluation
 from panels.models import PanelType
 from panels.models import HistoricalSnapshot
+from panels.models import PanelEditSession
+from panels.models import RelatedPanel
+from panels.models import PanelChange
 
 
 class NonEmptyItemsListField(serializers.ListField):
@@ -63,6 +71,93 @@ class EvidenceListField(serializers.ListField):
         return []
 
 
+def compile_field(field):
+    """Function returning the representation of the field for an instance
+
+    Common fields skip DRF field machinery, other fields fall back to
+    `get_attribute` and `to_representation` of the field.
+    """
+
+    if isinstance(field, serializers.ManyRelatedField) and isinstance(
+        field.child_relation, serializers.SlugRelatedField
+    ):
+        getter = attrgetter(field.source)
+        slug_getter = attrgetter(field.child_relation.slug_field)
+
+        def many_slugs(instance):
+            if instance.pk is None:
+                return []
+            return [slug_getter(item) for item in getter(instance).all()]
+
+        return many_slugs
+
+    if isinstance(field, serializers.BaseSerializer) or len(field.source_attrs) != 1:
+        convert = field.to_representation
+
+        def fallback(instance):
+            value = field.get_attribute(instance)
+            return None if value is None else convert(value)
+
+        return fallback
+
+    if isinstance(field, NonEmptyItemsListField):
+        convert = lambda value: [item.strip() for item in value if item]
+    elif isinstance(field, EvidenceListField):
+        convert = lambda value: [e.name for e in value.all()]
+    elif isinstance(field, RangeIntegerField):
+        convert = lambda value: [value.lower, value.upper] if value else None
+    elif isinstance(field, serializers.JSONField) and not field.binary:
+        convert = None
+    elif isinstance(field, serializers.ChoiceField):
+        choices = field.choice_strings_to_values
+        convert = (
+            lambda value: value if value == "" else choices.get(str(value), value)
+        )
+    elif type(field) in (serializers.CharField, serializers.IntegerField):
+        convert = str if isinstance(field, serializers.CharField) else int
+    else:
+        convert = field.to_representation
+
+    getter = attrgetter(field.source)
+
+    def accessor(instance):
+        value = getter(instance)
+        if value is None or convert is None:
+            return value
+        return convert(value)
+
+    return accessor
+
+
+class CompiledSerializer:
+    """Serialises instances with precomputed accessors of the serializer fields
+
+    Produces the same data as `serializer.to_representation`.
+    """
+
+    def __init__(self, serializer):
+        self.accessors = [
+            (name, compile_field(field))
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+
+    def to_representation(self, instance):
+        return {name: accessor(instance) for name, accessor in self.accessors}
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """List serializer using `CompiledSerializer` if API_COMPILED_SERIALIZERS is set"""
+
+    def to_representation(self, data):
+        if not settings.API_COMPILED_SERIALIZERS:
+            return super().to_representation(data)
+
+        compiled = CompiledSerializer(self.child)
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        return [compiled.to_representation(item) for item in iterable]
+
+
 class PanelTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = PanelType
@@ -145,6 +240,42 @@ class PanelSerializer(serializers.ModelSerializer):
             )
 
 
+class EntityPanelSerializer(PanelSerializer):
+    """Panel nested in entities
+
+    Entities often share panels, so each panel version is serialised once
+    per response and kept in the cache for the following responses.
+    """
+
+    def to_representation(self, instance):
+        serialized_panels = self.context.setdefault("serialized_panels", {})
+        if instance.pk in serialized_panels:
+            return serialized_panels[instance.pk]
+
+        cache_key = "api:v1:panel:{}:{}:{}:{}".format(
+            settings.PACKAGE_VERSION,
+            instance.pk,
+            instance.version,
+            instance.revision,
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().to_representation(instance)
+            cache.set(cache_key, data, settings.API_PANEL_CACHE_TIMEOUT)
+
+        serialized_panels[instance.pk] = data
+        return data
+
+
+class PanelSearchSerializer(PanelSerializer):
+    class Meta(PanelSerializer.Meta):
+        fields = PanelSerializer.Meta.fields + ("search_rank",)
+
+    search_rank = serializers.FloatField(
+        read_only=True, help_text="How well the panel matches the query, from 0 to 1"
+    )
+
+
 class GeneData(serializers.JSONField):
     alias_name = serializers.CharField(allow_null=True, allow_blank=True)
     ensembl_genes = serializers.DictField()
@@ -181,6 +312,7 @@ class GeneSerializer(serializers.ModelSerializer):
             "panel",
             "transcript"
         )
+        list_serializer_class = CompiledListSerializer
 
     entity_type = serializers.CharField()
     entity_name = serializers.CharField()
@@ -193,7 +325,9 @@ class GeneSerializer(serializers.ModelSerializer):
     phenotypes = NonEmptyItemsListField()
     evidence = EvidenceListField()
     tags = serializers.SlugRelatedField(many=True, read_only=True, slug_field="name")
-    panel = PanelSerializer(many=False, read_only=True, required=False, allow_null=True)
+    panel = EntityPanelSerializer(
+        many=False, read_only=True, required=False, allow_null=True
+    )
     transcript = NonEmptyItemsListField()
 
     def __init__(self, *args, **kwargs):
@@ -235,6 +369,7 @@ class STRSerializer(GeneSerializer):
             "tags",
             "panel",
         )
+        list_serializer_class = CompiledListSerializer
 
     grch37_coordinates = RangeIntegerField(
         child=serializers.IntegerField(allow_null=False),
@@ -275,6 +410,7 @@ class RegionSerializer(GeneSerializer):
             "tags",
             "panel",
         )
+        list_serializer_class = CompiledListSerializer
 
     grch37_coordinates = RangeIntegerField(
         child=serializers.IntegerField(allow_null=False),
@@ -306,6 +442,29 @@ class ActivitySerializer(serializers.ModelSerializer):
         )
 
 
+class RelatedPanelSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="related_id")
+    name = serializers.CharField(source="related.name")
+
+    class Meta:
+        model = RelatedPanel
+        fields = ("id", "name", "score", "shared_entities", "shared_green_genes")
+
+
+class PanelChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PanelChange
+        fields = (
+            "sequence",
+            "created",
+            "panel_id",
+            "panel_version",
+            "kind",
+            "entity_type",
+            "entity_name",
+        )
+
+
 class CommentSerializer(serializers.ModelSerializer):
     """Serializer for curator review comments."""
 
@@ -376,6 +535,11 @@ class EntitiesListSerializer(serializers.ListSerializer):
             "str": self.str_serializer,
             "region": self.region_serializer,
         }
+        if settings.API_COMPILED_SERIALIZERS:
+            types_to_serializers = {
+                entity_type: CompiledSerializer(serializer)
+                for entity_type, serializer in types_to_serializers.items()
+            }
 
         return [
             types_to_serializers[item.entity_type].to_representation(item)
@@ -397,8 +561,62 @@ class HistoricalSnapshotSerializer(serializers.ModelSerializer):
         )
 
     def to_representation(self, instance):
-        instance.data.pop('genes', None)
-        instance.data.pop('regions', None)
-        instance.data.pop('strs', None)
-        instance.data['signed_off'] = instance.signed_off_date
-        return instance.data
+        if instance.metadata is not None:
+            data = dict(instance.metadata)
+        else:
+            data = HistoricalSnapshot.panel_metadata(instance.data)
+        data['signed_off'] = instance.signed_off_date
+        return data
+
+
+class PanelEditSessionSerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField()
+    expires = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = PanelEditSession
+        fields = (
+            "id",
+            "panel",
+            "user",
+            "created",
+            "modified",
+            "expires",
+            "changes",
+            "version_incremented",
+            "sealed",
+        )
+
+
+class BulkReviewItemSerializer(serializers.Serializer):
+    panel = serializers.IntegerField()
+    entity_type = serializers.ChoiceField(choices=["gene", "str", "region"])
+    entity_name = serializers.CharField(max_length=128)
+    rating = serializers.ChoiceField(
+        choices=Evaluation.RATINGS, required=False, allow_blank=True
+    )
+    moi = serializers.ChoiceField(
+        choices=Evaluation.MODES_OF_INHERITANCE, required=False, allow_blank=True
+    )
+    mode_of_pathogenicity = serializers.ChoiceField(
+        choices=Evaluation.MODES_OF_PATHOGENICITY, required=False, allow_blank=True
+    )
+    phenotypes = serializers.ListField(
+        child=serializers.CharField(), required=False, default=list
+    )
+    publications = serializers.ListField(
+        child=serializers.CharField(), required=False, default=list
+    )
+    current_diagnostic = serializers.BooleanField(required=False, default=False)
+    clinically_relevant = serializers.BooleanField(required=False, default=False)
+    comment = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, data):
+        if not any(
+            data.get(field)
+            for field in ("rating", "moi", "mode_of_pathogenicity", "comment")
+        ):
+            raise serializers.ValidationError(
+                "Provide a rating, mode of inheritance, mode of pathogenicity or comment"
+            )
+        return data
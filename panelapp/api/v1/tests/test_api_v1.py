@@ -21,12 +21,15 @@
 ## specific language governing permissions and limitations
 ## under the License.
 ##
+import json
+import tempfile
 from datetime import datetime
 from django.test import TestCase
 from django.urls import reverse_lazy
 from django.utils import timezone
 from accounts.tests.setup import LoginExternalUser
-from panels.models import GenePanel, HistoricalSnapshot
+from panels.models import GenePanel, GenePanelSnapshot, HistoricalSnapshot
+from panels.tasks import export_panels
 from panels.tests.factories import GenePanelSnapshotFactory
 from panels.tests.factories import GenePanelEntrySnapshotFactory
 from panels.tests.factories import STRFactory
@@ -189,6 +192,29 @@ class TestAPIV1(LoginExternalUser):
         self.assertEqual(r.status_code, 200)
         self.assertTrue(b"Query Error" not in r.content)
 
+    def test_panels_bundle(self):
+        url = reverse_lazy("api:v1:panels-bundle")
+
+        with tempfile.TemporaryDirectory() as media_root:
+            with tempfile.TemporaryDirectory() as private_root:
+                with self.settings(
+                    MEDIA_ROOT=media_root, EXPORTS_PRIVATE_ROOT=private_root
+                ):
+                    self.assertEqual(self.client.get(url).status_code, 404)
+
+                    export_panels()
+                    r = self.client.get(url)
+                    self.assertEqual(r.status_code, 200)
+                    panels = json.loads(b"".join(r.streaming_content))
+                    ids = {panel["id"] for panel in panels}
+                    self.assertIn(self.gps_public.panel.pk, ids)
+                    self.assertNotIn(self.gpes_internal.panel.panel.pk, ids)
+
+                    r = self.client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=r["Last-Modified"]
+                    )
+                    self.assertEqual(r.status_code, 304)
+
     def test_panel_created_timestamp(self):
         self.gpes.panel.increment_version()
         url = reverse_lazy("api:v1:panels-list")
@@ -245,6 +271,77 @@ class TestAPIV1(LoginExternalUser):
         r = self.client.get(multi_genes_url)
         self.assertEqual(r.status_code, 200)
 
+    def test_search_by_gene_cached_panel(self):
+        url = reverse_lazy(
+            "api:v1:genes-detail", args=(self.gpes.gene_core.gene_symbol,)
+        )
+
+        with self.settings(API_PANEL_CACHE_TIMEOUT=60):
+            r = self.client.get(url)
+            self.assertEqual(
+                r.json()["results"][0]["panel"]["stats"]["number_of_genes"], 1
+            )
+
+            revision = GenePanelSnapshot.objects.get(pk=self.gps_public.pk).revision
+            GenePanelEntrySnapshotFactory(panel=self.gps_public)
+            # stored with the panel so other processes see the change
+            self.assertNotEqual(
+                GenePanelSnapshot.objects.get(pk=self.gps_public.pk).revision, revision
+            )
+            r = self.client.get(url)
+            self.assertEqual(
+                r.json()["results"][0]["panel"]["stats"]["number_of_genes"], 2
+            )
+
+    def test_compiled_serializers_parity(self):
+        urls = [
+            reverse_lazy("api:v1:panels-detail", args=(self.gps.panel.pk,)),
+            reverse_lazy("api:v1:panels_genes-list", args=(self.gps.panel.pk,)),
+            reverse_lazy("api:v1:panels-strs-list", args=(self.gps.panel.pk,)),
+            reverse_lazy("api:v1:panels-regions-list", args=(self.gps.panel.pk,)),
+            reverse_lazy("api:v1:genes-list"),
+            reverse_lazy("api:v1:strs-list"),
+            reverse_lazy("api:v1:regions-list"),
+            reverse_lazy("api:v1:entities-list"),
+            reverse_lazy(
+                "api:v1:genes-detail", args=(self.gpes.gene_core.gene_symbol,)
+            ),
+        ]
+
+        for url in urls:
+            with self.settings(API_COMPILED_SERIALIZERS=False):
+                expected = self.client.get(url)
+            with self.settings(API_COMPILED_SERIALIZERS=True):
+                r = self.client.get(url)
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.json(), expected.json())
+
+    def test_search_panels(self):
+        url = reverse_lazy("api:v1:search-list")
+        r = self.client.get("{}?q={}".format(url, self.gps_public.panel.name))
+        self.assertEqual(r.status_code, 200)
+        results = r.json()["results"]
+        self.assertEqual(results[0]["id"], self.gps_public.panel.pk)
+        self.assertEqual(results[0]["search_rank"], 1.0)
+
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["results"], [])
+
+    def test_search_panels_by_entity(self):
+        url = reverse_lazy("api:v1:search-list")
+        gene_symbol = self.gpes.gene_core.gene_symbol
+        r = self.client.get("{}?q={}".format(url, gene_symbol))
+        self.assertEqual(r.status_code, 200)
+        self.assertIn(
+            self.gps_public.panel.pk, [p["id"] for p in r.json()["results"]]
+        )
+
+        r = self.client.get("{}?q={}&entities=false".format(url, gene_symbol))
+        self.assertNotIn(
+            self.gps_public.panel.pk, [p["id"] for p in r.json()["results"]]
+        )
+
     def test_strs_in_panel(self):
         r = self.client.get(
             reverse_lazy("api:v1:panels-detail", args=(self.str.panel.panel.pk,))
@@ -647,6 +744,147 @@ class TestAPIV1(LoginExternalUser):
         assert res.status_code == 200
         assert date.strftime("%Y-%m-%d") in res.json()["signed_off"]
 
+    def test_panel_edit_session(self):
+        url = reverse_lazy("api:v1:panels-edit-session", args=(self.gps.panel.pk,))
+        res = self.client.post(url)
+        self.assertEqual(res.status_code, 403)
+
+        self.client.force_login(self.gel_user)
+        res = self.client.post(url)
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 200)
+
+        self.gps.panel.active_panel.increment_version()
+        self.gps.panel.active_panel.increment_version()
+        self.assertEqual(HistoricalSnapshot.objects.filter(panel=self.gps.panel).count(), 1)
+
+        res = self.client.delete(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["changes"], 2)
+        self.assertIsNotNone(res.json()["sealed"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_compare_panels(self):
+        url = reverse_lazy("api:v1:panels-compare")
+        ids = "{},{}".format(self.gps.panel.pk, self.gps_public.panel.pk)
+
+        res = self.client.get(url, {"panels": ids, "operation": "union"})
+        self.assertEqual(res.status_code, 200)
+        data = res.json()
+        self.assertEqual([p["number_of_entities"] for p in data["panels"]], [6, 1])
+        self.assertEqual(len(data["entities"]), 7)
+        self.assertEqual(data["overlaps"][0]["shared"], 0)
+
+        res = self.client.get(url, {"panels": ids, "entity_type": "str,region"})
+        self.assertEqual(res.json()["entities"], [])
+
+        res = self.client.get(url, {"panels": self.gps.panel.pk, "entity_type": "str"})
+        self.assertEqual(
+            res.json()["entities"],
+            [
+                {
+                    "entity_type": "str",
+                    "entity_name": self.str.name,
+                    "panels": [self.gps.panel.pk],
+                }
+            ],
+        )
+
+        res = self.client.get(url, {"panels": self.gpes_internal.panel.panel.pk})
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_changes(self):
+        url = reverse_lazy("api:v1:changes-list")
+        cursor = self.client.get(url, {"since": "latest"}).json()["cursor"]
+
+        gene_symbol = self.genes[0].gene_core.gene_symbol
+        self.gps.delete_gene(gene_symbol)
+        self.gpes_internal.panel.increment_version()
+
+        res = self.client.get(url, {"since": cursor})
+        self.assertEqual(res.status_code, 200)
+        changes = res.json()["changes"]
+        self.assertEqual(
+            [(c["panel_id"], c["kind"], c["entity_name"]) for c in changes],
+            [
+                (self.gps.panel.pk, "version", ""),
+                (self.gps.panel.pk, "removed", gene_symbol),
+            ],
+        )
+        self.assertEqual(changes[1]["panel_version"], "0.1")
+
+        res = self.client.get(url, {"since": cursor, "limit": 1}).json()
+        self.assertTrue(res["has_more"])
+        self.assertEqual(res["cursor"], changes[0]["sequence"])
+
+        res = self.client.get(url, {"since": res["cursor"], "limit": 1}).json()
+        self.assertFalse(res["has_more"])
+        self.assertEqual(res["changes"], changes[1:])
+
+        res = self.client.get(url, {"since": changes[-1]["sequence"], "wait": 0})
+        self.assertEqual(res.json()["changes"], [])
+        self.assertEqual(res.json()["cursor"], changes[-1]["sequence"])
+        self.assertEqual(self.client.get(url, {"since": "x"}).status_code, 400)
+
+    def test_bulk_reviews(self):
+        url = reverse_lazy("api:v1:reviews-bulk")
+        gene = self.genes[0]
+        gene_symbol = gene.gene_core.gene_symbol
+        reviews = [
+            {
+                "panel": self.gps.panel.pk,
+                "entity_type": "gene",
+                "entity_name": gene_symbol,
+                "rating": "GREEN",
+                "phenotypes": ["Phenotype"],
+                "comment": "Reviewed in batch",
+            },
+            {
+                "panel": self.gps.panel.pk,
+                "entity_type": "str",
+                "entity_name": self.str.name,
+                "rating": "RED",
+            },
+            {
+                "panel": self.gps.panel.pk,
+                "entity_type": "gene",
+                "entity_name": gene_symbol,
+                "rating": "RED",
+            },
+            {"panel": self.gps.panel.pk, "entity_type": "gene", "entity_name": "NONE"},
+            {
+                "panel": self.gps.panel.pk,
+                "entity_type": "region",
+                "entity_name": "missing",
+                "rating": "AMBER",
+            },
+        ]
+        res = self.client.post(url, {"reviews": reviews}, content_type="application/json")
+        self.assertEqual(res.status_code, 403)
+
+        self.client.force_login(self.verified_user)
+        res = self.client.post(url, {"reviews": reviews}, content_type="application/json")
+        self.assertEqual(res.status_code, 200)
+        results = res.json()["results"]
+        self.assertEqual(
+            [r["status"] for r in results],
+            ["created", "created", "error", "error", "error"],
+        )
+
+        evaluation = gene.evaluation.get(user=self.verified_user)
+        self.assertEqual(evaluation.rating, "GREEN")
+        self.assertEqual(evaluation.comments.count(), 1)
+        self.assertEqual(self.str.evaluation.get(user=self.verified_user).rating, "RED")
+
+        res = self.client.post(
+            url, {"reviews": [dict(reviews[0], rating="AMBER")]}, content_type="application/json"
+        )
+        self.assertEqual(res.json()["results"][0]["status"], "updated")
+        self.assertEqual(gene.evaluation.get(user=self.verified_user).rating, "AMBER")
+        self.assertEqual(gene.evaluation.filter(user=self.verified_user).count(), 1)
+
+
 class TestHgncIdQueries(LoginExternalUser):
     """Test that API endpoints accept 'HGNC:{id}' wherever they accept gene symbols."""
 
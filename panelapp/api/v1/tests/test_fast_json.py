@@ -0,0 +1,115 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+import io
+from collections import OrderedDict
+from datetime import date
+from datetime import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from psycopg2.extras import NumericRange
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from rest_framework.exceptions import ParseError
+
+from api.fast_json import FastJSONParser
+from api.fast_json import FastJSONRenderer
+from api.fast_json import PanelAppJSONEncoder
+
+
+class FastJSONTest(SimpleTestCase):
+    data = OrderedDict(
+        [
+            ("name", "Panel   name"),
+            ("version", "1.12"),
+            ("created", datetime(2019, 5, 1, 10, 30, 15, 123456, tzinfo=timezone.utc)),
+            ("signed_off", date(2019, 5, 2)),
+            ("score", Decimal("1.5")),
+            ("label", gettext_lazy("Green")),
+            ("genes", [{"entity_name": "BRCA1", "evidence": ["Expert Review"]}]),
+            ("stats", {1: 2}),
+            ("missing", None),
+        ]
+    )
+
+    def test_renderer_same_output(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_renderer_same_output_without_floats(self):
+        data = OrderedDict((k, v) for k, v in self.data.items() if k != "score")
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renderer_exponent_floats(self):
+        data = {"scores": [1e-07, 2.5e-05, 1.5e16, 1e22], "score": Decimal("1E-7")}
+        expected = JSONRenderer().render(data)
+
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertIn(b"1e-07", expected)
+
+    def test_renderer_nan(self):
+        for value in [float("nan"), float("inf")]:
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({"score": value})
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({"score": value})
+
+    def test_renderer_ranges(self):
+        data = {"grch38_coordinates": NumericRange(10, 20)}
+
+        renderer = JSONRenderer()
+        renderer.encoder_class = PanelAppJSONEncoder
+        expected = renderer.render(data)
+
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        self.assertEqual(expected, b'{"grch38_coordinates":[10,20]}')
+
+    def test_renderer_indent(self):
+        content = FastJSONRenderer().render(
+            self.data, "application/json; indent=4", {}
+        )
+        self.assertEqual(
+            content, JSONRenderer().render(self.data, "application/json; indent=4", {})
+        )
+
+    def test_parser(self):
+        stream = io.BytesIO('{"name": "Panel", "genes": ["BRCA1"]}'.encode())
+        self.assertEqual(
+            FastJSONParser().parse(stream), {"name": "Panel", "genes": ["BRCA1"]}
+        )
+
+    def test_parser_floats(self):
+        content = b'{"scores": [1e-07, 2.5E+16, 1.5]}'
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(content)),
+            JSONParser().parse(io.BytesIO(content)),
+        )
+
+    def test_parser_nan(self):
+        for parser in [JSONParser(), FastJSONParser()]:
+            with self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(b'{"score": NaN}'))
@@ -37,6 +37,9 @@ from .viewsets import RegionSearchViewSet
 from .viewsets import EntitySearchViewSet
 from .viewsets import SignedOffPanelViewSet
 from .viewsets import LiteratureAssignmentViewSet
+from .viewsets import ReviewsViewSet
+from .viewsets import ChangesViewSet
+from .viewsets import SearchViewSet
 
 router = routers.DefaultRouter()
 
@@ -76,11 +79,14 @@ router.register(r"genes", GeneSearchViewSet, base_name="genes")
 router.register(r"strs", STRSearchViewSet, base_name="strs")
 router.register(r"regions", RegionSearchViewSet, base_name="regions")
 router.register(r"entities", EntitySearchViewSet, base_name="entities")
+router.register(r"search", SearchViewSet, base_name="search")
 router.register(
     r"literature-assignments",
     LiteratureAssignmentViewSet,
     base_name="literature-assignments",
 )
+router.register(r"reviews", ReviewsViewSet, base_name="reviews")
+router.register(r"changes", ChangesViewSet, base_name="changes")
 
 
 app_name = "apiv1"
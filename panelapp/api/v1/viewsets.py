@@ -35,6 +35,7 @@ from rest_framework.response import Response
 from rest_framework import permissions
 
 from api.permissions import IsGELReviewer
+from api.permissions import IsVerifiedReviewer
 from panels.models import Gene
 from panels.models import GenePanelSnapshot
 from panels.models import LiteratureAssignment
@@ -43,20 +44,42 @@ from panels.models import HistoricalSnapshot
 from panels.models import STR
 from panels.models import Region
 from panels.models import Activity
+from panels.models import EntityPanelMembership
+from panels.models import GenePanel
+from panels.models import PanelEditSession
+from panels.models import RelatedPanel
+from panels.models import PanelChange
+from panels.exceptions import IsSuperPanelException
+from panels.bulk_reviews import submit_reviews
+from panels.comparison import ENTITY_TYPES
+from panels.comparison import MAX_PANELS
+from panels.comparison import OPERATIONS
+from panels.comparison import PanelComparison
+from panels import exports
+from panels import point_in_time
+from panels import version_diff
 from django.db.models import Q
 from django.db.models import ObjectDoesNotExist
 from django.utils.functional import cached_property
 from django_filters import rest_framework as filters
 from .serializers import PanelSerializer
+from .serializers import PanelSearchSerializer
 from .serializers import ActivitySerializer
+from .serializers import RelatedPanelSerializer
+from .serializers import PanelChangeSerializer
 from .serializers import GeneSerializer
 from .serializers import STRSerializer
 from .serializers import EvaluationSerializer
 from .serializers import RegionSerializer
 from .serializers import EntitySerializer
 from .serializers import HistoricalSnapshotSerializer
+from .serializers import PanelEditSessionSerializer
+from .serializers import BulkReviewItemSerializer
 from django.http import Http404
+from django.http import StreamingHttpResponse
 from rest_framework.exceptions import APIException
+from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import ValidationError
 from panelapp.settings.base import REST_FRAMEWORK
 
 
@@ -81,7 +104,7 @@ class ReadOnlyListViewset(
     viewsets.mixins.ListModelMixin,
     viewsets.GenericViewSet,
 ):
-    pass
+    use_replica = True
 
 
 CONFIDENCE_CHOICES = ((3, "Green"), (2, "Amber"), (1, "Red"), (0, "No List"))
@@ -148,6 +171,7 @@ class PanelsFilter(filters.FilterSet):
 class PanelsViewSet(ReadOnlyListViewset):
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
     lookup_value_regex = "[^/]+"
+    max_compared_panels = MAX_PANELS
     serializer_class = PanelSerializer
     filter_class = PanelsFilter
 
@@ -241,6 +265,258 @@ class PanelsViewSet(ReadOnlyListViewset):
 
         return Response(ActivitySerializer(activities, many=True).data)
 
+    @action(detail=True)
+    def related(self, request, pk=None):
+        """Panels sharing the most entities with this panel
+
+        Panels are scored by the overlap of their entities weighted by the
+        entity ratings, green genes count the most. Scores are updated in
+        the background after panels change.
+        """
+
+        is_gel = request.user.is_authenticated and request.user.reviewer.is_GEL()
+        panel = GenePanelSnapshot.objects.get_active(
+            all=is_gel, internal=is_gel, name=pk
+        ).first()
+        if not panel:
+            raise Http404
+
+        related = RelatedPanel.objects.for_panel(panel.panel_id, gel_reviewer=is_gel)
+        return Response(RelatedPanelSerializer(related, many=True).data)
+
+    @action(detail=True)
+    def diff(self, request, pk=None):
+        """Changes between two versions of the panel
+
+        Parameters:
+
+        ?from=3.12 - previous version
+        ?to=4.0 - later version, the current version if not set
+
+        Returns panel fields which changed and the entities added, removed
+        and changed, matched by entity type and name.
+        """
+
+        is_gel = request.user.is_authenticated and request.user.reviewer.is_GEL()
+        panel = GenePanelSnapshot.objects.get_active(
+            all=is_gel, internal=is_gel, name=pk
+        ).first()
+        if not panel:
+            raise Http404
+
+        from_version = request.query_params.get("from")
+        if not from_version:
+            raise ValidationError({"from": "Version is required"})
+        to_version = request.query_params.get("to") or panel.version
+
+        try:
+            versions = [
+                version_diff.get_version(panel, version)
+                for version in (from_version, to_version)
+            ]
+        except version_diff.VersionNotFound as e:
+            raise NotFound(f"Version {e} not found")
+
+        return Response(version_diff.diff_versions(*versions))
+
+    @action(detail=False)
+    def bundle(self, request):
+        """All public panels with their entities in one gzipped JSON file
+
+        The file is rebuilt in the background after panels change, its
+        Last-Modified header has the time it was built. Send it back in
+        If-Modified-Since to only download the panels after they changed.
+        """
+
+        storage = exports.get_storage()
+        if not storage.exists(exports.PANELS_JSON):
+            raise NotFound("The panels haven't been exported yet")
+
+        return exports.export_response(
+            request, storage, exports.PANELS_JSON, "panels.json", "application/json"
+        )
+
+    @action(detail=False, url_path="as-of")
+    def as_of(self, request):
+        """Content of panels as they were at a point in time
+
+        Parameters:
+
+        ?date=2020-01-31 - date (end of the day) or datetime, e.g. 2020-01-31T12:00:00Z
+        ?panels=1,2,3 - panel ids
+        ?type=rare-disease-100k - or all panels of these types
+
+        Returns the versions active at that time with their entities, in the
+        same format as the panel endpoint, and the ids of panels which didn't
+        exist yet.
+        """
+
+        timestamp = point_in_time.parse_timestamp(request.query_params.get("date", ""))
+        if timestamp is None:
+            raise ValidationError({"date": "ISO 8601 date or datetime expected"})
+
+        try:
+            panel_ids = [
+                int(pk)
+                for pk in request.query_params.get("panels", "").split(",")
+                if pk.strip()
+            ]
+        except ValueError:
+            raise ValidationError({"panels": "Comma separated panel ids expected"})
+        panel_types = [
+            slug for slug in request.query_params.get("type", "").split(",") if slug
+        ]
+        if not panel_ids and not panel_types:
+            raise ValidationError({"panels": "Panel ids or types are required"})
+
+        is_gel = request.user.is_authenticated and request.user.reviewer.is_GEL()
+        panels = GenePanelSnapshot.objects.get_active(
+            all=is_gel, internal=is_gel, panel_types=panel_types or None
+        )
+        if panel_ids:
+            panels = panels.filter(panel_id__in=panel_ids)
+        # panels with many of the types are listed more than once
+        panels = list({panel.panel_id: panel for panel in panels}.values())
+        missing = [pk for pk in panel_ids if pk not in {p.panel_id for p in panels}]
+        if missing:
+            raise NotFound(f"Panels not found: {', '.join(map(str, missing))}")
+
+        versions, missing = point_in_time.resolve_versions(timestamp, panels)
+        return StreamingHttpResponse(
+            point_in_time.bundle_chunks(timestamp, versions, missing),
+            content_type="application/json",
+        )
+
+    @action(detail=False)
+    def compare(self, request):
+        """Compare the entities of many panels
+
+        Parameters:
+
+        ?panels=1,2,3 - panel ids to compare
+        ?exclude=4 - only entities which aren't in these panels
+        ?operation=intersection - entities in all panels, or `union` for any panel
+        ?entity_type=gene,str,region - entity types to compare, all by default
+
+        Returns the entities with the panels they belong to and the shared
+        entities and Jaccard index of each pair of panels.
+        """
+
+        def ids(param):
+            values = request.query_params.get(param, "")
+            try:
+                return list(
+                    dict.fromkeys(int(value) for value in values.split(",") if value.strip())
+                )
+            except ValueError:
+                raise ValidationError({param: "Comma separated panel ids expected"})
+
+        panel_ids = ids("panels")
+        exclude_ids = ids("exclude")
+        operation = request.query_params.get("operation", "intersection")
+        entity_types = [
+            entity_type
+            for entity_type in request.query_params.get("entity_type", "").split(",")
+            if entity_type
+        ] or list(ENTITY_TYPES)
+
+        if not panel_ids:
+            raise ValidationError({"panels": "At least one panel id is required"})
+        if set(panel_ids) & set(exclude_ids):
+            raise ValidationError(
+                {"exclude": "Panels can't be both compared and excluded"}
+            )
+        if len(panel_ids) + len(exclude_ids) > self.max_compared_panels:
+            raise ValidationError(
+                {"panels": f"At most {self.max_compared_panels} panels can be compared"}
+            )
+        if operation not in OPERATIONS:
+            raise ValidationError({"operation": f"One of {', '.join(OPERATIONS)}"})
+        if set(entity_types) - set(ENTITY_TYPES):
+            raise ValidationError({"entity_type": f"One of {', '.join(ENTITY_TYPES)}"})
+
+        is_gel = request.user.is_authenticated and request.user.reviewer.is_GEL()
+        panels = {
+            panel.panel_id: panel
+            for panel in GenePanelSnapshot.objects.get_active(
+                all=is_gel, internal=is_gel
+            ).filter(panel_id__in=panel_ids + exclude_ids)
+        }
+        missing = [pk for pk in panel_ids + exclude_ids if pk not in panels]
+        if missing:
+            raise NotFound(f"Panels not found: {', '.join(map(str, missing))}")
+
+        comparison = PanelComparison(
+            [panels[pk] for pk in panel_ids + exclude_ids], entity_types
+        )
+        bitset = comparison.select(panel_ids, exclude_ids, operation)
+        counts = comparison.counts()
+
+        return Response(
+            {
+                "operation": operation,
+                "entity_types": entity_types,
+                "panels": [
+                    {
+                        "id": pk,
+                        "name": panels[pk].level4title.name,
+                        "version": panels[pk].version,
+                        "number_of_entities": counts[pk],
+                        "excluded": pk in exclude_ids,
+                    }
+                    for pk in panel_ids + exclude_ids
+                ],
+                "entities": comparison.entities(bitset),
+                "overlaps": comparison.overlaps(),
+            }
+        )
+
+    @action(
+        detail=True,
+        methods=["get", "post", "delete"],
+        url_path="edit-session",
+        permission_classes=[IsGELReviewer],
+    )
+    def edit_session(self, request, pk=None):
+        """Edit session of the panel
+
+        Changes made while a session is open are saved in a single panel version.
+
+        GET - open session, 404 if there is none
+        POST - start a session, or return the open one
+        DELETE - finish the open session and update panel stats and super panels
+        """
+        snapshot = GenePanelSnapshot.objects.get_active(
+            all=True, internal=True, name=pk
+        ).first()
+        if not snapshot:
+            raise Http404
+        panel = snapshot.panel
+
+        if request.method == "POST":
+            try:
+                session, created = PanelEditSession.objects.open(panel, request.user)
+            except IsSuperPanelException:
+                return Response(
+                    {"error": "super_panel", "message": "Super panels can't be edited in a session"},
+                    status=400,
+                )
+            if created:
+                panel.active_panel.add_activity(request.user, "started edit session")
+            return Response(
+                PanelEditSessionSerializer(session).data,
+                status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+            )
+
+        session = PanelEditSession.objects.get_open(panel.pk)
+        if not session:
+            raise Http404
+
+        if request.method == "DELETE":
+            session.seal(user=request.user)
+
+        return Response(PanelEditSessionSerializer(session).data)
+
 
 class ActivityViewSet(viewsets.mixins.ListModelMixin, viewsets.GenericViewSet):
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
@@ -255,6 +531,7 @@ class ActivityViewSet(viewsets.mixins.ListModelMixin, viewsets.GenericViewSet):
 
 class EntityViewSet(viewsets.mixins.ListModelMixin, viewsets.GenericViewSet):
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    use_replica = True
     lookup_field = "entity_name"
     lookup_url_kwarg = "entity_name"
     recent_version_only = False
@@ -546,19 +823,49 @@ class EntitySearch(ReadOnlyListViewset):
 
         return list(all_panels)
 
-    @property
-    def qs_filters(self):
-        filters = {}
-
+    @cached_property
+    def entity_names(self):
         if self.kwargs.get("entity_name"):
-            filters["entity_name__in"] = resolve_gene_identifiers(
-                self.kwargs["entity_name"].split(",")
-            )
+            return resolve_gene_identifiers(self.kwargs["entity_name"].split(","))
         elif self.request.query_params.get("entity_name"):
-            filters["entity_name__in"] = resolve_gene_identifiers(
+            return resolve_gene_identifiers(
                 self.request.query_params["entity_name"].split(",")
             )
 
+    def get_active_entities(self, entity_type, model):
+        """Active entities, looked up in the panel memberships index if the names are known"""
+
+        if not self.entity_names:
+            return model.objects.get_active(pks=self.active_snapshot_ids)
+
+        memberships = EntityPanelMembership.objects.filter(
+            entity_type=entity_type,
+            entity_name__in=self.entity_names,
+            panel_status__in=[GenePanel.STATUS.public, GenePanel.STATUS.promoted],
+        )
+        panel_names = self.request.query_params.get("panel_name", "")
+        if panel_names:
+            memberships = memberships.filter(panel_name__in=panel_names.split(","))
+
+        panel_pks = set()
+        entity_pks = []
+        for panel_pk, entity_pk in memberships.values_list("panel_id", "entity_id"):
+            panel_pks.add(panel_pk)
+            entity_pks.append(entity_pk)
+
+        if not entity_pks:
+            # keep the annotations, the entity filters are applied on top
+            return model.objects.get_active().none()
+
+        return model.objects.get_active(pks=panel_pks).filter(pk__in=entity_pks)
+
+    @property
+    def qs_filters(self):
+        filters = {}
+
+        if self.entity_names:
+            filters["entity_name__in"] = self.entity_names
+
         if self.request.query_params.get("type"):
             filters["panel__panel__types__slug__in"] = self.request.query_params[
                 "type"
@@ -577,11 +884,7 @@ class GeneSearchViewSet(EntitySearch):
     serializer_class = GeneSerializer
 
     def get_queryset(self):
-        filters = {"pks": self.active_snapshot_ids}
-
-        return GenePanelEntrySnapshot.objects.get_active(**filters).filter(
-            **self.qs_filters
-        )
+        return self.get_active_entities("gene", GenePanelEntrySnapshot).filter(**self.qs_filters)
 
     def retrieve(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -594,9 +897,7 @@ class STRSearchViewSet(EntitySearch):
     serializer_class = STRSerializer
 
     def get_queryset(self):
-        filters = {"pks": self.active_snapshot_ids}
-
-        return STR.objects.get_active(**filters).filter(**self.qs_filters)
+        return self.get_active_entities("str", STR).filter(**self.qs_filters)
 
     def retrieve(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -609,9 +910,7 @@ class RegionSearchViewSet(EntitySearch):
     serializer_class = RegionSerializer
 
     def get_queryset(self):
-        filters = {"pks": self.active_snapshot_ids}
-
-        return Region.objects.get_active(**filters).filter(**self.qs_filters)
+        return self.get_active_entities("region", Region).filter(**self.qs_filters)
 
     def retrieve(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -700,11 +999,56 @@ class EntitySearchViewSet(EntitySearch):
         return self.list(request, *args, **kwargs)
 
 
+search_query_param = openapi.Parameter(
+    "q",
+    openapi.IN_QUERY,
+    description="Panel name, disease group, relevant disorder, entity name or phenotype",
+    type=openapi.TYPE_STRING,
+    required=True,
+)
+search_entities_param = openapi.Parameter(
+    "entities",
+    openapi.IN_QUERY,
+    description="Match panels by their genes, STRs and regions. Default: true",
+    type=openapi.TYPE_BOOLEAN,
+    default=True,
+)
+
+
+@method_decorator(
+    name="list",
+    decorator=swagger_auto_schema(
+        manual_parameters=[search_query_param, search_entities_param]
+    ),
+)
+class SearchViewSet(viewsets.mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Search panels
+
+    Results are ranked, the best matches come first.
+    """
+
+    permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    serializer_class = PanelSearchSerializer
+
+    def get_queryset(self):
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            return GenePanelSnapshot.objects.none()
+
+        retired = self.request.query_params.get("retired", False)
+        entities = self.request.query_params.get("entities", "true").lower() != "false"
+        return GenePanelSnapshot.objects.search(query, all=retired, entities=entities)
+
+
 class SignedOffPanelViewSet(ReadOnlyListViewset):
     serializer_class = HistoricalSnapshotSerializer
 
     def get_queryset(self):
-        return HistoricalSnapshot.objects.filter(signed_off_date__isnull=False)
+        qs = HistoricalSnapshot.objects.filter(signed_off_date__isnull=False)
+        if self.action == "list":
+            # listing only needs panel metadata, entities are loaded by retrieve
+            qs = qs.defer("data")
+        return qs
 
     def retrieve(self, request, *args, **kwargs):
         pk = self.kwargs["pk"]
@@ -937,3 +1281,131 @@ class LiteratureAssignmentViewSet(viewsets.ViewSet):
             "skipped_reason": assignment.skipped_reason,
             "updated_at": assignment.updated_at.isoformat(),
         }
+
+
+class ReviewsViewSet(viewsets.ViewSet):
+    """
+    Submit reviews for many genes, STRs and regions in one request.
+    """
+
+    permission_classes = [IsVerifiedReviewer]
+    max_reviews = 500
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Add or update the reviews of the current user.
+
+        Expects `{"reviews": [{"panel": 1, "entity_type": "gene", "entity_name": "BRCA1",
+        "rating": "GREEN", ...}]}` and returns a result for each review in the same order.
+        Invalid reviews are reported and don't prevent the valid ones from being saved.
+        """
+        reviews = request.data.get("reviews")
+        if not isinstance(reviews, list) or not reviews:
+            return Response(
+                {"error": "missing_field", "message": "reviews list is required"},
+                status=400,
+            )
+
+        if len(reviews) > self.max_reviews:
+            return Response(
+                {
+                    "error": "too_many_reviews",
+                    "message": f"At most {self.max_reviews} reviews can be submitted at once",
+                },
+                status=400,
+            )
+
+        results = [None] * len(reviews)
+        valid = []
+        for index, review in enumerate(reviews):
+            serializer = BulkReviewItemSerializer(data=review)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "errors": serializer.errors,
+                }
+
+        if valid:
+            saved = submit_reviews(request.user, [data for _, data in valid])
+            for (index, _), result in zip(valid, saved):
+                result["index"] = index
+                results[index] = result
+
+        return Response({"results": results})
+
+
+class ChangesViewSet(viewsets.ViewSet):
+    """
+    Changes of panels and their entities, oldest first.
+
+    Parameters:
+
+    ?since=123 - only changes after this sequence number, `latest` to start from now
+    ?limit=100 - maximum number of changes returned
+    ?wait=20 - wait up to this many seconds for new changes if there aren't any
+    ?panel=1,2 - only changes of these panels
+
+    Returns `changes` and `cursor`, the sequence number to pass as `since`
+    in the next request. `removed` changes list entities deleted from the
+    panel, other entity changes can be fetched from the panel endpoints.
+    """
+
+    permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    max_limit = 1000
+    max_wait = 30
+
+    def int_param(self, name, default, maximum=None):
+        value = self.request.query_params.get(name)
+        if value in (None, ""):
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ValidationError({name: "Integer expected"})
+        if value < 0:
+            raise ValidationError({name: "Must be positive"})
+        return min(value, maximum) if maximum is not None else value
+
+    def list(self, request):
+        PanelChange.objects.assign_sequences()
+
+        if request.user.is_authenticated and request.user.reviewer.is_GEL():
+            changes = PanelChange.objects.visible_to_gel()
+        else:
+            changes = PanelChange.objects.visible_to_public()
+
+        if request.query_params.get("since") == "latest":
+            since = PanelChange.objects.latest_sequence()
+        else:
+            since = self.int_param("since", 0)
+        limit = max(
+            self.int_param("limit", REST_FRAMEWORK["PAGE_SIZE"], self.max_limit), 1
+        )
+        wait = self.int_param("wait", 0, self.max_wait)
+
+        panels = request.query_params.get("panel")
+        if panels:
+            try:
+                changes = changes.filter(
+                    panel_id__in=[int(pk) for pk in panels.split(",") if pk.strip()]
+                )
+            except ValueError:
+                raise ValidationError({"panel": "Comma separated panel ids expected"})
+
+        changes = changes.filter(sequence__gt=since).order_by("sequence")
+        if wait:
+            PanelChange.objects.wait(changes, wait)
+
+        page = list(changes[: limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        return Response(
+            {
+                "changes": PanelChangeSerializer(page, many=True).data,
+                "cursor": page[-1].sequence if page else since,
+                "has_more": has_more,
+            }
+        )
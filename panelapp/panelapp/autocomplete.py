@@ -29,6 +29,7 @@ from panels.models import Evidence
 from panels.models import Tag
 from panels.models import GenePanelSnapshot
 from panels.models import PanelType
+from panels.search import search_panels
 
 
 class GeneAutocomplete(Select2QuerySetView):
@@ -74,9 +75,7 @@ class SimplePanelsAutocomplete(Select2QuerySetView):
         ).exclude(is_super_panel=True)
 
         if self.q:
-            qs = qs.filter(
-                Q(panel__name__icontains=self.q) | Q(panel__name__icontains=self.q)
-            )
+            qs = search_panels(qs, self.q, entities=False)
 
         return qs
 
@@ -0,0 +1,161 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Route reads of safe views to the read replicas
+
+Views opt in with `replica_view` or a `use_replica = True` class attribute,
+`ReplicaRoutingMiddleware` then sends their GET requests to a replica.
+Everything else, writes and reads in a transaction use the primary.
+Clients which changed data are pinned to the primary for
+`DATABASE_REPLICA_STICKY` seconds so they read their own writes.
+
+Replicas lagging more than `DATABASE_REPLICA_MAX_LAG` seconds, or which
+can't be reached, aren't used until the next check.
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# seconds between replica lag checks in a process
+LAG_CHECK_INTERVAL = 10
+
+LAG_QUERY = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_state = threading.local()
+_lag_checks = {}
+
+
+def replica_view(view):
+    """Mark a view as safe to read from the replicas"""
+
+    view.use_replica = True
+    return view
+
+
+def is_replica_view(view_func):
+    view_class = getattr(view_func, "view_class", None) or getattr(
+        view_func, "cls", None
+    )
+    return getattr(view_func, "use_replica", False) or getattr(
+        view_class, "use_replica", False
+    )
+
+
+def start_request():
+    _state.use_replicas = False
+    _state.wrote = False
+
+
+def read_from_replicas():
+    """Route reads to the replicas until the end of the request"""
+
+    _state.use_replicas = True
+
+
+def wrote_to_primary():
+    """If data was changed since the start of the request"""
+
+    return getattr(_state, "wrote", False)
+
+
+@contextmanager
+def use_replicas():
+    """Read from the replicas in this block"""
+
+    previous = getattr(_state, "use_replicas", False)
+    _state.use_replicas = True
+    try:
+        yield
+    finally:
+        _state.use_replicas = previous
+
+
+def replica_lag(alias):
+    """Replication lag in seconds, None if the replica can't be reached"""
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_QUERY)
+            lag = cursor.fetchone()[0]
+            return float(lag) if lag is not None else None
+    except Exception as e:
+        logger.warning("Read replica %s unavailable: %s", alias, e)
+        return None
+
+
+def replica_status(alias, force=False):
+    """Cached lag of the replica, checked every `LAG_CHECK_INTERVAL` seconds"""
+
+    checked_at, lag = _lag_checks.get(alias, (0, None))
+    if force or time.monotonic() - checked_at > LAG_CHECK_INTERVAL:
+        lag = replica_lag(alias)
+        _lag_checks[alias] = (time.monotonic(), lag)
+    return lag
+
+
+def healthy_replicas():
+    return [
+        alias
+        for alias in settings.DATABASE_REPLICAS
+        if replica_status(alias) is not None
+        and replica_status(alias) <= settings.DATABASE_REPLICA_MAX_LAG
+    ]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, "use_replicas", False) or wrote_to_primary():
+            return None
+
+        # reads in a transaction must see its changes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+
+        replicas = healthy_replicas()
+        if replicas:
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas have the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,4 +1,7 @@
 import zstandard as zstd
+from django.conf import settings
+
+from panelapp import db_routers
 
 
 class ZstdMiddleware:
@@ -41,3 +44,37 @@ class ZstdMiddleware:
             del response["Content-Length"]
 
         return response
+
+
+class ReplicaRoutingMiddleware:
+    """Read from the replicas in safe views, see `panelapp.db_routers`"""
+
+    PRIMARY_COOKIE = "panelapp_primary"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_routers.start_request()
+        try:
+            response = self.get_response(request)
+            if settings.DATABASE_REPLICAS and db_routers.wrote_to_primary():
+                # read own writes until the replicas catch up
+                response.set_cookie(
+                    self.PRIMARY_COOKIE,
+                    "1",
+                    max_age=settings.DATABASE_REPLICA_STICKY,
+                    httponly=True,
+                )
+            return response
+        finally:
+            db_routers.start_request()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in ("GET", "HEAD")
+            and self.PRIMARY_COOKIE not in request.COOKIES
+            and db_routers.is_replica_view(view_func)
+        ):
+            db_routers.read_from_replicas()
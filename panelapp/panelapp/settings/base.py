@@ -36,6 +36,7 @@ https://docs.djangoproject.com/en/1.11/ref/settings/
 import os
 import panelapp
 import dj_database_url
+from celery.schedules import crontab
 import urllib.parse
 from django.contrib.messages import constants as message_constants
 
@@ -87,6 +88,7 @@ DJANGO_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 ]
 
 CUSTOM_APPS = [
@@ -111,6 +113,7 @@ INSTALLED_APPS = DJANGO_APPS + CUSTOM_APPS + PROJECT_APPS
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "panelapp.middleware.ZstdMiddleware",
+    "panelapp.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -160,6 +163,21 @@ DATABASE_URL = os.getenv(
     if DATABASE_USER and DATABASE_PASSWORD and DATABASE_HOST else None )
 DATABASES = {"default": dj_database_url.parse(DATABASE_URL,engine="django.db.backends.postgresql")}
 
+# Read replicas, comma separated database URLs, see panelapp/db_routers.py
+DATABASE_REPLICAS = []
+for i, replica_url in enumerate(
+    url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+):
+    DATABASES["replica_{}".format(i)] = dj_database_url.parse(
+        replica_url.strip(), engine="django.db.backends.postgresql"
+    )
+    DATABASE_REPLICAS.append("replica_{}".format(i))
+DATABASE_ROUTERS = ["panelapp.db_routers.ReplicaRouter"]
+# Replicas lagging more than this number of seconds aren't used
+DATABASE_REPLICA_MAX_LAG = int(os.getenv("DATABASE_REPLICA_MAX_LAG", 30))
+# Seconds clients read from the primary after changing data
+DATABASE_REPLICA_STICKY = int(os.getenv("DATABASE_REPLICA_STICKY", 60))
+
 
 # Admin
 ADMIN_URL = os.getenv("DJANGO_ADMIN_URL", "admin/")
@@ -248,8 +266,12 @@ if HEALTH_ACCESS_TOKEN_LOCATION and os.path.isfile(HEALTH_ACCESS_TOKEN_LOCATION)
 HEALTH_MAINTENANCE_LOCATION = os.getenv("HEALTH_MAINTENANCE_LOCATION", None)
 
 HEALTH_CHECK_SERVICES = os.getenv(
-    "HEALTH_CHECK_SERVICES", "database,rabbitmq,email,celery,maintenance"
+    "HEALTH_CHECK_SERVICES",
+    "database,rabbitmq,email,celery,maintenance"
+    + (",replicas" if DATABASE_REPLICAS else ""),
 ).split(",")
+# Reported in the health check without failing it
+HEALTH_CHECK_NON_CRITICAL = ["replicas"]
 
 # CORS headers support
 CORS_ORIGIN_ALLOW_ALL = True
@@ -258,8 +280,87 @@ CORS_ALLOW_METHODS = ("GET",)
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "pyamqp://localhost:5672/")
 
+CELERY_BEAT_SCHEDULE = {
+    "export-panels": {
+        "task": "panels.tasks.export_panels",
+        "schedule": crontab(
+            hour=int(os.getenv("PANEL_EXPORTS_HOUR", 2)), minute=0
+        ),
+    },
+    "seal-expired-edit-sessions": {
+        "task": "panels.tasks.seal_expired_edit_sessions",
+        "schedule": crontab(minute="*/10"),
+    },
+    "deliver-webhooks": {
+        "task": "panels.tasks.deliver_webhooks",
+        "schedule": crontab(minute="*"),
+    },
+    "update-related-panels": {
+        "task": "panels.tasks.update_related_panels",
+        "schedule": crontab(
+            hour=int(os.getenv("PANEL_EXPORTS_HOUR", 2)), minute=30
+        ),
+    },
+}
+
+# Prebuilt panel downloads, see panels/exports.py
+# Storage class path for the exports, default file storage if not set
+EXPORTS_STORAGE = os.getenv("EXPORTS_STORAGE", None)
+# Storage class path for exports with internal panels and reviewer emails,
+# must not be publicly readable. Saved in EXPORTS_PRIVATE_ROOT if not set
+EXPORTS_PRIVATE_STORAGE = os.getenv("EXPORTS_PRIVATE_STORAGE", None)
+# Directory for private exports, must not be served by the web server
+EXPORTS_PRIVATE_ROOT = os.getenv(
+    "EXPORTS_PRIVATE_ROOT", os.path.join(BASE_DIR, "_privatefiles")
+)
+# Seconds to wait after a panel change before exporting, 0 to disable
+PANEL_EXPORTS_DEBOUNCE = int(os.getenv("PANEL_EXPORTS_DEBOUNCE", 600))
+# Seconds to wait after a panel change before updating related panels, 0 to disable
+RELATED_PANELS_DEBOUNCE = int(os.getenv("RELATED_PANELS_DEBOUNCE", 600))
+# Number of related panels kept for each panel
+RELATED_PANELS_TOP_K = int(os.getenv("RELATED_PANELS_TOP_K", 10))
+
+# Webhooks, see panels/webhooks.py
+# Seconds to batch panel changes before delivering them, 0 to only deliver every minute
+WEBHOOK_DELIVERY_DELAY = int(os.getenv("WEBHOOK_DELIVERY_DELAY", 5))
+# Seconds to wait for subscribers to respond
+WEBHOOK_TIMEOUT = int(os.getenv("WEBHOOK_TIMEOUT", 10))
+# Seconds before retrying a failed delivery, doubled after each failure
+WEBHOOK_BACKOFF = int(os.getenv("WEBHOOK_BACKOFF", 30))
+WEBHOOK_MAX_BACKOFF = int(os.getenv("WEBHOOK_MAX_BACKOFF", 60 * 60))
+# Failures in a row after which a subscription is disabled
+WEBHOOK_MAX_FAILURES = int(os.getenv("WEBHOOK_MAX_FAILURES", 20))
+# Seconds to coalesce child panel changes before updating super panels, 0 to disable
+SUPER_PANEL_UPDATE_DEBOUNCE = int(os.getenv("SUPER_PANEL_UPDATE_DEBOUNCE", 60))
+
+# Milliseconds to wait for concurrent edits of the same panel before retrying
+PANEL_LOCK_TIMEOUT = int(os.getenv("PANEL_LOCK_TIMEOUT", 10000))
+# Number of retries, with exponential backoff, of edits waiting for the panel lock
+PANEL_LOCK_RETRIES = int(os.getenv("PANEL_LOCK_RETRIES", 3))
+
+# Seconds without changes after which panel edit sessions are sealed
+PANEL_EDIT_SESSION_TIMEOUT = int(os.getenv("PANEL_EDIT_SESSION_TIMEOUT", 60 * 60))
+
 PACKAGE_VERSION = panelapp.__version__
 
+# Seconds to keep the entity bitsets of panel versions used in comparisons
+PANEL_COMPARISON_CACHE_TIMEOUT = int(
+    os.getenv("PANEL_COMPARISON_CACHE_TIMEOUT", 60 * 60 * 24)
+)
+# Seconds to keep changes between two panel versions, 0 to disable
+PANEL_DIFF_CACHE_TIMEOUT = int(os.getenv("PANEL_DIFF_CACHE_TIMEOUT", 60 * 60 * 24 * 7))
+# Seconds to keep the content of panel versions requested as of a date, 0 to disable
+PANELS_AS_OF_CACHE_TIMEOUT = int(
+    os.getenv("PANELS_AS_OF_CACHE_TIMEOUT", 60 * 60 * 24 * 7)
+)
+
+# Seconds to keep panels nested in API entities in the cache
+API_PANEL_CACHE_TIMEOUT = int(os.getenv("API_PANEL_CACHE_TIMEOUT", 60 * 60 * 24))
+# Serialise API entities with precomputed field accessors instead of DRF fields
+API_COMPILED_SERIALIZERS = (
+    os.getenv("API_COMPILED_SERIALIZERS", "true").lower() == "true"
+)
+
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
@@ -278,6 +379,15 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.TokenAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.fast_json.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.fast_json.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 SWAGGER_SETTINGS = {
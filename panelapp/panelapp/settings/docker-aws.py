@@ -151,6 +151,9 @@ AWS_S3_REPORTS_OBJECT_PARAMETERS = {'CacheControl': 'max-age=86400'}
 # Files ACL. By default ('private') for report files.
 AWS_REPORTS_DEFAULT_ACL = os.getenv('AWS_REPORTS_DEFAULT_ACL', 'private')
 
+# Exports with internal panels and reviewer emails go to the private reports bucket
+EXPORTS_PRIVATE_STORAGE = os.getenv('EXPORTS_PRIVATE_STORAGE', 's3_storages.ReportsStorage')
+
 # Logging (JSON to stdout)
 
 LOGGING = {
@@ -115,6 +115,8 @@ if USE_S3:  # Static and Media files on S3
 
     AWS_REPORTS_DEFAULT_ACL = 'private'
 
+    EXPORTS_PRIVATE_STORAGE = 's3_storages.ReportsStorage'
+
 else:  # Static and Media files on local file system
 
     STATIC_URL = "/static/"
@@ -44,6 +44,14 @@ CELERY_TASK_PUBLISH_RETRY_POLICY = {"max_retries": 3}
 BROKER_TRANSPORT_OPTIONS = {"socket_timeout": 5}
 CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
 CELERY_BROKER = "pyamqp://localhost:5672/"
+PANEL_EXPORTS_DEBOUNCE = 0
+SUPER_PANEL_UPDATE_DEBOUNCE = 0
+RELATED_PANELS_DEBOUNCE = 0
+WEBHOOK_DELIVERY_DELAY = 0
+API_PANEL_CACHE_TIMEOUT = 0
+PANEL_COMPARISON_CACHE_TIMEOUT = 0
+PANELS_AS_OF_CACHE_TIMEOUT = 0
+PANEL_DIFF_CACHE_TIMEOUT = 0
 
 PASSWORD_HASHERS = ("django.contrib.auth.hashers.MD5PasswordHasher",)
 
@@ -44,58 +44,6 @@ window.Modules = {};
         };
     };
 
-    Modules['filterable-list'] = function() {
-        var that = this;
-        that.start = function(element) {
-
-            var listInput = element.find('.js-filter-list-input'),
-                listCount = element.find('.js-filter-list-count'),
-                filterForm;
-
-            element.on('keyup change', '.js-filter-list-input', filterListBasedOnInput);
-            filterListBasedOnInput();
-
-            filterForm = listInput.parents('form');
-            filterForm.on('submit', openFirstVisibleLink);
-
-            function filterListBasedOnInput() {
-                var searchString = $.trim(listInput.val()),
-                    regExp = new RegExp("^" + escapeStringForRegexp(searchString), 'i'),
-                    rows = element.find('li[data-filtered!="true"]'),
-                    count = 0,
-                    countText;
-
-                rows.each(function() {
-                    var row = $(this);
-                    if (row.data('text').search(regExp) > -1) {
-                        row.removeClass('hide');
-                        count = count + 1;
-                    } else {
-                        row.addClass('hide');
-                    }
-                });
-
-                countText = count == 1 ? listCount.data('singular') : listCount.data('plural');
-                listCount.text(count + ' ' + countText);
-            }
-
-            function openFirstVisibleLink(evt) {
-                evt.preventDefault();
-                var link = element.find('a:visible').first();
-                if (typeof link.attr('href') === "string") {
-                    window.app.redirect(link.attr('href'));
-                }
-            }
-
-            // http://stackoverflow.com/questions/3446170/escape-string-for-use-in-javascript-regex
-            // https://developer.mozilla.org/en/JavaScript/Reference/Global_Objects/regexp
-            // Escape ~!@#$%^&*(){}[]`/=?+\|-_;:'",<.>
-            function escapeStringForRegexp(str) {
-                return str.replace(/[\-\[\]\/\{\}\(\)\*\+\?\.\\\^\$\|]/g, "\\$&");
-            }
-        }
-    };
-
     Modules['filterable-table'] = function() {
         var that = this;
         that.start = function(element) {
@@ -306,68 +254,6 @@ window.Modules = {};
       }
     };
 
-    /**
-     * Filter entities by type (gene, str, region). Right now only used on entities list page.
-     *
-     * It assumes it's used together with filter-list module.
-     *
-     * @TODO (Oleg, someday) refactor this module, so it can be used in other places,
-     * At the moment it's only used on a single page, so no point in refactoring it.
-     */
-    Modules['filter-entities-type'] = function() {
-        this.start = function(element) {
-            var $element = $(element);
-            $element.find('li').attr('data-filtered', false);
-            var listCount = $element.find('.js-filter-list-count');
-
-            var displayGenesStatus = true;
-            var displaySTRsStatus = true;
-            var displayRegionsStatus = true;
-
-            var filterItems = function(displayGenes, displaySTRs, displayRegions) {
-                if (displayGenes) {
-                    $element.find('li[data-type="gene"]').attr('data-filtered', false).show();
-                } else {
-                    $element.find('li[data-type="gene"]').attr('data-filtered', true).hide();
-                }
-
-                if (displaySTRs) {
-                    $element.find('li[data-type="str"]').attr('data-filtered', false).show();
-                } else {
-                    $element.find('li[data-type="str"]').attr('data-filtered', true).hide();
-                }
-
-                if (displayRegions) {
-                    $element.find('li[data-type="region"]').attr('data-filtered', false).show();
-                } else {
-                    $element.find('li[data-type="region"]').attr('data-filtered', true).hide();
-                }
-
-                var visibleCount = $element.find('li:visible').length;
-
-                if (listCount) {
-                    var countText = visibleCount == 1 ? listCount.data('singular') : listCount.data('plural');
-                    listCount.text(visibleCount + ' ' + countText);
-                }
-            };
-
-            $('#show_genes').click(function() {
-                displayGenesStatus = $(this).prop('checked');
-                filterItems(displayGenesStatus, displaySTRsStatus, displayRegionsStatus);
-            });
-
-            $('#show_strs').click(function() {
-                displaySTRsStatus = $(this).prop('checked');
-                filterItems(displayGenesStatus, displaySTRsStatus, displayRegionsStatus);
-            });
-
-            $('#show_regions').click(function() {
-                displayRegionsStatus = $(this).prop('checked');
-                filterItems(displayGenesStatus, displaySTRsStatus, displayRegionsStatus);
-            });
-        }
-    }
-
 })(window.Modules);
 
 $(function(){
@@ -0,0 +1,66 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+from unittest.mock import patch
+from django.test import SimpleTestCase
+from django.test import override_settings
+from panelapp import db_routers
+from panels.views import GenePanelView
+from panels.views import CreatePanelView
+from webservices.views import list_panels
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"], DATABASE_REPLICA_MAX_LAG=30)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        db_routers.start_request()
+        self.router = db_routers.ReplicaRouter()
+
+    def tearDown(self):
+        db_routers.start_request()
+
+    def test_replica_views(self):
+        self.assertTrue(db_routers.is_replica_view(GenePanelView.as_view()))
+        self.assertTrue(db_routers.is_replica_view(list_panels))
+        self.assertFalse(db_routers.is_replica_view(CreatePanelView.as_view()))
+
+    @patch("panelapp.db_routers.replica_status", return_value=1.0)
+    def test_read_from_replica(self, replica_status):
+        self.assertIsNone(self.router.db_for_read(None))
+
+        db_routers.read_from_replicas()
+        self.assertEqual(self.router.db_for_read(None), "replica_0")
+
+        # read own writes
+        self.assertEqual(self.router.db_for_write(None), "default")
+        self.assertIsNone(self.router.db_for_read(None))
+
+    @patch("panelapp.db_routers.replica_status", return_value=60.0)
+    def test_lagging_replica(self, replica_status):
+        db_routers.read_from_replicas()
+        self.assertIsNone(self.router.db_for_read(None))
+
+    @patch("panelapp.db_routers.replica_status", return_value=None)
+    def test_replica_unavailable(self, replica_status):
+        db_routers.read_from_replicas()
+        self.assertIsNone(self.router.db_for_read(None))
@@ -31,6 +31,7 @@ from django.http import JsonResponse
 from django.core import mail
 from celery.task.control import inspect
 from kombu import Connection
+from .db_routers import replica_status
 from .models import HomeText
 
 
@@ -60,7 +61,10 @@ class HealthCheckView(View):
             service_method = getattr(self, "_check_{service}".format(service=service))
             if callable(service_method):
                 out[service] = service_method()
-                if out[service] != "OK":
+                if (
+                    out[service] != "OK"
+                    and service not in settings.HEALTH_CHECK_NON_CRITICAL
+                ):
                     status = 500
 
         return JsonResponse(out, status=status)
@@ -86,6 +90,20 @@ class HealthCheckView(View):
 
         return status
 
+    @staticmethod
+    def _check_replicas():
+        """Read replicas, not used while they lag or can't be reached"""
+
+        errors = []
+        for alias in settings.DATABASE_REPLICAS:
+            lag = replica_status(alias, force=True)
+            if lag is None:
+                errors.append("{}: Error".format(alias))
+            elif lag > settings.DATABASE_REPLICA_MAX_LAG:
+                errors.append("{}: lag {:.1f}s".format(alias, lag))
+
+        return "; ".join(errors) if errors else "OK"
+
     @staticmethod
     def _check_rabbitmq():
         status = "OK"
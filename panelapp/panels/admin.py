@@ -40,6 +40,7 @@ from .models import UploadedPanelList
 from .models import UploadedReviewsList
 from .models import PanelType
 from .models import HistoricalSnapshot
+from .models import WebhookSubscription
 
 class TagAdmin(admin.ModelAdmin):
     list_display = ("name",)
@@ -264,6 +265,15 @@ class UploadedPanelListAdmin(admin.ModelAdmin):
     list_display = ("created", "imported", "panel_list")
 
 
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ("url", "user", "active", "last_delivery", "failures", "next_attempt")
+    list_filter = ("active",)
+    search_fields = ("url", "user__username")
+    raw_id_fields = ("user",)
+    filter_horizontal = ("panels",)
+    readonly_fields = ("last_delivery", "failures", "next_attempt", "last_error")
+
+
 class UploadedReviewsListAdmin(admin.ModelAdmin):
     list_display = ("created", "imported", "reviews")
 
@@ -284,3 +294,4 @@ admin.site.register(STR, STRAdmin)
 admin.site.register(UploadedGeneList, UploadedGeneListAdmin)
 admin.site.register(UploadedPanelList, UploadedPanelListAdmin)
 admin.site.register(UploadedReviewsList, UploadedReviewsListAdmin)
+admin.site.register(WebhookSubscription, WebhookSubscriptionAdmin)
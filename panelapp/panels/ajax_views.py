@@ -61,6 +61,7 @@ from .forms.ajax import EditCommentForm
 from .models import GenePanel
 from .models import GenePanelSnapshot
 from .models import Comment
+from .models import PanelChange
 from .views.entities import EntityMixin
 
 
@@ -84,6 +85,12 @@ class BaseAjaxGeneMixin:
     def panel(self):
         return GenePanel.objects.get(pk=self.kwargs["pk"]).active_panel
 
+    def entity_updated(self, entity):
+        """Record the change and refresh the data derived from the panel"""
+
+        PanelChange.objects.record(entity.panel, PanelChange.KIND.updated, entity)
+        entity.panel._update_saved_stats()
+
     @property
     def is_admin(self):
         return (
@@ -167,6 +174,7 @@ class ClearPublicationsAjaxView(
         del self.panel
         self.object.publications = []
         self.object.save()
+        self.entity_updated(self.object)
         return self.return_data()
 
 
@@ -178,6 +186,7 @@ class ClearPhoenotypesAjaxView(
         del self.panel
         self.object.phenotypes = []
         self.object.save()
+        self.entity_updated(self.object)
         return self.return_data()
 
 
@@ -189,6 +198,7 @@ class ClearTranscriptAjaxView(
         del self.panel
         self.object.transcript = []
         self.object.save()
+        self.entity_updated(self.object)
         return self.return_data()
 
 
@@ -200,6 +210,7 @@ class ClearModeOfPathogenicityAjaxView(
         del self.panel
         self.object.mode_of_pathogenicity = ""
         self.object.save()
+        self.entity_updated(self.object)
         return self.return_data()
 
 
@@ -210,6 +221,7 @@ class ClearSourcesAjaxView(
         self.panel.increment_version()
         del self.panel
         self.object.clear_evidences(self.request.user)
+        self.entity_updated(self.object)
         return self.return_data()
 
 
@@ -223,17 +235,13 @@ class ClearSingleSourceAjaxView(
     def process(self):
         self.panel.increment_version()
         if self.is_gene():
-            self.panel.get_gene(self.kwargs["entity_name"]).clear_evidences(
-                self.request.user, evidence=self.kwargs["source"]
-            )
+            entity = self.panel.get_gene(self.kwargs["entity_name"])
         elif self.is_str():
-            self.panel.get_str(self.kwargs["entity_name"]).clear_evidences(
-                self.request.user, evidence=self.kwargs["source"]
-            )
+            entity = self.panel.get_str(self.kwargs["entity_name"])
         elif self.is_region():
-            self.panel.get_region(self.kwargs["entity_name"]).clear_evidences(
-                self.request.user, evidence=self.kwargs["source"]
-            )
+            entity = self.panel.get_region(self.kwargs["entity_name"])
+        entity.clear_evidences(self.request.user, evidence=self.kwargs["source"])
+        self.entity_updated(entity)
         return self.return_data()
 
     def return_data(self):
@@ -262,6 +270,7 @@ class DeletePanelAjaxView(GELReviewerRequiredMixin, PanelAjaxMixin, AJAXMixin, V
         panel = GenePanel.objects.get(pk=self.kwargs["pk"])
         panel.status = GenePanel.STATUS.deleted
         panel.save()
+        panel.refresh_derived_data()
         panel.add_activity(self.request.user, "Panel deleted")
         return self.return_data()
 
@@ -0,0 +1,243 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Save many reviews in one go
+
+Reviewers triaging literature evaluate dozens of entities at once. Instead of
+one request per entity, all panels, entities and the existing evaluations of
+the reviewer are loaded with a query per entity type, new rows are written
+with bulk inserts and the panel stats are recomputed once per panel.
+"""
+
+from collections import OrderedDict
+
+from django.db import transaction
+
+from .models import Activity
+from .models import Comment
+from .models import Evaluation
+from .models import GenePanelEntrySnapshot
+from .models import GenePanelSnapshot
+from .models import PanelChange
+from .models import Region
+from .models import STR
+
+ENTITY_MODELS = OrderedDict(
+    [("gene", GenePanelEntrySnapshot), ("str", STR), ("region", Region)]
+)
+
+EVALUATION_FIELDS = [
+    "rating",
+    "moi",
+    "mode_of_pathogenicity",
+    "phenotypes",
+    "publications",
+    "current_diagnostic",
+    "clinically_relevant",
+    "comment",
+]
+
+
+def _load_entities(entity_type, snapshots, names):
+    """Entities of one type keyed by (panel snapshot id, entity name)"""
+
+    model = ENTITY_MODELS[entity_type]
+    if entity_type == "gene":
+        qs = model.objects.filter(gene_core__gene_symbol__in=names)
+    else:
+        qs = model.objects.filter(name__in=names)
+
+    entities = {}
+    for entity in qs.filter(panel__in=snapshots.values()).select_related(
+        "gene_payload"
+    ):
+        entity.panel = snapshots[entity.panel_id]
+        entities[(entity.panel_id, entity.name)] = entity
+    return entities
+
+
+def _load_evaluations(entity_type, user, entities):
+    """User evaluations keyed by entity id"""
+
+    through = ENTITY_MODELS[entity_type].evaluation.through
+    entity_field = ENTITY_MODELS[entity_type].evaluation.field.m2m_field_name()
+
+    rows = through.objects.filter(
+        **{
+            "{}__in".format(entity_field): [e.pk for e in entities],
+            "evaluation__user": user,
+        }
+    ).select_related("evaluation")
+    return {getattr(row, "{}_id".format(entity_field)): row.evaluation for row in rows}
+
+
+def submit_reviews(user, records):
+    """Add or update evaluations of `user` for many entities
+
+    args:
+        user (User): reviewer
+        records (list): dicts with `panel` (GenePanel id), `entity_type`,
+            `entity_name` and the evaluation data used by `update_evaluation`
+
+    returns:
+        list: result for each record, in the same order
+    """
+
+    results = []
+
+    with transaction.atomic():
+        panels = {
+            snapshot.panel_id: snapshot
+            for snapshot in GenePanelSnapshot.objects.get_active(
+                all=True, internal=True
+            ).filter(panel_id__in={record["panel"] for record in records})
+        }
+        snapshots = {snapshot.pk: snapshot for snapshot in panels.values()}
+
+        entities = {}
+        evaluations = {}
+        for entity_type in ENTITY_MODELS:
+            names = {
+                record["entity_name"]
+                for record in records
+                if record["entity_type"] == entity_type and record["panel"] in panels
+            }
+            if not names:
+                continue
+
+            loaded = _load_entities(entity_type, snapshots, names)
+            for (snapshot_pk, name), entity in loaded.items():
+                entities[(entity_type, snapshot_pk, name)] = entity
+
+            for entity_pk, evaluation in _load_evaluations(
+                entity_type, user, loaded.values()
+            ).items():
+                evaluations[(entity_type, entity_pk)] = evaluation
+
+        seen = set()
+        saved = []
+        created = []
+        updated = []
+        comments = []
+        activities = []
+        changes = []
+        touched = OrderedDict()
+
+        for index, record in enumerate(records):
+            snapshot = panels.get(record["panel"])
+            if not snapshot:
+                results.append(_error(index, "panel", "Panel not found"))
+                continue
+            if snapshot.is_super_panel:
+                results.append(_error(index, "panel", "Super panels can't be reviewed"))
+                continue
+
+            key = (record["entity_type"], snapshot.pk, record["entity_name"])
+            entity = entities.get(key)
+            if not entity:
+                results.append(
+                    _error(index, "entity_name", "Entity not found in this panel")
+                )
+                continue
+            if key in seen:
+                results.append(
+                    _error(index, "entity_name", "Entity is reviewed more than once")
+                )
+                continue
+            seen.add(key)
+
+            evaluation_data = {field: record.get(field) for field in EVALUATION_FIELDS}
+            evaluation, comment, activity_text = entity.prepare_evaluation(
+                user,
+                evaluation_data,
+                evaluations.get((record["entity_type"], entity.pk)),
+            )
+
+            result = {"index": index}
+            if evaluation.pk:
+                updated.append(evaluation)
+                result["status"] = "updated"
+            else:
+                created.append((entity, evaluation))
+                result["status"] = "created"
+            results.append(result)
+            saved.append((result, evaluation))
+
+            if comment:
+                comments.append((evaluation, comment))
+            if activity_text:
+                activities.append(
+                    Activity.build(
+                        user,
+                        snapshot,
+                        activity_text,
+                        {"entity_name": entity.name, "entity_type": entity._entity_type},
+                    )
+                )
+            changes.append(
+                PanelChange.objects.build(snapshot, PanelChange.KIND.reviewed, entity)
+            )
+            touched[snapshot.pk] = snapshot
+
+        Evaluation.objects.bulk_create([evaluation for _, evaluation in created])
+        for entity_type, model in ENTITY_MODELS.items():
+            entity_field = model.evaluation.field.m2m_field_name()
+            model.evaluation.through.objects.bulk_create(
+                [
+                    model.evaluation.through(
+                        **{
+                            "{}_id".format(entity_field): entity.pk,
+                            "evaluation_id": evaluation.pk,
+                        }
+                    )
+                    for entity, evaluation in created
+                    if entity._entity_type == entity_type
+                ]
+            )
+
+        # Django doesn't have bulk updates yet, changed evaluations are saved one by one
+        for evaluation in updated:
+            evaluation.save()
+
+        Comment.objects.bulk_create([comment for _, comment in comments])
+        Evaluation.comments.through.objects.bulk_create(
+            [
+                Evaluation.comments.through(
+                    evaluation_id=evaluation.pk, comment_id=comment.pk
+                )
+                for evaluation, comment in comments
+            ]
+        )
+        Activity.objects.bulk_create(activities)
+        PanelChange.objects.record_many(changes)
+
+        for snapshot in touched.values():
+            snapshot._update_saved_stats()
+
+    for result, evaluation in saved:
+        result["evaluation"] = evaluation.pk
+    return results
+
+
+def _error(index, field, message):
+    return {"index": index, "status": "error", "errors": {field: [message]}}
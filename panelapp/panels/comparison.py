@@ -0,0 +1,224 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Compare the entities of many panels
+
+Each entity type and name has a stable position in `EntityIndex`, so the
+entities of a panel version are a bitset stored in a Python int. Unions,
+intersections and differences of any number of panels are bitwise
+operations on these ints and overlaps are bit counts, which doesn't need
+any entity objects. Bitsets are cached per panel version and revision.
+"""
+
+from collections import OrderedDict
+from functools import reduce
+from itertools import combinations
+from operator import and_
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import EntityIndex
+
+ENTITY_TYPES = ("gene", "str", "region")
+OPERATIONS = ("intersection", "union")
+# compared and excluded panels in a single comparison
+MAX_PANELS = 100
+BITSETS_CACHE_KEY = "panels:bitsets:{}:{}:{}"
+
+
+def to_bitset(positions):
+    """Bitset with the bits at `positions` set"""
+
+    positions = list(positions)
+    if not positions:
+        return 0
+
+    data = bytearray(max(positions) // 8 + 1)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+def bit_positions(bitset):
+    """Positions of the bits set in `bitset`, in ascending order"""
+
+    data = bitset.to_bytes((bitset.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        while byte:
+            lowest = byte & -byte
+            yield index * 8 + lowest.bit_length() - 1
+            byte ^= lowest
+
+
+def popcount(bitset):
+    return bin(bitset).count("1")
+
+
+def panel_bitsets(panel):
+    """Bitset of each entity type in the panel snapshot
+
+    Super panels include the entities of their child panels.
+    """
+
+    key = BITSETS_CACHE_KEY.format(
+        panel.pk, panel.version, panel.revision
+    )
+    bitsets = cache.get(key)
+    if bitsets is None:
+        names = {
+            "gene": panel.cached_genes.values_list("entity_name", flat=True),
+            "str": panel.cached_strs.values_list("entity_name", flat=True),
+            "region": panel.cached_regions.values_list("entity_name", flat=True),
+        }
+        names = {
+            entity_type: {name for name in entity_names if name}
+            for entity_type, entity_names in names.items()
+        }
+        positions = EntityIndex.objects.positions(
+            (entity_type, name)
+            for entity_type, entity_names in names.items()
+            for name in entity_names
+        )
+        bitsets = {
+            entity_type: to_bitset(positions[(entity_type, name)] for name in entity_names)
+            for entity_type, entity_names in names.items()
+        }
+        cache.set(key, bitsets, settings.PANEL_COMPARISON_CACHE_TIMEOUT)
+    return bitsets
+
+
+class PanelComparison:
+    """Entities of many panels as membership bitsets
+
+    :param panels: GenePanelSnapshots to compare
+    :param entity_types: entity types included in the comparison
+    """
+
+    def __init__(self, panels, entity_types=ENTITY_TYPES):
+        self.panels = OrderedDict((panel.panel_id, panel) for panel in panels)
+        self.entity_types = entity_types
+        self.bitsets = OrderedDict()
+        for panel_id, panel in self.panels.items():
+            bitsets = panel_bitsets(panel)
+            self.bitsets[panel_id] = reduce(
+                or_, (bitsets[entity_type] for entity_type in entity_types), 0
+            )
+
+    def _select(self, panel_ids):
+        if panel_ids is None:
+            return list(self.bitsets.values())
+        return [self.bitsets[panel_id] for panel_id in panel_ids]
+
+    def union(self, panel_ids=None):
+        """Entities in any of the panels"""
+
+        return reduce(or_, self._select(panel_ids), 0)
+
+    def intersection(self, panel_ids=None):
+        """Entities in all of the panels"""
+
+        bitsets = self._select(panel_ids)
+        return reduce(and_, bitsets) if bitsets else 0
+
+    def difference(self, panel_ids, exclude_ids):
+        """Entities in all `panel_ids` panels and none of the `exclude_ids` panels"""
+
+        return self.intersection(panel_ids) & ~self.union(exclude_ids)
+
+    def select(self, panel_ids=None, exclude_ids=None, operation="intersection"):
+        """Entities of the panels combined with `operation`, minus excluded panels"""
+
+        if operation == "union":
+            bitset = self.union(panel_ids)
+        else:
+            bitset = self.intersection(panel_ids)
+        if exclude_ids:
+            bitset &= ~self.union(exclude_ids)
+        return bitset
+
+    def overlaps(self):
+        """Shared entities and Jaccard index of each pair of panels
+
+        :return: list of dicts with both panel ids, `shared` and `jaccard`
+        """
+
+        out = []
+        for (id_1, bitset_1), (id_2, bitset_2) in combinations(self.bitsets.items(), 2):
+            shared = popcount(bitset_1 & bitset_2)
+            total = popcount(bitset_1 | bitset_2)
+            out.append(
+                {
+                    "panels": [id_1, id_2],
+                    "shared": shared,
+                    "jaccard": round(shared / total, 4) if total else 0,
+                }
+            )
+        return out
+
+    def counts(self):
+        """Number of entities in each panel"""
+
+        return OrderedDict(
+            (panel_id, popcount(bitset)) for panel_id, bitset in self.bitsets.items()
+        )
+
+    def entities(self, bitset):
+        """Entities in the bitset with the panels they belong to
+
+        :return: list of dicts with `entity_type`, `entity_name` and `panels`
+            ids, ordered by entity type and name
+        """
+
+        positions = list(bit_positions(bitset))
+        names = dict(
+            (pk, (entity_type, name))
+            for pk, entity_type, name in EntityIndex.objects.filter(
+                pk__in=positions
+            ).values_list("pk", "entity_type", "name")
+        )
+
+        out = []
+        for position in positions:
+            mask = 1 << position
+            entity_type, name = names[position]
+            out.append(
+                {
+                    "entity_type": entity_type,
+                    "entity_name": name,
+                    "panels": [
+                        panel_id
+                        for panel_id, panel_bitset in self.bitsets.items()
+                        if panel_bitset & mask
+                    ],
+                }
+            )
+
+        return sorted(
+            out,
+            key=lambda entity: (
+                ENTITY_TYPES.index(entity["entity_type"]),
+                entity["entity_name"].lower(),
+            ),
+        )
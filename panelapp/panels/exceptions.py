@@ -59,3 +59,9 @@ class IncorrectGeneRating(ImportException):
 
 class IsSuperPanelException(Exception):
     pass
+
+
+class PanelVersionConflict(Exception):
+    """Panel version was changed by a concurrent edit"""
+
+    pass
@@ -0,0 +1,829 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Prebuilt panel exports
+
+Generating the all panels TSV touches every active panel and its reviewers,
+so the exports are built by a Celery task (nightly and shortly after panels
+change) and saved compressed in the exports storage:
+
+* `all_panels.tsv.gz` - all active panels, including internal ones,
+  with reviewer names and emails (GEL reviewers only). Saved in the private
+  exports storage, as the exports storage may be publicly readable
+* `panels/<panel id>/<revision>.tsv.gz` - TSV of each public panel, all
+  gene ratings. The panel revision changes with every panel change, so a
+  file is only written when the panel changed and never served stale
+* `panels.json.gz` - API v1 representation of public panels with entities
+* `gene_panel_matrix.*` - genes by public panels matrix, see `panels.gene_matrix`
+
+Views stream the prebuilt files with their modification time, see
+`export_response`, and fall back to generating the TSVs on the fly if the
+export hasn't run yet.
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import tempfile
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import FileResponse
+from django.http import HttpResponseNotModified
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
+from django.views.static import was_modified_since
+
+from accounts.models import User
+from panels.utils import remove_non_ascii
+
+logger = logging.getLogger(__name__)
+
+EXPORTS_LOCATION = "exports"
+ALL_PANELS = "{}/all_panels.tsv.gz".format(EXPORTS_LOCATION)
+PANELS_JSON = "{}/panels.json.gz".format(EXPORTS_LOCATION)
+PANEL_TSV = "{}/panels/{{}}/{{}}.tsv.gz".format(EXPORTS_LOCATION)
+
+ALL_PANELS_HEADER = (
+    "Level 4 title",
+    "Level 3 title",
+    "Level 2 title",
+    "URL",
+    "Current Version",
+    "Version time stamp",
+    "# rated genes/total genes",
+    "#reviewers",
+    "Reviewer name and affiliation (;)",
+    "Reviewer emails (;)",
+    "Status",
+    "Relevant disorders",
+    "Types",
+    "Signed Off",
+)
+
+
+def get_storage():
+    """Storage for the exports, `EXPORTS_STORAGE` or the default storage"""
+
+    if settings.EXPORTS_STORAGE:
+        return import_string(settings.EXPORTS_STORAGE)()
+    return default_storage
+
+
+def get_private_storage():
+    """Storage for exports with internal panels and personal data
+
+    `EXPORTS_PRIVATE_STORAGE` or the `EXPORTS_PRIVATE_ROOT` directory, which
+    isn't served by the web server. Files in it are only served by views
+    for GEL reviewers.
+    """
+
+    if settings.EXPORTS_PRIVATE_STORAGE:
+        return import_string(settings.EXPORTS_PRIVATE_STORAGE)()
+    return FileSystemStorage(location=settings.EXPORTS_PRIVATE_ROOT)
+
+
+def panel_tsv_name(panel):
+    """Name of the prebuilt TSV of the panel revision
+
+    :param panel: GenePanelSnapshot
+    """
+
+    return PANEL_TSV.format(panel.panel_id, panel.revision or "initial")
+
+
+def export_response(request, storage, name, filename, content_type):
+    """Stream a gzipped export, or Not Modified if the client has it already
+
+    The file is sent compressed if the client accepts gzip.
+
+    :param name: file name in the storage
+    :param filename: name of the downloaded file
+    """
+
+    modified = storage.get_modified_time(name)
+    if not was_modified_since(
+        request.META.get("HTTP_IF_MODIFIED_SINCE"), modified.timestamp()
+    ):
+        return HttpResponseNotModified()
+
+    export = storage.open(name, "rb")
+    if "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", ""):
+        response = FileResponse(export, content_type=content_type)
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = FileResponse(
+            gzip.GzipFile(fileobj=export, mode="rb"), content_type=content_type
+        )
+    patch_vary_headers(response, ("Accept-Encoding",))
+    response["Last-Modified"] = http_date(modified.timestamp())
+    response["Content-Disposition"] = 'attachment; filename="{}"'.format(filename)
+    return response
+
+
+def write_panel_tsv(writer, panel, categories):
+    """Write the header and entity rows of a panel TSV download
+
+    :param writer: csv writer
+    :param panel: GenePanelSnapshot
+    :param categories: string with the gene statuses to include, e.g. "01234"
+    """
+
+    panel_name = remove_non_ascii(panel.panel.name, replacemenet="_")
+    version = panel.version
+
+    writer.writerow(
+        (
+            "Entity Name",
+            "Entity type",
+            "Gene Symbol",
+            "Sources(; separated)",
+            "Level4",
+            "Level3",
+            "Level2",
+            "Model_Of_Inheritance",
+            "Phenotypes",
+            "Omim",
+            "Orphanet",
+            "HPO",
+            "Publications",
+            "Description",
+            "Flagged",
+            "GEL_Status",
+            "UserRatings_Green_amber_red",
+            "version",
+            "ready",
+            "Mode of pathogenicity",
+            "EnsemblId(GRch37)",
+            "EnsemblId(GRch38)",
+            "HGNC",
+            "Position Chromosome",
+            "Position GRCh37 Start",
+            "Position GRCh37 End",
+            "Position GRCh38 Start",
+            "Position GRCh38 End",
+            "STR Repeated Sequence",
+            "STR Normal Repeats",
+            "STR Pathogenic Repeats",
+            "Region Haploinsufficiency Score",
+            "Region Triplosensitivity Score",
+            "Region Required Overlap Percentage",
+            "Region Variant Type",
+            "Region Verbose Name",
+        )
+    )
+
+    for gpentry in panel.get_all_genes_extra:
+        if (
+            not gpentry.flagged
+            and gpentry.saved_gel_status > 0
+            and str(gpentry.status) in categories
+        ):
+            amber_perc, green_perc, red_prec = gpentry.aggregate_ratings()
+
+            ensembl_id_37 = "-"
+            try:
+                ensembl_id_37 = (
+                    gpentry.gene.get("ensembl_genes", {})
+                    .get("GRch37", {})
+                    .get("82", {})
+                    .get("ensembl_id", "-")
+                )
+            except AttributeError:
+                pass
+
+            ensembl_id_38 = "-"
+            try:
+                ensembl_id_38 = (
+                    gpentry.gene.get("ensembl_genes", {})
+                    .get("GRch38", {})
+                    .get("90", {})
+                    .get("ensembl_id", "-")
+                )
+            except AttributeError:
+                pass
+
+            evidence = ";".join([ev for ev in gpentry.entity_evidences if ev])
+            export_gpentry = (
+                gpentry.gene.get("gene_symbol"),
+                "gene",
+                gpentry.gene.get("gene_symbol"),
+                evidence,
+                panel_name,
+                panel.level4title.level3title,
+                panel.level4title.level2title,
+                gpentry.moi,
+                ";".join(map(remove_non_ascii, gpentry.phenotypes)),
+                ";".join(map(remove_non_ascii, panel.level4title.omim)),
+                ";".join(map(remove_non_ascii, panel.level4title.orphanet)),
+                ";".join(map(remove_non_ascii, panel.level4title.hpo)),
+                ";".join(map(remove_non_ascii, gpentry.publications))
+                if gpentry.publications
+                else "",
+                "",
+                str(gpentry.flagged),
+                str(gpentry.saved_gel_status),
+                ";".join(map(str, [green_perc, amber_perc, red_prec])),
+                str(version),
+                gpentry.ready,
+                gpentry.mode_of_pathogenicity,
+                ensembl_id_37,
+                ensembl_id_38,
+                gpentry.gene.get("hgnc_id", "-"),
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+            )
+            writer.writerow(export_gpentry)
+
+    for strentry in panel.get_all_strs_extra:
+        if (
+            not strentry.flagged
+            and strentry.saved_gel_status > 0
+            and str(strentry.status) in categories
+        ):
+            amber_perc, green_perc, red_prec = strentry.aggregate_ratings()
+
+            evidence = ";".join(
+                [evidence.name for evidence in strentry.evidence.all()]
+            )
+            export_strentry = (
+                strentry.name,
+                "str",
+                strentry.gene.get("gene_symbol") if strentry.gene else "",
+                evidence,
+                panel_name,
+                panel.level4title.level3title,
+                panel.level4title.level2title,
+                strentry.moi,
+                ";".join(map(remove_non_ascii, strentry.phenotypes)),
+                ";".join(map(remove_non_ascii, panel.level4title.omim)),
+                ";".join(map(remove_non_ascii, panel.level4title.orphanet)),
+                ";".join(map(remove_non_ascii, panel.level4title.hpo)),
+                ";".join(map(remove_non_ascii, strentry.publications))
+                if strentry.publications
+                else "",
+                "",
+                str(strentry.flagged),
+                str(strentry.saved_gel_status),
+                ";".join(map(str, [green_perc, amber_perc, red_prec])),
+                str(version),
+                strentry.ready,
+                "",
+                strentry.gene.get("ensembl_genes", {})
+                .get("GRch37", {})
+                .get("82", {})
+                .get("ensembl_id", "-")
+                if strentry.gene
+                else "",
+                strentry.gene.get("ensembl_genes", {})
+                .get("GRch38", {})
+                .get("90", {})
+                .get("ensembl_id", "-")
+                if strentry.gene
+                else "",
+                strentry.gene.get("hgnc_id", "-") if strentry.gene else "",
+                strentry.chromosome,
+                strentry.position_37.lower if strentry.position_37 else "",
+                strentry.position_37.upper if strentry.position_37 else "",
+                strentry.position_38.lower,
+                strentry.position_38.upper,
+                strentry.repeated_sequence,
+                strentry.normal_repeats,
+                strentry.pathogenic_repeats,
+                "",
+                "",
+                "",
+                "",
+                "",
+            )
+            writer.writerow(export_strentry)
+
+    for region in panel.get_all_regions_extra:
+        if (
+            not region.flagged
+            and region.saved_gel_status > 0
+            and str(region.status) in categories
+        ):
+            amber_perc, green_perc, red_prec = region.aggregate_ratings()
+
+            evidence = ";".join(
+                [evidence.name for evidence in region.evidence.all()]
+            )
+            export_region = (
+                region.name,
+                "region",
+                region.gene.get("gene_symbol") if region.gene else "",
+                evidence,
+                panel_name,
+                panel.level4title.level3title,
+                panel.level4title.level2title,
+                region.moi,
+                ";".join(map(remove_non_ascii, region.phenotypes)),
+                ";".join(map(remove_non_ascii, panel.level4title.omim)),
+                ";".join(map(remove_non_ascii, panel.level4title.orphanet)),
+                ";".join(map(remove_non_ascii, panel.level4title.hpo)),
+                ";".join(map(remove_non_ascii, region.publications))
+                if region.publications
+                else "",
+                "",
+                str(region.flagged),
+                str(region.saved_gel_status),
+                ";".join(map(str, [green_perc, amber_perc, red_prec])),
+                str(version),
+                region.ready,
+                "",
+                region.gene.get("ensembl_genes", {})
+                .get("GRch37", {})
+                .get("82", {})
+                .get("ensembl_id", "-")
+                if region.gene
+                else "",
+                region.gene.get("ensembl_genes", {})
+                .get("GRch38", {})
+                .get("90", {})
+                .get("ensembl_id", "-")
+                if region.gene
+                else "",
+                region.gene.get("hgnc_id", "-") if region.gene else "",
+                region.chromosome,
+                region.position_37.lower if region.position_37 else "",
+                region.position_37.upper if region.position_37 else "",
+                region.position_38.lower,
+                region.position_38.upper,
+                "",
+                "",
+                "",
+                region.haploinsufficiency_score,
+                region.triplosensitivity_score,
+                region.required_overlap_percentage,
+                region.type_of_variants,
+                region.verbose_name,
+            )
+            writer.writerow(export_region)
+
+
+def panels_contributors(panel_ids):
+    """Reviewers of the panel snapshots
+
+    Same users as `GenePanelSnapshot.contributors`, but for all panels at once.
+
+    :param panel_ids: GenePanelSnapshot ids
+    :return: dict with GenePanelSnapshot id and the list of users
+    """
+
+    from panels.models import GenePanelEntrySnapshot
+    from panels.models import STR
+    from panels.models import Region
+
+    user_ids = defaultdict(set)
+    for model in (GenePanelEntrySnapshot, STR, Region):
+        rows = (
+            model.objects.filter(
+                panel_id__in=panel_ids, evaluation__user_id__isnull=False
+            )
+            .values_list("panel_id", "evaluation__user_id")
+            .distinct()
+        )
+        for panel_id, user_id in rows:
+            user_ids[panel_id].add(user_id)
+
+    users = User.objects.in_bulk(set().union(*user_ids.values()))
+    return {
+        panel_id: [users[pk] for pk in sorted(pks) if pk in users]
+        for panel_id, pks in user_ids.items()
+    }
+
+
+def all_panels_rows(base_url):
+    """Rows of the all panels TSV, header included
+
+    :param base_url: scheme and host used for the panel URLs
+    """
+
+    from panels.models import GenePanelSnapshot
+
+    yield ALL_PANELS_HEADER
+
+    panels = list(GenePanelSnapshot.objects.get_active(all=True, internal=True))
+    contributors = panels_contributors([panel.pk for panel in panels])
+
+    for panel in panels:
+        rate = "{} of {} genes reviewed".format(
+            panel.stats.get("number_of_evaluated_genes"),
+            panel.stats.get("number_of_genes"),
+        )
+        reviewers = contributors.get(panel.pk, [])
+        names = [
+            "{} {} ({})".format(user.first_name, user.last_name, user.email)
+            if user.first_name
+            else user.username
+            for user in reviewers
+        ]
+
+        yield (
+            panel.level4title.name,
+            panel.level4title.level3title,
+            panel.level4title.level2title,
+            base_url + reverse("panels:detail", args=(panel.panel.id,)),
+            panel.version,
+            panel.created,
+            rate,
+            len(reviewers),
+            ";".join(names),  # aff
+            ";".join([user.email for user in reviewers if user.email]),  # email
+            panel.panel.status.upper(),
+            ";".join(panel.old_panels),
+            ";".join([panel_type.name for panel_type in panel.panel.types.all()]),
+            "v{}.{} on {}".format(*panel.signed_off) if panel.panel.signed_off else "",
+        )
+
+
+# Rows of the all genes/STRs/regions downloads are read with a single query
+# over all active panels. Super panels list the entities of their child panels.
+ENTITY_ROWS_CHUNK = 2000
+
+ACTIVE_PANELS_SQL = """
+WITH active AS (
+    SELECT DISTINCT ON (s.panel_id)
+        s.id, s.panel_id, s.major_version, s.minor_version, s.modified,
+        l.name, p.status
+    FROM panels_genepanelsnapshot s
+    JOIN panels_genepanel p ON p.id = s.panel_id
+    JOIN panels_level4title l ON l.id = s.level4title_id
+    WHERE p.status <> 'deleted'
+    ORDER BY s.panel_id, s.major_version DESC, s.minor_version DESC,
+        s.modified DESC, s.id DESC
+),
+members AS (
+    SELECT a.id AS snapshot_id, NULL::integer AS super_id
+    FROM active a
+    WHERE NOT EXISTS (
+        SELECT 1 FROM panels_genepanelsnapshot_child_panels c
+        WHERE c.from_genepanelsnapshot_id = a.id
+    )
+    UNION ALL
+    SELECT c.to_genepanelsnapshot_id, a.id
+    FROM active a
+    JOIN panels_genepanelsnapshot_child_panels c
+        ON c.from_genepanelsnapshot_id = a.id
+),
+panel_types AS (
+    SELECT gt.genepanel_id, string_agg(pt.name, ';' ORDER BY gt.id) AS names
+    FROM panels_genepanel_types gt
+    JOIN panels_paneltype pt ON pt.id = gt.paneltype_id
+    GROUP BY gt.genepanel_id
+)
+"""
+
+# joins `members` with the entity table `e`, its panel `s` and the listed panel `o`
+ENTITIES_FROM_SQL = """
+FROM members m
+JOIN active o ON o.id = COALESCE(m.super_id, m.snapshot_id)
+JOIN panels_genepanelsnapshot s ON s.id = m.snapshot_id
+JOIN panels_genepanel p ON p.id = s.panel_id
+JOIN panels_level4title l ON l.id = s.level4title_id
+JOIN {table} e ON e.panel_id = s.id
+LEFT JOIN panels_genepayload g ON g.hash = e.gene_payload_id
+LEFT JOIN panel_types t ON t.genepanel_id = s.panel_id
+"""
+
+ALL_GENES_SQL = (
+    ACTIVE_PANELS_SQL
+    + """
+SELECT
+    g.data ->> 'gene_symbol',
+    s.panel_id,
+    l.name,
+    s.major_version || '.' || s.minor_version,
+    upper(p.status),
+    e.saved_gel_status,
+    e.flagged,
+    COALESCE((
+        SELECT string_agg(DISTINCT ev.name, ';' ORDER BY ev.name)
+        FROM panels_genepanelentrysnapshot_evidence ee
+        JOIN panels_evidence ev ON ev.id = ee.evidence_id
+        WHERE ee.genepanelentrysnapshot_id = e.id AND ev.name <> ''
+    ), ''),
+    e.moi,
+    e.mode_of_pathogenicity,
+    COALESCE((
+        SELECT string_agg(DISTINCT tg.name, ';' ORDER BY tg.name)
+        FROM panels_genepanelentrysnapshot_tags et
+        JOIN panels_tag tg ON tg.id = et.tag_id
+        WHERE et.genepanelentrysnapshot_id = e.id AND tg.name <> ''
+    ), ''),
+    COALESCE(g.data #>> '{ensembl_genes,GRch37,82,ensembl_id}', '-'),
+    COALESCE(g.data #>> '{ensembl_genes,GRch38,90,ensembl_id}', '-'),
+    COALESCE(g.data ->> 'hgnc_id', '-'),
+    COALESCE(g.data ->> 'biotype', '-'),
+    COALESCE(array_to_string(e.phenotypes, ';'), '-'),
+    COALESCE(g.data #>> '{ensembl_genes,GRch37,82,location}', '-'),
+    COALESCE(g.data #>> '{ensembl_genes,GRch38,90,location}', '-'),
+    COALESCE(t.names, ''),
+    CASE WHEN m.super_id IS NULL THEN '-' ELSE o.panel_id::text END,
+    CASE WHEN m.super_id IS NULL THEN '-' ELSE o.name END,
+    CASE WHEN m.super_id IS NULL THEN '-'
+        ELSE o.major_version || '.' || o.minor_version END
+"""
+    + ENTITIES_FROM_SQL.replace("{table}", "panels_genepanelentrysnapshot")
+    + """
+ORDER BY o.name, o.major_version DESC, o.minor_version DESC, o.modified DESC,
+    o.id DESC, e.saved_gel_status DESC, e.gene_core_id
+"""
+)
+
+ALL_STRS_SQL = (
+    ACTIVE_PANELS_SQL
+    + """
+SELECT
+    e.name,
+    e.chromosome,
+    lower(e.position_37),
+    upper(e.position_37),
+    lower(e.position_38),
+    upper(e.position_38),
+    e.repeated_sequence,
+    e.normal_repeats,
+    e.pathogenic_repeats,
+    COALESCE(g.data ->> 'gene_symbol', '-'),
+    s.panel_id,
+    l.name,
+    s.major_version || '.' || s.minor_version,
+    upper(p.status),
+    e.saved_gel_status,
+    e.flagged,
+    COALESCE((
+        SELECT string_agg(ev.name, ';' ORDER BY ev.created DESC)
+        FROM panels_str_evidence ee
+        JOIN panels_evidence ev ON ev.id = ee.evidence_id
+        WHERE ee.str_id = e.id
+    ), ''),
+    e.moi,
+    COALESCE((
+        SELECT string_agg(tg.name, ';' ORDER BY tg.name)
+        FROM panels_str_tags et
+        JOIN panels_tag tg ON tg.id = et.tag_id
+        WHERE et.str_id = e.id
+    ), ''),
+    COALESCE(g.data #>> '{ensembl_genes,GRch37,82,ensembl_id}', '-'),
+    COALESCE(g.data #>> '{ensembl_genes,GRch38,90,ensembl_id}', '-'),
+    COALESCE(g.data ->> 'biotype', '-'),
+    COALESCE(array_to_string(e.phenotypes, ';'), '-'),
+    COALESCE(g.data #>> '{ensembl_genes,GRch37,82,location}', '-'),
+    COALESCE(g.data #>> '{ensembl_genes,GRch38,90,location}', '-'),
+    COALESCE(t.names, ''),
+    CASE WHEN m.super_id IS NULL THEN '-' ELSE o.panel_id::text END,
+    CASE WHEN m.super_id IS NULL THEN '-' ELSE o.name END,
+    CASE WHEN m.super_id IS NULL THEN '-'
+        ELSE o.major_version || '.' || o.minor_version END
+"""
+    + ENTITIES_FROM_SQL.replace("{table}", "panels_str")
+    + """
+ORDER BY o.name, o.major_version DESC, o.minor_version DESC, o.modified DESC,
+    o.id DESC, e.saved_gel_status DESC, e.name
+"""
+)
+
+# the regions download lists the panel it was requested for, super panel included
+ALL_REGIONS_SQL = (
+    ACTIVE_PANELS_SQL
+    + """
+SELECT
+    e.name,
+    e.verbose_name,
+    e.chromosome,
+    lower(e.position_37),
+    upper(e.position_37),
+    lower(e.position_38),
+    upper(e.position_38),
+    NULLIF(e.haploinsufficiency_score, ''),
+    NULLIF(e.triplosensitivity_score, ''),
+    e.required_overlap_percentage,
+    e.type_of_variants,
+    COALESCE(g.data ->> 'gene_symbol', ''),
+    o.panel_id,
+    o.name,
+    o.major_version || '.' || o.minor_version,
+    upper(o.status),
+    e.saved_gel_status,
+    e.flagged,
+    COALESCE((
+        SELECT string_agg(ev.name, ';' ORDER BY ev.created DESC)
+        FROM panels_region_evidence ee
+        JOIN panels_evidence ev ON ev.id = ee.evidence_id
+        WHERE ee.region_id = e.id
+    ), ''),
+    e.moi,
+    COALESCE((
+        SELECT string_agg(tg.name, ';' ORDER BY tg.name)
+        FROM panels_region_tags et
+        JOIN panels_tag tg ON tg.id = et.tag_id
+        WHERE et.region_id = e.id
+    ), ''),
+    COALESCE(g.data #>> '{ensembl_genes,GRch37,82,ensembl_id}', ''),
+    COALESCE(g.data #>> '{ensembl_genes,GRch38,90,ensembl_id}', ''),
+    COALESCE(g.data ->> 'biotype', '-'),
+    COALESCE(array_to_string(e.phenotypes, ';'), ''),
+    COALESCE(g.data #>> '{ensembl_genes,GRch37,82,location}', ''),
+    COALESCE(g.data #>> '{ensembl_genes,GRch38,90,location}', ''),
+    COALESCE(t.names, ''),
+    CASE WHEN m.super_id IS NULL THEN '-' ELSE o.panel_id::text END,
+    CASE WHEN m.super_id IS NULL THEN '-' ELSE o.name END,
+    CASE WHEN m.super_id IS NULL THEN '-'
+        ELSE o.major_version || '.' || o.minor_version END
+"""
+    + ENTITIES_FROM_SQL.replace("{table}", "panels_region")
+    + """
+ORDER BY o.name, o.major_version DESC, o.minor_version DESC, o.modified DESC,
+    o.id DESC, e.saved_gel_status DESC, e.name
+"""
+)
+
+
+def _stream_rows(sql):
+    """Rows of `sql` fetched in chunks with a server-side cursor"""
+
+    from django.db import connection
+
+    if connection.settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+        cursor = connection.cursor()
+    else:
+        cursor = connection.chunked_cursor()
+
+    with cursor:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(ENTITY_ROWS_CHUNK)
+            if not rows:
+                break
+            yield from rows
+
+
+def _with_color(rows, status_index):
+    """Replace saved GEL status and flagged columns with the list name"""
+
+    from panels.templatetags.panel_helpers import GeneDataType
+    from panels.templatetags.panel_helpers import get_gene_list_data
+
+    for row in rows:
+        saved_gel_status, flagged = row[status_index], row[status_index + 1]
+        color = get_gene_list_data(
+            None, GeneDataType.COLOR.value, saved_gel_status, flagged=flagged
+        )
+        yield row[:status_index] + (color,) + row[status_index + 2 :]
+
+
+def all_genes_rows():
+    """Gene rows of all active panels, see `DownloadAllGenes`"""
+
+    return _with_color(_stream_rows(ALL_GENES_SQL), 5)
+
+
+def all_strs_rows():
+    """STR rows of all active panels, see `DownloadAllSTRs`"""
+
+    return _with_color(_stream_rows(ALL_STRS_SQL), 14)
+
+
+def all_regions_rows():
+    """Region rows of all active panels, see `DownloadAllRegions`"""
+
+    return _with_color(_stream_rows(ALL_REGIONS_SQL), 16)
+
+
+def _save(storage, name, write, binary=False):
+    """Write gzipped text to a temporary file and save it in the storage
+
+    :param write: function which receives a text file object, or the binary
+        gzip file if `binary` is set
+    """
+
+    with tempfile.TemporaryFile() as tmp:
+        with gzip.GzipFile(fileobj=tmp, mode="wb") as gz:
+            if binary:
+                write(gz)
+            else:
+                text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+                write(text)
+                text.flush()
+                # keep the gzip file open, it's closed by the context manager
+                text.detach()
+        tmp.seek(0)
+
+        # storages add a suffix to existing file names instead of replacing them
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, File(tmp))
+
+
+def export_all_panels(storage):
+    def write(text):
+        writer = csv.writer(text, delimiter="\t")
+        writer.writerows(all_panels_rows(settings.PANEL_APP_BASE_URL.rstrip("/")))
+
+    _save(storage, ALL_PANELS, write)
+
+
+def export_panel_tsvs(storage, panels):
+    """Save TSVs of the panels which changed since the last export
+
+    :return: number of TSVs saved
+    """
+
+    saved = 0
+    for panel in panels:
+        name = panel_tsv_name(panel)
+        if storage.exists(name):
+            continue
+
+        def write(text):
+            write_panel_tsv(csv.writer(text, delimiter="\t"), panel, "01234")
+
+        _save(storage, name, write)
+        saved += 1
+
+        # previous revisions of the panel
+        directory = name.rsplit("/", 1)[0]
+        for old_name in storage.listdir(directory)[1]:
+            old_name = "{}/{}".format(directory, old_name)
+            if old_name != name:
+                storage.delete(old_name)
+    return saved
+
+
+def export_panels_json(storage, panels):
+    from api.v1.serializers import PanelSerializer
+
+    def write(text):
+        text.write("[")
+        for i, panel in enumerate(panels):
+            if i:
+                text.write(",")
+            data = PanelSerializer(panel, include_entities=True).data
+            json.dump(data, text, cls=DjangoJSONEncoder)
+        text.write("]")
+
+    _save(storage, PANELS_JSON, write)
+
+
+def export_panels():
+    """Build all exports"""
+
+    from panels.gene_matrix import export_gene_matrix
+    from panels.models import GenePanelSnapshot
+
+    storage = get_storage()
+
+    # previously saved with the public exports
+    if storage.exists(ALL_PANELS):
+        storage.delete(ALL_PANELS)
+
+    export_all_panels(get_private_storage())
+
+    panels = list(GenePanelSnapshot.objects.get_active_annotated())
+    changed = export_panel_tsvs(storage, panels)
+    export_panels_json(storage, panels)
+    export_gene_matrix(storage, panels)
+
+    logger.info(
+        "Exported {} public panels, {} changed".format(len(panels), changed)
+    )
@@ -27,6 +27,7 @@ from panels.models import UploadedGeneList
 from panels.models import UploadedReviewsList
 from panels.models import UploadedPanelList
 from panels.models import GenePanel
+from panels.comparison import MAX_PANELS
 from .panel import PanelForm  # noqa
 from .promotepanel import PromotePanelForm  # noqa
 from .panelgene import PanelGeneForm  # noqa
@@ -161,6 +162,58 @@ class ComparePanelsForm(forms.Form):
             self.fields["panel_2"].queryset = qs
 
 
+class CompareManyPanelsForm(forms.Form):
+    OPERATIONS = (
+        ("intersection", "In all selected panels"),
+        ("union", "In any selected panel"),
+    )
+    ENTITY_TYPES = (("gene", "Genes"), ("str", "STRs"), ("region", "Regions"))
+    max_panels = MAX_PANELS
+
+    panels = forms.ModelMultipleChoiceField(
+        queryset=GenePanel.objects.none(),
+        widget=forms.SelectMultiple(attrs={"class": "form-control"}),
+    )
+    exclude = forms.ModelMultipleChoiceField(
+        queryset=GenePanel.objects.none(),
+        required=False,
+        label="Not in panels",
+        widget=forms.SelectMultiple(attrs={"class": "form-control"}),
+    )
+    operation = forms.ChoiceField(
+        choices=OPERATIONS,
+        initial="intersection",
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
+    entity_types = forms.MultipleChoiceField(
+        choices=ENTITY_TYPES,
+        required=False,
+        label="Entity types",
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    def __init__(self, *args, **kwargs):
+        qs = kwargs.pop("panels", None)
+        super().__init__(*args, **kwargs)
+        if qs is not None:
+            self.fields["panels"].queryset = qs
+            self.fields["exclude"].queryset = qs
+
+    def clean(self):
+        cleaned_data = super().clean()
+        panels = set(cleaned_data.get("panels") or [])
+        exclude = set(cleaned_data.get("exclude") or [])
+        if panels & exclude:
+            raise forms.ValidationError("Panels can't be both selected and excluded")
+        if len(panels) + len(exclude) > self.max_panels:
+            raise forms.ValidationError(
+                "At most {} panels can be compared".format(self.max_panels)
+            )
+        if not cleaned_data.get("entity_types"):
+            cleaned_data["entity_types"] = [t for t, _ in self.ENTITY_TYPES]
+        return cleaned_data
+
+
 class CopyReviewsForm(forms.Form):
     panel_1 = forms.CharField(required=True, widget=forms.widgets.HiddenInput())
     panel_2 = forms.CharField(required=True, widget=forms.widgets.HiddenInput())
@@ -0,0 +1,314 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Genes by panels membership matrix
+
+Sparse matrix of the genes (rows, by HGNC ID) in the active public panels
+(columns), exported with the other downloads. Each cell has the gene rating
+(`saved_gel_status`) and a code for its mode of inheritance.
+
+Columns are cached in the exports storage for each panel version, so only the
+panels changed since the previous export are read from the database. Matrix
+files are named after a digest of their columns and `gene_panel_matrix/latest.json`
+points to the current ones:
+
+* `<digest>.tsv.gz` - one row for each gene in a panel
+* `<digest>.bin.gz` - columnar binary, gzipped:
+
+    - `PAGM` magic, then format version and header length as uint32
+    - JSON header with `genes` ([hgnc id, symbol]), `panels` and `moi` codes
+    - uint32 column offsets (number of panels + 1), uint32 gene row indexes,
+      uint8 ratings and uint16 mode of inheritance codes for each cell
+
+All numbers are little endian, `load_matrix` reads the binary file.
+"""
+
+import csv
+import gzip
+import hashlib
+import io
+import json
+import struct
+import sys
+from array import array
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from panels.exports import EXPORTS_LOCATION
+from panels.exports import _save
+from panels.exports import get_storage
+
+
+MATRIX_LOCATION = "{}/gene_panel_matrix".format(EXPORTS_LOCATION)
+MATRIX_MANIFEST = "{}/latest.json".format(MATRIX_LOCATION)
+MATRIX_FILE = "{}/{{}}.{{}}.gz".format(MATRIX_LOCATION)
+COLUMNS_LOCATION = "{}/columns".format(MATRIX_LOCATION)
+COLUMN_FILE = "{}/{{}}/{{}}.tsv.gz".format(COLUMNS_LOCATION)
+
+BINARY_MAGIC = b"PAGM"
+BINARY_VERSION = 1
+
+TSV_HEADER = (
+    "HGNC ID",
+    "Gene Symbol",
+    "Panel ID",
+    "Panel Name",
+    "Panel Version",
+    "Rating",
+    "Mode of inheritance",
+)
+
+
+def column_key(panel):
+    """Changes with the panel version and any change made to the snapshot"""
+
+    return "{}-{}".format(panel.pk, panel.modified.strftime("%Y%m%d%H%M%S%f"))
+
+
+def _listdir(storage, path):
+    try:
+        return storage.listdir(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return [], []
+
+
+def _panel_column(panel):
+    """Genes of the panel as (hgnc id, symbol, rating, moi) tuples
+
+    Super panels list genes of their child panels, the highest rating is kept
+    for genes in many child panels.
+    """
+
+    genes = {}
+    for hgnc_id, symbol, rating, moi in panel.cached_genes.values_list(
+        "gene_core__hgnc_id", "gene_core__gene_symbol", "saved_gel_status", "moi"
+    ):
+        rating = rating or 0
+        if symbol not in genes or genes[symbol][2] < rating:
+            genes[symbol] = (hgnc_id or "", symbol, rating, moi or "")
+    return [genes[symbol] for symbol in sorted(genes)]
+
+
+def load_column(storage, panel):
+    """Column of the panel version, from the storage if it was exported before"""
+
+    name = COLUMN_FILE.format(panel.panel_id, column_key(panel))
+    if storage.exists(name):
+        with storage.open(name, "rb") as f:
+            text = io.TextIOWrapper(gzip.GzipFile(fileobj=f, mode="rb"), "utf-8")
+            return [
+                (hgnc_id, symbol, int(rating), moi)
+                for hgnc_id, symbol, rating, moi in csv.reader(text, delimiter="\t")
+            ]
+
+    column = _panel_column(panel)
+
+    def write(text):
+        csv.writer(text, delimiter="\t").writerows(column)
+
+    _save(storage, name, write)
+    return column
+
+
+def _remove_stale_columns(storage, panels):
+    current = {
+        str(panel.panel_id): "{}.tsv.gz".format(column_key(panel)) for panel in panels
+    }
+    panel_dirs, _ = _listdir(storage, COLUMNS_LOCATION)
+    for panel_dir in panel_dirs:
+        _, files = _listdir(storage, "{}/{}".format(COLUMNS_LOCATION, panel_dir))
+        for name in files:
+            if current.get(panel_dir) != name:
+                storage.delete("{}/{}/{}".format(COLUMNS_LOCATION, panel_dir, name))
+
+
+def build_matrix(panels, columns):
+    """Compressed sparse columns of the matrix
+
+    :param panels: list of GenePanelSnapshot
+    :param columns: list of gene tuples for each panel, see `_panel_column`
+    :return: dict with header `genes`, `panels`, `moi` and the cell arrays
+    """
+
+    genes = sorted(
+        {(hgnc_id, symbol) for column in columns for hgnc_id, symbol, _, _ in column},
+        key=lambda gene: (gene[0] or "~", gene[1]),
+    )
+    rows = {gene: index for index, gene in enumerate(genes)}
+    moi_codes = {"": 0}
+
+    offsets = array("I", [0])
+    row_indexes = array("I")
+    ratings = array("B")
+    mois = array("H")
+    for column in columns:
+        for hgnc_id, symbol, rating, moi in sorted(
+            column, key=lambda gene: rows[(gene[0], gene[1])]
+        ):
+            row_indexes.append(rows[(hgnc_id, symbol)])
+            ratings.append(rating)
+            mois.append(moi_codes.setdefault(moi, len(moi_codes)))
+        offsets.append(len(row_indexes))
+
+    return {
+        "genes": [list(gene) for gene in genes],
+        "panels": [
+            {"id": panel.panel_id, "name": panel.panel.name, "version": panel.version}
+            for panel in panels
+        ],
+        "moi": sorted(moi_codes, key=moi_codes.get),
+        "offsets": offsets,
+        "rows": row_indexes,
+        "ratings": ratings,
+        "mois": mois,
+    }
+
+
+def write_binary(f, matrix):
+    header = json.dumps(
+        {key: matrix[key] for key in ("genes", "panels", "moi")}
+    ).encode("utf-8")
+    f.write(BINARY_MAGIC)
+    f.write(struct.pack("<II", BINARY_VERSION, len(header)))
+    f.write(header)
+    for key in ("offsets", "rows", "ratings", "mois"):
+        values = array(matrix[key].typecode, matrix[key])
+        if sys.byteorder == "big":
+            values.byteswap()
+        f.write(values.tobytes())
+
+
+def load_matrix(f):
+    """Read a binary matrix written by `write_binary` from a file object"""
+
+    if f.read(4) != BINARY_MAGIC:
+        raise ValueError("Not a gene panel matrix")
+    version, header_length = struct.unpack("<II", f.read(8))
+    if version != BINARY_VERSION:
+        raise ValueError("Unsupported matrix version {}".format(version))
+
+    matrix = json.loads(f.read(header_length).decode("utf-8"))
+
+    def read(typecode, length):
+        values = array(typecode)
+        values.frombytes(f.read(length * values.itemsize))
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    matrix["offsets"] = read("I", len(matrix["panels"]) + 1)
+    cells = matrix["offsets"][-1]
+    matrix["rows"] = read("I", cells)
+    matrix["ratings"] = read("B", cells)
+    matrix["mois"] = read("H", cells)
+    return matrix
+
+
+def tsv_rows(matrix):
+    yield TSV_HEADER
+    for index, panel in enumerate(matrix["panels"]):
+        start, end = matrix["offsets"][index], matrix["offsets"][index + 1]
+        for cell in range(start, end):
+            hgnc_id, symbol = matrix["genes"][matrix["rows"][cell]]
+            yield (
+                hgnc_id,
+                symbol,
+                panel["id"],
+                panel["name"],
+                panel["version"],
+                matrix["ratings"][cell],
+                matrix["moi"][matrix["mois"][cell]],
+            )
+
+
+def get_manifest(storage):
+    """Current matrix files, None if the matrix hasn't been exported yet"""
+
+    if not storage.exists(MATRIX_MANIFEST):
+        return None
+    with storage.open(MATRIX_MANIFEST, "rb") as f:
+        return json.loads(f.read().decode("utf-8"))
+
+
+def export_gene_matrix(storage=None, panels=None):
+    """Export the matrix if any panel changed since the previous export
+
+    The previous matrix files are kept until the next export, so clients
+    which have just read the manifest can still download them.
+
+    :param panels: active public GenePanelSnapshot list
+    :return: True if new matrix files were written
+    """
+
+    from panels.models import GenePanelSnapshot
+
+    storage = storage or get_storage()
+    if panels is None:
+        panels = list(GenePanelSnapshot.objects.get_active_annotated())
+    panels = sorted(panels, key=lambda panel: panel.panel_id)
+
+    version = hashlib.sha1(
+        ",".join(column_key(panel) for panel in panels).encode("utf-8")
+    ).hexdigest()[:16]
+    manifest = get_manifest(storage)
+    if manifest and manifest["version"] == version:
+        return False
+
+    columns = [load_column(storage, panel) for panel in panels]
+    _remove_stale_columns(storage, panels)
+    matrix = build_matrix(panels, columns)
+
+    def write_tsv(text):
+        csv.writer(text, delimiter="\t").writerows(tsv_rows(matrix))
+
+    _save(storage, MATRIX_FILE.format(version, "tsv"), write_tsv)
+    _save(
+        storage,
+        MATRIX_FILE.format(version, "bin"),
+        lambda f: write_binary(f, matrix),
+        binary=True,
+    )
+
+    new_manifest = {
+        "version": version,
+        "created": timezone.now().isoformat(),
+        "tsv": MATRIX_FILE.format(version, "tsv"),
+        "binary": MATRIX_FILE.format(version, "bin"),
+        "genes": len(matrix["genes"]),
+        "panels": matrix["panels"],
+        "previous": manifest["version"] if manifest else None,
+    }
+    if storage.exists(MATRIX_MANIFEST):
+        storage.delete(MATRIX_MANIFEST)
+    storage.save(
+        MATRIX_MANIFEST, ContentFile(json.dumps(new_manifest).encode("utf-8"))
+    )
+
+    if manifest and manifest.get("previous"):
+        for file_format in ("tsv", "bin"):
+            name = MATRIX_FILE.format(manifest["previous"], file_format)
+            if storage.exists(name):
+                storage.delete(name)
+
+    return True
@@ -0,0 +1,99 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Serialise concurrent edits of the same panel
+
+Version increments lock the GenePanel row until the end of the transaction,
+so edits of the same panel wait for each other in the order they arrived
+while edits of different panels run in parallel. If the lock can't be
+acquired within `PANEL_LOCK_TIMEOUT` milliseconds, or the version was
+changed underneath, the edit is retried with exponential backoff.
+"""
+
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.utils import OperationalError
+
+from panels.exceptions import PanelVersionConflict
+
+logger = logging.getLogger(__name__)
+
+# lock_not_available and deadlock_detected
+RETRY_PGCODES = {"55P03", "40P01"}
+BACKOFF = 0.1
+
+
+def lock_panel(panel_id):
+    """Lock the GenePanel row until the end of the current transaction
+
+    :param panel_id: GenePanel ID
+    """
+
+    from .models import GenePanel
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT current_setting('lock_timeout')")
+        lock_timeout = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT set_config('lock_timeout', %s, true)",
+            ["{}ms".format(settings.PANEL_LOCK_TIMEOUT)],
+        )
+        list(GenePanel.objects.select_for_update().filter(pk=panel_id).values("pk"))
+        cursor.execute("SELECT set_config('lock_timeout', %s, true)", [lock_timeout])
+
+
+def is_retryable(error):
+    if isinstance(error, PanelVersionConflict):
+        return True
+    return getattr(error.__cause__, "pgcode", None) in RETRY_PGCODES
+
+
+def retry_panel_conflicts(func):
+    """Retry the edit if the panel is locked for too long or changed concurrently
+
+    The decorated function must run its changes in a transaction so they are
+    rolled back before it is retried.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except (OperationalError, PanelVersionConflict) as e:
+                if attempt >= settings.PANEL_LOCK_RETRIES or not is_retryable(e):
+                    raise
+                delay = BACKOFF * 2 ** attempt * (1 + random.random())
+                logger.info(
+                    "Panel edit conflict, retrying in %.2fs: %s", delay, e
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    return wrapper
@@ -0,0 +1,249 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Batched and resumable maintenance of large tables
+
+A task walks the primary keys of its model in fixed ranges, `start < pk <= end`,
+so every chunk is a bounded index range scan and nothing is kept in memory
+between chunks. Chunks can be processed by several worker processes, the
+progress is saved in `MaintenanceCheckpoint` in primary key order after each
+finished chunk, and an interrupted run continues from the last checkpoint.
+Chunks are idempotent, so the ones which were in flight are just processed
+again.
+
+Dry runs count the rows each chunk would process without changing anything.
+"""
+
+import abc
+import multiprocessing
+
+from django.db import connection
+from django.db import connections
+from django.db import models
+from django.db import transaction
+from django.db.models import Case
+from django.db.models import Count
+from django.db.models import Max
+from django.db.models import When
+from django.db.models import Value
+from django.utils import timezone
+
+from panels.models import Comment
+from panels.models import Evaluation
+from panels.models import Evidence
+from panels.models import GenePanelSnapshot
+from panels.models import HistoricalSnapshot
+from panels.models import MaintenanceCheckpoint
+from panels.models import TrackRecord
+
+
+class MaintenanceTask(abc.ABC):
+    name = None
+    model = None
+
+    @abc.abstractmethod
+    def candidates_sql(self):
+        """SQL selecting primary keys to process between %(start)s and %(end)s"""
+
+    def candidates(self, start, end):
+        with connection.cursor() as cursor:
+            cursor.execute(self.candidates_sql(), {"start": start, "end": end})
+            return [row[0] for row in cursor.fetchall()]
+
+    def estimate(self, start, end):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM ({}) candidates".format(self.candidates_sql()),
+                {"start": start, "end": end},
+            )
+            return cursor.fetchone()[0]
+
+    @abc.abstractmethod
+    def process(self, start, end):
+        """Process the chunk and return the number of processed rows"""
+
+
+class OrphansCleanup(MaintenanceTask):
+    """Delete rows which aren't referenced by any other model
+
+    Evidence, TrackRecord, Evaluation and Comment are shared by entities via
+    ManyToMany relations, so they stay behind when the entity versions which
+    used them are removed.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.name = "cleanup_{}".format(model._meta.model_name)
+
+    def references(self):
+        """(table, column) pairs pointing to the model"""
+
+        for rel in self.model._meta.related_objects:
+            if rel.many_to_many:
+                yield rel.through._meta.db_table, rel.field.m2m_reverse_name()
+            else:
+                yield rel.related_model._meta.db_table, rel.field.column
+
+    def candidates_sql(self):
+        quote = connection.ops.quote_name
+        pk = quote(self.model._meta.pk.column)
+        conditions = [
+            "NOT EXISTS (SELECT 1 FROM {table} r WHERE r.{column} = t.{pk})".format(
+                table=quote(table), column=quote(column), pk=pk
+            )
+            for table, column in self.references()
+        ]
+        return (
+            "SELECT t.{pk} FROM {table} t "
+            "WHERE t.{pk} > %(start)s AND t.{pk} <= %(end)s AND {conditions}"
+        ).format(
+            pk=pk,
+            table=quote(self.model._meta.db_table),
+            conditions=" AND ".join(conditions),
+        )
+
+    def process(self, start, end):
+        pks = self.candidates(start, end)
+        if pks:
+            with transaction.atomic():
+                self.model.objects.filter(pk__in=pks).delete()
+        return len(pks)
+
+
+class HistoricalSnapshotsPopulation(MaintenanceTask):
+    """Move old GenePanelSnapshot versions to HistoricalSnapshot
+
+    Every version but the latest one of each panel is serialised and deleted.
+    """
+
+    name = "populate_historical_snapshots"
+    model = GenePanelSnapshot
+
+    def candidates_sql(self):
+        return (
+            "SELECT g.id FROM panels_genepanelsnapshot g "
+            "WHERE g.id > %(start)s AND g.id <= %(end)s AND EXISTS ("
+            "SELECT 1 FROM panels_genepanelsnapshot n WHERE n.panel_id = g.panel_id "
+            "AND (n.major_version, n.minor_version, n.modified, n.id) > "
+            "(g.major_version, g.minor_version, g.modified, g.id))"
+        )
+
+    def process(self, start, end):
+        pks = self.candidates(start, end)
+        snapshots = (
+            GenePanelSnapshot.objects.filter(pk__in=pks)
+            .annotate(child_panels_count=Count("child_panels"))
+            .annotate(
+                is_super_panel=Case(
+                    When(child_panels_count__gt=0, then=Value(True)),
+                    default=Value(False),
+                    output_field=models.BooleanField(),
+                )
+            )
+            .order_by("panel_id", "-major_version", "-minor_version")
+        )
+        for gps in snapshots:
+            with transaction.atomic():
+                HistoricalSnapshot.import_panel(panel=gps)
+                gps.delete()
+        return len(pks)
+
+
+TASKS = {
+    task.name: task
+    for task in [
+        HistoricalSnapshotsPopulation(),
+        OrphansCleanup(Evidence),
+        OrphansCleanup(TrackRecord),
+        OrphansCleanup(Evaluation),
+        OrphansCleanup(Comment),
+    ]
+}
+
+
+def _run_chunk(args):
+    name, start, end, dry_run = args
+    task = TASKS[name]
+    return end, task.estimate(start, end) if dry_run else task.process(start, end)
+
+
+def run(task, chunk_size=10000, workers=1, dry_run=False, restart=False, echo=print):
+    """Run the task from its last checkpoint and return the number of processed rows
+
+    :param task: MaintenanceTask registered in TASKS
+    :param chunk_size: width of primary key ranges
+    :param workers: number of worker processes, chunks are processed in this process if 1
+    :param dry_run: only count rows which would be processed, the checkpoint isn't used
+    :param restart: start from the beginning even if the previous run was interrupted
+    :param echo: progress callback
+    """
+
+    checkpoint = None
+    start = 0
+    if not dry_run:
+        checkpoint, _ = MaintenanceCheckpoint.objects.get_or_create(name=task.name)
+        if restart or checkpoint.finished:
+            checkpoint.reset()
+            checkpoint.save()
+        elif checkpoint.last_pk:
+            echo("{}: resuming after pk {}".format(task.name, checkpoint.last_pk))
+        start = checkpoint.last_pk
+
+    max_pk = task.model.objects.aggregate(max_pk=Max("pk"))["max_pk"] or 0
+    chunks = (
+        (task.name, chunk_start, min(chunk_start + chunk_size, max_pk), dry_run)
+        for chunk_start in range(start, max_pk, chunk_size)
+    )
+
+    pool = None
+    if workers > 1:
+        # forked workers open their own database connections
+        connections.close_all()
+        pool = multiprocessing.get_context("fork").Pool(workers)
+        results = pool.imap(_run_chunk, chunks)
+    else:
+        results = map(_run_chunk, chunks)
+
+    total = 0
+    try:
+        for end, count in results:
+            total += count
+            if checkpoint:
+                checkpoint.last_pk = end
+                checkpoint.processed += count
+                checkpoint.save(update_fields=["last_pk", "processed", "modified"])
+            if count:
+                echo(
+                    "{}: {} {} up to pk {}".format(
+                        task.name, "found" if dry_run else "processed", count, end
+                    )
+                )
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+
+    if checkpoint:
+        checkpoint.finished = timezone.now()
+        checkpoint.save(update_fields=["finished", "modified"])
+    return total
@@ -22,45 +22,32 @@
 ## under the License.
 ##
 
-from django.core.paginator import Paginator
-from django.db.models import Count, Q
-
 import djclick as click
 
-from panels.models import Evaluation
-from panels.models import Evidence
-from panels.models import TrackRecord
-from panels.models import Comment
+from panels import maintenance
 
 
 @click.command()
-def command():
+@click.option("--chunk-size", default=10000, help="Primary keys per chunk")
+@click.option("--workers", default=1, help="Number of parallel worker processes")
+@click.option("--dry-run", is_flag=True, help="Only count the rows which would be processed")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint of an interrupted run")
+def command(chunk_size, workers, dry_run, restart):
     """Goes through the database and clears any Evidence, TrackRecord, Evaluation, Comment which were in ManyToMany
     rel and aren't linked to any other models.
 
     Since some tables are quite large (TrackRecord for example), it's best to run this script in a
-    background after the `populate_historical_snapshots`.
+    background after the `populate_historical_snapshots`. Progress is saved after each chunk and
+    an interrupted run continues where it stopped.
     """
 
-    for model_type in [Evidence, TrackRecord, Evaluation, Comment]:
-        qs = model_type.objects\
-            .annotate(g_count=Count('genepanelentrysnapshot'), s_count=Count('str'), r_count=Count('region'))\
-            .exclude(Q(g_count__gt=0) | Q(s_count__gt=0) | Q(r_count__gt=0))
-
-        if model_type == Comment:
-            qs = qs.annotate(e_count=Count('evaluation')).exclude(e_count__gt=0)
-
-        items = qs.order_by('pk').values_list('pk', flat=True)
-        items_pks = list(items)
-
-        total = 0
-        for page in chunked_iterator(items_pks):
-            model_type.objects.filter(pk__in=page).only('pk').delete()
-            total = total + len(page)
-            click.echo('{} Deleted: {}'.format(model_type, len(page)))
-
-
-def chunked_iterator(queryset, chunk_size=50000):
-    paginator = Paginator(queryset, chunk_size)
-    for page in range(1, paginator.num_pages + 1):
-        yield paginator.page(page).object_list
+    for name in ["cleanup_evidence", "cleanup_trackrecord", "cleanup_evaluation", "cleanup_comment"]:
+        total = maintenance.run(
+            maintenance.TASKS[name],
+            chunk_size=chunk_size,
+            workers=workers,
+            dry_run=dry_run,
+            restart=restart,
+            echo=click.echo,
+        )
+        click.echo("{}: {} {}".format(name, "Would delete" if dry_run else "Deleted", total))
@@ -0,0 +1,68 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+import djclick as click
+
+from panels.models import GenePanelSnapshot
+from panels.point_in_time import bundle_chunks
+from panels.point_in_time import parse_timestamp
+from panels.point_in_time import resolve_versions
+
+
+@click.command()
+@click.argument("date")
+@click.option("--panel", "panel_ids", type=int, multiple=True, help="Panel id")
+@click.option("--type", "panel_types", multiple=True, help="Panel type slug")
+@click.option("--output", type=click.File("w"), default="-", help="JSON file")
+def command(date, panel_ids, panel_types, output):
+    """Save the content of panels as they were at DATE as JSON.
+
+    DATE is a date (end of the day) or a datetime, e.g. 2020-01-31T12:00:00Z.
+    Includes all panels with the ids or types given, internal ones too.
+    """
+
+    timestamp = parse_timestamp(date)
+    if timestamp is None:
+        raise click.BadParameter("ISO 8601 date or datetime expected", param_hint="date")
+    if not panel_ids and not panel_types:
+        raise click.UsageError("Panel ids or types are required")
+
+    panels = GenePanelSnapshot.objects.get_active(
+        all=True, internal=True, panel_types=panel_types or None
+    )
+    if panel_ids:
+        panels = panels.filter(panel_id__in=panel_ids)
+    panels = list({panel.panel_id: panel for panel in panels}.values())
+
+    versions, missing = resolve_versions(timestamp, panels)
+    for chunk in bundle_chunks(timestamp, versions, missing):
+        output.write(chunk)
+
+    click.echo(
+        "{} panel versions as of {}".format(len(versions), timestamp.isoformat()),
+        err=True,
+    )
+    if missing:
+        click.echo(
+            "Panels created later: {}".format(", ".join(map(str, missing))), err=True
+        )
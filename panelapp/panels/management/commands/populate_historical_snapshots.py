@@ -24,48 +24,29 @@
 
 import djclick as click
 
-from django.db import models, transaction
-from django.db.models import Case
-from django.db.models import Count
-from django.db.models import When
-from django.db.models import Value
-
-from panels.models import GenePanelSnapshot
-from panels.models import HistoricalSnapshot
+from panels import maintenance
 
 
 @click.command()
-def command():
-
-    latest_panels = (
-        GenePanelSnapshot.objects.all()
-        .distinct("panel_id")
-        .order_by("panel_id", "-major_version", "-minor_version", "-modified", "-pk")
-        .values_list("pk", flat=True)
+@click.option("--chunk-size", default=10000, help="Primary keys per chunk")
+@click.option("--workers", default=1, help="Number of parallel worker processes")
+@click.option("--dry-run", is_flag=True, help="Only count the rows which would be processed")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint of an interrupted run")
+def command(chunk_size, workers, dry_run, restart):
+    """Moves all but the latest version of each panel to HistoricalSnapshot
+
+    Progress is saved after each chunk and an interrupted run continues where it stopped.
+    """
+
+    total = maintenance.run(
+        maintenance.TASKS["populate_historical_snapshots"],
+        chunk_size=chunk_size,
+        workers=workers,
+        dry_run=dry_run,
+        restart=restart,
+        echo=click.echo,
     )
-
-    completed = {'genepanel': 0, 'historical': 0}
-
-    for gps in (
-        GenePanelSnapshot.objects.all()
-        .annotate(child_panels_count=Count("child_panels"))
-        .annotate(
-            is_super_panel=Case(
-                When(child_panels_count__gt=0, then=Value(True)),
-                default=Value(False),
-                output_field=models.BooleanField(),
-            )
-        )
-        .exclude(pk__in=latest_panels)
-        .order_by("panel_id", "-major_version", "-minor_version")
-        .iterator()
-    ):
-        with transaction.atomic():
-            HistoricalSnapshot.import_panel(panel=gps)
-            gps.delete()
-            completed['genepanel'] +=1
-            completed['historical'] +=1
-            if completed['genepanel'] % 1000 == 0:
-                click.echo('Migrated {} Genepanels!'.format(completed['genepanel']))
-
-    click.echo('Populated {} Historical panels from {} Genepanels!'.format(completed['historical'], completed['genepanel']))
+    if dry_run:
+        click.echo("Would populate {} Historical panels".format(total))
+    else:
+        click.echo("Populated {} Historical panels from Genepanels!".format(total))
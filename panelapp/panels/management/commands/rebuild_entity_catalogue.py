@@ -0,0 +1,46 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+import djclick as click
+
+from panels.models import EntityCatalogue
+from panels.models import EntityPanelMembership
+
+
+@click.command()
+def command():
+    """Recreate the entity catalogue and panel memberships used by the entities pages.
+
+    The catalogue is kept up to date when panels change, run it after the
+    initial migration or if the catalogue gets out of sync.
+    """
+
+    EntityCatalogue.objects.rebuild()
+    click.echo("Entity catalogue has {} rows".format(EntityCatalogue.objects.count()))
+
+    EntityPanelMembership.objects.rebuild()
+    click.echo(
+        "Created {} entity panel memberships".format(
+            EntityPanelMembership.objects.count()
+        )
+    )
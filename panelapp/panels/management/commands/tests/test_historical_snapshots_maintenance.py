@@ -0,0 +1,82 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+from django.core.management import call_command
+from accounts.tests.setup import LoginGELUser
+from panels.models import Comment
+from panels.models import Evidence
+from panels.models import GenePanelSnapshot
+from panels.models import HistoricalSnapshot
+from panels.models import MaintenanceCheckpoint
+from panels.tests.factories import CommentFactory
+from panels.tests.factories import EvidenceFactory
+from panels.tests.factories import GenePanelSnapshotFactory
+from panels.tests.factories import GenePanelEntrySnapshotFactory
+from panels import maintenance
+
+
+class HistoricalSnapshotsMaintenanceTest(LoginGELUser):
+    def test_populate_historical_snapshots(self):
+        old = GenePanelSnapshotFactory()
+        GenePanelEntrySnapshotFactory.create_batch(2, panel=old)
+        latest = GenePanelSnapshotFactory(panel=old.panel, minor_version=1)
+
+        call_command("populate_historical_snapshots", "--dry-run")
+        self.assertTrue(GenePanelSnapshot.objects.filter(pk=old.pk).exists())
+        self.assertFalse(MaintenanceCheckpoint.objects.exists())
+
+        call_command("populate_historical_snapshots", "--chunk-size", "1")
+        self.assertEqual(
+            list(GenePanelSnapshot.objects.filter(panel=old.panel)), [latest]
+        )
+        snapshot = HistoricalSnapshot.objects.get(panel=old.panel)
+        self.assertEqual((snapshot.major_version, snapshot.minor_version), (0, 0))
+        self.assertEqual(len(snapshot.data["genes"]), 2)
+
+        checkpoint = MaintenanceCheckpoint.objects.get(
+            name="populate_historical_snapshots"
+        )
+        self.assertEqual(checkpoint.processed, 1)
+        self.assertIsNotNone(checkpoint.finished)
+
+    def test_cleanup_resumes_from_checkpoint(self):
+        used = EvidenceFactory()
+        GenePanelEntrySnapshotFactory(evidence=[used])
+        orphans = EvidenceFactory.create_batch(2)
+        comment = CommentFactory()
+
+        task = maintenance.TASKS["cleanup_evidence"]
+        self.assertEqual(maintenance.run(task, dry_run=True, echo=lambda msg: None), 2)
+
+        # an interrupted run which got past the first orphan
+        MaintenanceCheckpoint.objects.create(name=task.name, last_pk=orphans[0].pk)
+        call_command("historical_snapshots_cleanup")
+
+        self.assertTrue(Evidence.objects.filter(pk=used.pk).exists())
+        self.assertTrue(Evidence.objects.filter(pk=orphans[0].pk).exists())
+        self.assertFalse(Evidence.objects.filter(pk=orphans[1].pk).exists())
+        self.assertFalse(Comment.objects.filter(pk=comment.pk).exists())
+
+        # finished runs start from the beginning
+        call_command("historical_snapshots_cleanup")
+        self.assertFalse(Evidence.objects.filter(pk=orphans[0].pk).exists())
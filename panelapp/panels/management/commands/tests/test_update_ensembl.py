@@ -85,14 +85,14 @@ class CommandUpdateEnsemblTest(LoginGELUser):
 
         # make sure ensembl data doesn't match
         for gene in GenePanelEntrySnapshot.objects.filter(
-            gene__gene_symbol=gene_symbol
+            gene_core__gene_symbol=gene_symbol
         ):
             self.assertNotEqual(gene.gene.get("ensembl_genes"), ensembl_data)
 
-        for str in STR.objects.filter(gene__gene_symbol=gene_symbol):
+        for str in STR.objects.filter(gene_core__gene_symbol=gene_symbol):
             self.assertNotEqual(str.gene.get("ensembl_genes"), ensembl_data)
 
-        for region in Region.objects.filter(gene__gene_symbol=gene_symbol):
+        for region in Region.objects.filter(gene_core__gene_symbol=gene_symbol):
             self.assertNotEqual(region.gene.get("ensembl_genes"), ensembl_data)
 
         gps_pk = gps.pk
@@ -120,12 +120,12 @@ class CommandUpdateEnsemblTest(LoginGELUser):
 
         # make sure new data has changed
         for gene in GenePanelEntrySnapshot.objects.filter(
-            gene__gene_symbol=gene_symbol, panel=gps
+            gene_core__gene_symbol=gene_symbol, panel=gps
         ):
             self.assertEqual(gene.gene.get("ensembl_genes"), ensembl_data)
 
-        for str in STR.objects.filter(gene__gene_symbol=gene_symbol, panel=gps):
+        for str in STR.objects.filter(gene_core__gene_symbol=gene_symbol, panel=gps):
             self.assertEqual(str.gene.get("ensembl_genes"), ensembl_data)
 
-        for region in Region.objects.filter(gene__gene_symbol=gene_symbol, panel=gps):
+        for region in Region.objects.filter(gene_core__gene_symbol=gene_symbol, panel=gps):
             self.assertEqual(region.gene.get("ensembl_genes"), ensembl_data)
@@ -93,7 +93,7 @@ def process(json_data):
         unique_panels.update(
             list(
                 m.objects.get_active(pks=active_panels)
-                .filter(gene__gene_symbol__in=gene_keys)
+                .filter(gene_core__gene_symbol__in=gene_keys)
                 .values_list("panel_id", flat=True)
             )
         )
@@ -108,13 +108,13 @@ def process(json_data):
         # find all genes
         genes_in_panels = GenePanelEntrySnapshot.objects.get_active(
             pks=active_panels
-        ).filter(gene__gene_symbol__in=gene_keys)
+        ).filter(gene_core__gene_symbol__in=gene_keys)
         grouped_genes = {gp.gene_core.gene_symbol: [] for gp in genes_in_panels}
         for gene_in_panel in genes_in_panels:
             grouped_genes[gene_in_panel.gene_core.gene_symbol].append(gene_in_panel)
 
         strs_in_panels = STR.objects.get_active(pks=active_panels).filter(
-            gene__gene_symbol__in=gene_keys
+            gene_core__gene_symbol__in=gene_keys
         )
         grouped_strs = {
             gp.gene_core.gene_symbol: [] for gp in strs_in_panels if gp.gene_core
@@ -123,7 +123,7 @@ def process(json_data):
             grouped_strs[str_in_panel.gene_core.gene_symbol].append(str_in_panel)
 
         regions_in_panels = Region.objects.get_active(pks=active_panels).filter(
-            gene__gene_symbol__in=gene_keys
+            gene_core__gene_symbol__in=gene_keys
         )
         grouped_regions = {
             gp.gene_core.gene_symbol: [] for gp in regions_in_panels if gp.gene_core
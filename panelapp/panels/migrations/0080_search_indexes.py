@@ -0,0 +1,66 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+ARRAY_TO_STRING_FUNCTION = """
+CREATE OR REPLACE FUNCTION panelapp_array_to_string(text[]) RETURNS text
+    AS $$ SELECT array_to_string($1, ' ') $$
+    LANGUAGE sql IMMUTABLE;
+"""
+
+TRIGRAM_INDEXES = [
+    ("panels_genepanel", "panels_genepanel_name_trgm", "UPPER(name)"),
+    ("panels_level4title", "panels_level4title_name_trgm", "UPPER(name)"),
+    ("panels_level4title", "panels_level4title_level2title_trgm", "UPPER(level2title)"),
+    ("panels_level4title", "panels_level4title_level3title_trgm", "UPPER(level3title)"),
+    (
+        "panels_genepanelsnapshot",
+        "panels_genepanelsnapshot_old_panels_trgm",
+        "UPPER(panelapp_array_to_string(old_panels::text[]))",
+    ),
+    ("panels_str", "panels_str_name_trgm", "UPPER(name)"),
+    ("panels_region", "panels_region_name_trgm", "UPPER(name)"),
+    (
+        "panels_genepanelentrysnapshot",
+        "panels_genepanelentrysnapshot_phenotypes_trgm",
+        "UPPER(panelapp_array_to_string(phenotypes::text[]))",
+    ),
+    (
+        "panels_str",
+        "panels_str_phenotypes_trgm",
+        "UPPER(panelapp_array_to_string(phenotypes::text[]))",
+    ),
+    (
+        "panels_region",
+        "panels_region_phenotypes_trgm",
+        "UPPER(panelapp_array_to_string(phenotypes::text[]))",
+    ),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0079_gene_hgnc_id_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(
+            ARRAY_TO_STRING_FUNCTION,
+            "DROP FUNCTION IF EXISTS panelapp_array_to_string(text[]);",
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS panels_gene_gene_symbol_upper "
+            "ON panels_gene (UPPER(gene_symbol));",
+            "DROP INDEX IF EXISTS panels_gene_gene_symbol_upper;",
+        ),
+    ] + [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (({expression}) gin_trgm_ops);".format(
+                table=table, name=name, expression=expression
+            ),
+            "DROP INDEX IF EXISTS {};".format(name),
+        )
+        for table, name, expression in TRIGRAM_INDEXES
+    ]
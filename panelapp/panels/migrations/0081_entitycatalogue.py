@@ -0,0 +1,99 @@
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from collections import defaultdict
+
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def active_panels(apps):
+    """Latest version of each panel which isn't deleted"""
+
+    GenePanelSnapshot = apps.get_model('panels', 'GenePanelSnapshot')
+    return (
+        GenePanelSnapshot.objects.exclude(panel__status='deleted')
+        .distinct('panel_id')
+        .order_by('panel_id', '-major_version', '-minor_version', '-modified', '-pk')
+        .values('pk')
+    )
+
+
+def populate_catalogue(apps, schema_editor):
+    """Same rows as EntityCatalogue.objects.rebuild() with the models of this migration"""
+
+    EntityCatalogue = apps.get_model('panels', 'EntityCatalogue')
+    sources = [
+        (
+            'gene',
+            apps.get_model('panels', 'GenePanelEntrySnapshot').objects.filter(gene_core__active=True),
+            'gene_core__gene_symbol',
+        ),
+        ('str', apps.get_model('panels', 'STR').objects.all(), 'name'),
+        ('region', apps.get_model('panels', 'Region').objects.all(), 'name'),
+    ]
+
+    catalogue = defaultdict(set)
+    for entity_type, qs, name_field in sources:
+        rows = qs.filter(panel__in=active_panels(apps)).values_list(
+            name_field, 'panel__panel_id', 'panel__panel__status', 'tags__name'
+        )
+        for name, panel_id, status, tag in rows.iterator():
+            visibilities = ['gel']
+            if status in ['public', 'promoted']:
+                visibilities.append('public')
+
+            for visibility in visibilities:
+                catalogue[(entity_type, name, visibility, '')].add(panel_id)
+                if tag:
+                    catalogue[(entity_type, name, visibility, tag)].add(panel_id)
+
+    EntityCatalogue.objects.bulk_create(
+        (
+            EntityCatalogue(
+                entity_type=entity_type,
+                name=name,
+                sort_name=name.lower(),
+                visibility=visibility,
+                tag=tag,
+                panel_ids=sorted(panel_ids),
+            )
+            for (entity_type, name, visibility, tag), panel_ids in catalogue.items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0080_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityCatalogue',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(max_length=16)),
+                ('name', models.CharField(max_length=255)),
+                ('sort_name', models.CharField(max_length=255)),
+                ('visibility', models.CharField(choices=[('public', 'Public'), ('gel', 'GEL reviewers')], max_length=16)),
+                ('tag', models.CharField(blank=True, default='', max_length=255)),
+                ('panel_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), default=list, size=None)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='entitycatalogue',
+            unique_together={('entity_type', 'name', 'visibility', 'tag')},
+        ),
+        migrations.AddIndex(
+            model_name='entitycatalogue',
+            index=models.Index(fields=['visibility', 'tag', 'sort_name'], name='panels_enti_visibil_sort_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entitycatalogue',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['panel_ids'], name='panels_enti_panel_ids_gin'),
+        ),
+        migrations.RunPython(populate_catalogue, migrations.RunPython.noop),
+    ]
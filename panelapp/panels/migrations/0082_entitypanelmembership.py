@@ -0,0 +1,78 @@
+import django.contrib.postgres.fields.jsonb
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def populate_memberships(apps, schema_editor):
+    """Same rows as EntityPanelMembership.objects.rebuild() with the models of this migration"""
+
+    GenePanelSnapshot = apps.get_model('panels', 'GenePanelSnapshot')
+    EntityPanelMembership = apps.get_model('panels', 'EntityPanelMembership')
+
+    latest = (
+        GenePanelSnapshot.objects.exclude(panel__status='deleted')
+        .distinct('panel_id')
+        .order_by('panel_id', '-major_version', '-minor_version', '-modified', '-pk')
+        .values('pk')
+    )
+    panels = GenePanelSnapshot.objects.filter(pk__in=latest).select_related('panel')
+    for panel in panels.iterator():
+        superpanels = [
+            {'name': name, 'status': status}
+            for name, status in panel.genepanelsnapshot_set.values_list(
+                'level4title__name', 'panel__status'
+            ).distinct()
+        ]
+        rows = []
+        for entity_type, entities, name_field in [
+            ('gene', panel.genepanelentrysnapshot_set.all(), 'gene_core_id'),
+            ('str', panel.str_set.all(), 'name'),
+            ('region', panel.region_set.all(), 'name'),
+        ]:
+            for pk, name, gene_symbol, confidence_level, moi in entities.values_list(
+                'pk', name_field, 'gene_core_id', 'saved_gel_status', 'moi'
+            ):
+                rows.append(
+                    EntityPanelMembership(
+                        entity_type=entity_type,
+                        entity_id=pk,
+                        entity_name=name,
+                        gene_symbol=gene_symbol,
+                        panel=panel,
+                        panel_name=panel.panel.name,
+                        panel_status=panel.panel.status,
+                        confidence_level=confidence_level,
+                        moi=moi,
+                        superpanels=superpanels,
+                    )
+                )
+        EntityPanelMembership.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0081_entitycatalogue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityPanelMembership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(max_length=16)),
+                ('entity_id', models.IntegerField()),
+                ('entity_name', models.CharField(db_index=True, max_length=255)),
+                ('gene_symbol', models.CharField(db_index=True, max_length=255, null=True)),
+                ('panel_name', models.CharField(max_length=255)),
+                ('panel_status', models.CharField(max_length=36)),
+                ('confidence_level', models.IntegerField(null=True)),
+                ('moi', models.CharField(max_length=255, null=True)),
+                ('superpanels', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+                ('panel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='panels.GenePanelSnapshot')),
+            ],
+        ),
+        migrations.RunPython(populate_memberships, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def populate_metadata(apps, schema_editor):
+    """Copy the panel fields in batches, each batch is committed on its own"""
+
+    HistoricalSnapshot = apps.get_model('panels', 'HistoricalSnapshot')
+    last_id = HistoricalSnapshot.objects.order_by('-id').values_list('id', flat=True).first()
+    if last_id is None:
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, last_id + 1, BATCH_SIZE):
+            cursor.execute(
+                "UPDATE panels_historicalsnapshot "
+                "SET metadata = data - 'genes' - 'strs' - 'regions' "
+                "WHERE id >= %s AND id < %s AND metadata IS NULL",
+                [start, start + BATCH_SIZE],
+            )
+
+
+class Migration(migrations.Migration):
+    # snapshots are large, don't rewrite the whole table in one transaction
+    atomic = False
+
+    dependencies = [
+        ('panels', '0082_entitypanelmembership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalsnapshot',
+            name='metadata',
+            field=django.contrib.postgres.fields.jsonb.JSONField(null=True),
+        ),
+        migrations.RunPython(populate_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,152 @@
+import hashlib
+import json
+
+import django.contrib.postgres.fields.jsonb
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+ENTITY_MODELS = ["GenePanelEntrySnapshot", "STR", "Region"]
+CHUNK_SIZE = 5000
+
+
+def canonical_json(data):
+    return json.dumps(
+        data,
+        cls=django.core.serializers.json.DjangoJSONEncoder,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+def gene_columns_size(schema_editor, tables):
+    """Stored bytes of the `gene` values, compressed and TOASTed as on disk"""
+
+    total = 0
+    with schema_editor.connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(
+                "SELECT COALESCE(SUM(pg_column_size(gene)), 0) FROM {}".format(table)
+            )
+            total += cursor.fetchone()[0]
+    return total
+
+
+def store_payloads(apps, schema_editor):
+    GenePayload = apps.get_model("panels", "GenePayload")
+    models_ = [apps.get_model("panels", name) for name in ENTITY_MODELS]
+    tables = [model._meta.db_table for model in models_]
+
+    columns_size = gene_columns_size(schema_editor, tables)
+
+    payloads = {}
+    for model in models_:
+        pks_by_hash = {}
+        rows = (
+            model.objects.exclude(gene=None)
+            .values_list("pk", "gene", "gene_core_id")
+            .iterator()
+        )
+        for pk, data, gene_id in rows:
+            content = canonical_json(data)
+            payload_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+            if payload_hash not in payloads:
+                payloads[payload_hash] = GenePayload(
+                    hash=payload_hash, gene_id=gene_id, data=json.loads(content)
+                )
+            pks_by_hash.setdefault(payload_hash, []).append(pk)
+
+        new_hashes = set(payloads) - set(
+            GenePayload.objects.values_list("pk", flat=True)
+        )
+        GenePayload.objects.bulk_create(
+            [payloads[h] for h in new_hashes], batch_size=CHUNK_SIZE
+        )
+
+        for payload_hash, pks in pks_by_hash.items():
+            for i in range(0, len(pks), CHUNK_SIZE):
+                model.objects.filter(pk__in=pks[i : i + CHUNK_SIZE]).update(
+                    gene_payload_id=payload_hash
+                )
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_total_relation_size(%s)", [GenePayload._meta.db_table]
+        )
+        payloads_size = cursor.fetchone()[0]
+
+    # HistoricalSnapshot.data keeps its own copy of the gene data of old
+    # versions and isn't changed here
+    print(
+        "\n  Gene data: {:.1f} MB in the gene columns of {}, {:.1f} MB for {} "
+        "payloads including indexes. The dropped columns keep their space "
+        "until VACUUM FULL of these tables.".format(
+            columns_size / 1024 ** 2,
+            ", ".join(tables),
+            payloads_size / 1024 ** 2,
+            len(payloads),
+        )
+    )
+
+
+def restore_gene_data(apps, schema_editor):
+    GenePayload = apps.get_model("panels", "GenePayload")
+    for name in ENTITY_MODELS:
+        table = apps.get_model("panels", name)._meta.db_table
+        schema_editor.execute(
+            "UPDATE {table} SET gene = payload.data FROM {payloads} payload "
+            "WHERE payload.hash = {table}.gene_payload_id".format(
+                table=table, payloads=GenePayload._meta.db_table
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0083_historicalsnapshot_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenePayload',
+            fields=[
+                ('hash', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('gene', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='panels.Gene')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='genepanelentrysnapshot',
+            name='gene_payload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='panels.GenePayload'),
+        ),
+        migrations.AddField(
+            model_name='str',
+            name='gene_payload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='panels.GenePayload'),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='gene_payload',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='panels.GenePayload'),
+        ),
+        migrations.AlterField(
+            model_name='genepanelentrysnapshot',
+            name='gene',
+            field=django.contrib.postgres.fields.jsonb.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+        migrations.RunPython(store_payloads, restore_gene_data),
+        migrations.RemoveField(
+            model_name='genepanelentrysnapshot',
+            name='gene',
+        ),
+        migrations.RemoveField(
+            model_name='str',
+            name='gene',
+        ),
+        migrations.RemoveField(
+            model_name='region',
+            name='gene',
+        ),
+    ]
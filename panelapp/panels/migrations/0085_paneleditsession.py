@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('panels', '0084_genepayload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PanelEditSession',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('version_incremented', models.BooleanField(default=False)),
+                ('changes', models.PositiveIntegerField(default=0)),
+                ('sealed', models.DateTimeField(blank=True, null=True)),
+                ('panel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='edit_sessions', to='panels.GenePanel')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.RunSQL(
+            "CREATE UNIQUE INDEX panels_paneleditsession_open "
+            "ON panels_paneleditsession (panel_id) WHERE sealed IS NULL",
+            reverse_sql="DROP INDEX panels_paneleditsession_open",
+        ),
+    ]
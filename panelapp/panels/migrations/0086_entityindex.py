@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0085_paneleditsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(max_length=16)),
+                ('name', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='entityindex',
+            unique_together={('entity_type', 'name')},
+        ),
+    ]
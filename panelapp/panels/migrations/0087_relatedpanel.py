@@ -0,0 +1,32 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0086_entityindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPanel',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visibility', models.CharField(choices=[('public', 'Public'), ('gel', 'GEL reviewers')], max_length=16)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('shared_entities', models.PositiveIntegerField()),
+                ('shared_green_genes', models.PositiveIntegerField()),
+                ('panel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_panels', to='panels.GenePanel')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='panels.GenePanel')),
+            ],
+            options={
+                'ordering': ['panel', 'visibility', 'rank'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='relatedpanel',
+            index=models.Index(fields=['panel', 'visibility', 'rank'], name='panels_rela_panel_rank_idx'),
+        ),
+    ]
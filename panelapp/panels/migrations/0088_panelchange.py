@@ -0,0 +1,28 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0087_relatedpanel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PanelChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('panel_version', models.CharField(max_length=16)),
+                ('kind', models.CharField(choices=[('version', 'New version'), ('promoted', 'Promoted'), ('status', 'Status changed'), ('added', 'Entity added'), ('updated', 'Entity updated'), ('removed', 'Entity removed'), ('reviewed', 'Entity reviewed')], max_length=16)),
+                ('entity_type', models.CharField(blank=True, max_length=16)),
+                ('entity_name', models.CharField(blank=True, max_length=255)),
+                ('panel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='panels.GenePanel')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.conf import settings
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+import panels.models.webhook_subscription
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('panels', '0088_panelchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookSubscription',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', model_utils.fields.AutoCreatedField(default=django.utils.timezone.now, editable=False, verbose_name='created')),
+                ('modified', model_utils.fields.AutoLastModifiedField(default=django.utils.timezone.now, editable=False, verbose_name='modified')),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(default=panels.models.webhook_subscription.generate_secret, help_text='Key of the HMAC SHA256 signature in X-PanelApp-Signature', max_length=128)),
+                ('events', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(choices=[('version', 'New version'), ('promoted', 'Promoted'), ('status', 'Status changed'), ('added', 'Entity added'), ('updated', 'Entity updated'), ('removed', 'Entity removed'), ('reviewed', 'Entity reviewed')], max_length=16), default=panels.models.webhook_subscription.default_events, size=None)),
+                ('include_internal', models.BooleanField(default=False, help_text="Include changes of panels which aren't public")),
+                ('active', models.BooleanField(default=True)),
+                ('batch_size', models.PositiveIntegerField(default=100)),
+                ('max_deliveries_per_minute', models.PositiveIntegerField(default=60)),
+                ('last_sequence', models.BigIntegerField(blank=True, help_text='Last change delivered', null=True)),
+                ('last_delivery', models.DateTimeField(blank=True, null=True)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('panels', models.ManyToManyField(blank=True, help_text='Only changes of these panels, all if empty', to='panels.GenePanel')),
+                ('user', models.ForeignKey(blank=True, help_text='Account of the integration, not emailed about events it receives', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='webhook_subscriptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0089_webhooksubscription'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalsnapshot',
+            name='version_created',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE panels_historicalsnapshot "
+            "SET version_created = (data->>'version_created')::timestamptz "
+            "WHERE data->>'version_created' IS NOT NULL",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='historicalsnapshot',
+            index=models.Index(fields=['panel', 'version_created'], name='panels_hist_panel_created_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0091_maintenancecheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuperPanelUpdate',
+            fields=[
+                ('panel', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='panels.GenePanel')),
+                ('major', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
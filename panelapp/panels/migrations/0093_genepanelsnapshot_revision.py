@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0092_superpanelupdate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genepanelsnapshot',
+            name='revision',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0094_webhooksubscription_rate_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='panelchange',
+            name='sequence',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE panels_panelchange SET sequence = id",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
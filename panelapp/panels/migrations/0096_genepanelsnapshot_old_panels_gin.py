@@ -0,0 +1,16 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0095_panelchange_sequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='genepanelsnapshot',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['old_panels'], name='panels_gene_old_panels_gin'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('panels', '0096_genepanelsnapshot_old_panels_gin'),
+    ]
+
+    operations = [
+        # entities list filters by the beginning of the lower-cased name
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS panels_enti_sort_name_prefix "
+            "ON panels_entitycatalogue (visibility, tag, sort_name varchar_pattern_ops);",
+            "DROP INDEX IF EXISTS panels_enti_sort_name_prefix;",
+        ),
+    ]
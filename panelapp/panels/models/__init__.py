@@ -55,6 +55,7 @@ to the Postgres it makes sense to keep the gene panel entry backup as a JSON.
 from .codes import ProcessingRunCode  # noqa
 from .tag import Tag  # noqa
 from .gene import Gene  # noqa
+from .gene_payload import GenePayload  # noqa
 from .activity import Activity  # noqa
 from .Level4Title import Level4Title  # noqa
 from .comment import Comment  # noqa
@@ -72,3 +73,12 @@ from .region import Region  # noqa
 from .panel_types import PanelType  # noqa
 from .historical_snapshot import HistoricalSnapshot  # noqa
 from .literature_assignment import LiteratureAssignment  # noqa
+from .entity_catalogue import EntityCatalogue  # noqa
+from .entity_panel_membership import EntityPanelMembership  # noqa
+from .panel_edit_session import PanelEditSession  # noqa
+from .entity_index import EntityIndex  # noqa
+from .related_panel import RelatedPanel  # noqa
+from .panel_change import PanelChange  # noqa
+from .webhook_subscription import WebhookSubscription  # noqa
+from .maintenance_checkpoint import MaintenanceCheckpoint  # noqa
+from .super_panel_update import SuperPanelUpdate  # noqa
@@ -77,6 +77,12 @@ class Activity(TimeStampedModel):
 
     @classmethod
     def log(cls, user, panel_snapshot, text, extra_info):
+        cls.build(user, panel_snapshot, text, extra_info).save()
+
+    @classmethod
+    def build(cls, user, panel_snapshot, text, extra_info):
+        """Unsaved activity, so many of them can be created with `bulk_create`"""
+
         extra_data = deepcopy(extra_info)
 
         if user:
@@ -93,7 +99,7 @@ class Activity(TimeStampedModel):
         else:
             extra_data["item_type"] = "panel"
 
-        cls.objects.create(
+        return cls(
             user=user,
             panel=panel_snapshot.panel,
             text=text,
@@ -41,6 +41,8 @@ from .comment import Comment
 from .trackrecord import TrackRecord
 from .evidence import Evidence
 from .genepanel import GenePanel
+from .panel_change import PanelChange
+from .gene_payload import GenePayload
 from panels.templatetags.panel_helpers import get_gene_list_data
 from panels.templatetags.panel_helpers import GeneDataType
 
@@ -77,7 +79,7 @@ class EntityManager(Manager):
         if name:
             qs = qs.filter(name=name)
         if gene_symbol:
-            qs = qs.filter(gene__gene_symbol=gene_symbol)
+            qs = qs.filter(gene_core__gene_symbol=gene_symbol)
 
         return (
             qs.annotate(
@@ -116,6 +118,40 @@ class AbstractEntity:
         (0, "No List (delete)"),
     )
 
+    @property
+    def gene(self):
+        """Gene data copied from `Gene.dict_tr()`, see `GenePayload`"""
+
+        if "_gene" not in self.__dict__:
+            if self.gene_payload_id is None:
+                self._gene = None
+            else:
+                if self._meta.get_field("gene_payload").is_cached(self):
+                    data = self.gene_payload.data
+                else:
+                    data = GenePayload.objects.resolve(self.gene_payload_id)
+                # copy, as payloads are shared and entities change gene data
+                self._gene = dict(data)
+        return self._gene
+
+    @gene.setter
+    def gene(self, value):
+        self._gene = value
+
+    def save(self, *args, **kwargs):
+        if "_gene" in self.__dict__:
+            if self._gene is None:
+                self.gene_payload = None
+            else:
+                self.gene_payload = GenePayload.objects.for_data(
+                    self._gene, self.gene_core_id
+                )
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, *args, **kwargs):
+        self.__dict__.pop("_gene", None)
+        super().refresh_from_db(*args, **kwargs)
+
     def approve_entity(self):
         self.flagged = False
         self.save()
@@ -269,16 +305,25 @@ class AbstractEntity:
             )
 
     def aggregate_ratings(self):
-        """Gets stats about the gene, i.e. % of green, red, amber evaluations"""
+        """Gets stats about the gene, i.e. % of green, red, amber evaluations
+
+        Uses the rating counts annotated by `GenePanelSnapshot.get_all_extra`
+        when they are available, otherwise loads the evaluations.
+        """
 
-        green, red, amber = 0, 0, 0
-        for ev in self.evaluation.all():
-            if ev.rating == Evaluation.RATINGS.GREEN:
-                green += 1
-            elif ev.rating == Evaluation.RATINGS.RED:
-                red += 1
-            elif ev.rating == Evaluation.RATINGS.AMBER:
-                amber += 1
+        if hasattr(self, "number_of_amber_evaluations"):
+            green = self.number_of_green_evaluations
+            red = self.number_of_red_evaluations
+            amber = self.number_of_amber_evaluations
+        else:
+            green, red, amber = 0, 0, 0
+            for ev in self.evaluation.all():
+                if ev.rating == Evaluation.RATINGS.GREEN:
+                    green += 1
+                elif ev.rating == Evaluation.RATINGS.RED:
+                    red += 1
+                elif ev.rating == Evaluation.RATINGS.AMBER:
+                    amber += 1
 
         total = green + red + amber
         if green + red + amber > 0:
@@ -585,21 +630,57 @@ class AbstractEntity:
             Evaluation: new or updated evaluation
         """
 
-        activities = []
-
         try:
             evaluation = self.evaluation.get(user=user)
+        except Evaluation.DoesNotExist:
+            evaluation = None
+
+        evaluation, comment, activity_text = self.prepare_evaluation(
+            user, evaluation_data, evaluation
+        )
+
+        created = evaluation.pk is None
+        evaluation.save()
+        if created:
+            self.evaluation.add(evaluation)
+
+        if comment:
+            comment.save()
+            evaluation.comments.add(comment)
+
+        if activity_text:
+            self.panel.add_activity(user, activity_text, self)
+        PanelChange.objects.record(self.panel, PanelChange.KIND.reviewed, self)
+        return evaluation
+
+    def prepare_evaluation(self, user, evaluation_data, evaluation=None):
+        """Apply `evaluation_data` to the user evaluation without saving anything
+
+        Used by `update_evaluation` and to save many evaluations at once.
+
+        args:
+            user (User): User that this evaluation belongs to
+            evaluation_data (dict): same as in `update_evaluation`
+            evaluation (Evaluation): existing evaluation of the user, None for a new one
+
+        returns:
+            tuple: (Evaluation, Comment or None, activity text or None)
+        """
+
+        comment = None
+        if evaluation_data.get("comment"):
+            comment = Comment(
+                user=user,
+                comment=evaluation_data.get("comment"),
+                version=self.panel.version,
+                last_updated=timezone.now(),
+            )
 
+        if evaluation:
+            activities = []
             changed = False
 
-            if evaluation_data.get("comment"):
-                comment = Comment.objects.create(
-                    user=user,
-                    comment=evaluation_data.get("comment"),
-                    version=self.panel.version,
-                    last_updated=timezone.now(),
-                )
-                evaluation.comments.add(comment)
+            if comment:
                 activities.append(
                     "Added comment: {}".format(evaluation_data.get("comment"))
                 )
@@ -670,77 +751,61 @@ class AbstractEntity:
                 activity_text = "edited their review of {}: {}".format(
                     self.label, "; ".join(activities)
                 )
-            elif evaluation_data.get("comment"):
+            elif comment:
                 activity_text = "commented on {}: {}".format(
                     self.label, evaluation_data.get("comment")
                 )
 
-            if activity_text:
-                self.panel.add_activity(user, activity_text, self)
-
-            evaluation.save()
-            return evaluation
-
-        except Evaluation.DoesNotExist:
-            evaluation = Evaluation.objects.create(
-                user=user,
-                rating=evaluation_data.get("rating"),
-                mode_of_pathogenicity=evaluation_data.get("mode_of_pathogenicity"),
-                publications=evaluation_data.get("publications"),
-                phenotypes=evaluation_data.get("phenotypes"),
-                moi=evaluation_data.get("moi"),
-                current_diagnostic=evaluation_data.get("current_diagnostic"),
-                clinically_relevant=evaluation_data.get("clinically_relevant"),
-                version=self.panel.version,
-                last_updated=timezone.now(),
-            )
-            self.evaluation.add(evaluation)
+            return evaluation, comment, activity_text
 
-            if evaluation_data.get("comment"):
-                comment = Comment.objects.create(
-                    user=user,
-                    comment=evaluation_data.get("comment"),
-                    version=self.panel.version,
-                    last_updated=timezone.now(),
-                )
-                evaluation.comments.add(comment)
+        evaluation = Evaluation(
+            user=user,
+            rating=evaluation_data.get("rating"),
+            mode_of_pathogenicity=evaluation_data.get("mode_of_pathogenicity"),
+            publications=evaluation_data.get("publications"),
+            phenotypes=evaluation_data.get("phenotypes"),
+            moi=evaluation_data.get("moi"),
+            current_diagnostic=evaluation_data.get("current_diagnostic"),
+            clinically_relevant=evaluation_data.get("clinically_relevant"),
+            version=self.panel.version,
+            last_updated=timezone.now(),
+        )
 
-            if evaluation.is_comment_without_review():
-                activity_text = "commented on {}".format(self.label)
-            else:
-                activities = [
-                    "Rating: {}".format(evaluation_data.get("rating")),
-                    "Mode of pathogenicity: {}".format(
-                        evaluation_data.get("mode_of_pathogenicity")
-                    ),
-                    "Publications: {}".format(
-                        ", ".join(evaluation_data.get("publications"))
-                    ),
-                    "Phenotypes: {}".format(
-                        ", ".join(evaluation_data.get("phenotypes"))
-                    ),
-                    "Mode of inheritance: {}".format(evaluation_data.get("moi")),
-                ]
-                if evaluation_data.get("current_diagnostic"):
-                    activities.append(
-                        "Current diagnostic: {}".format(
-                            "yes" if evaluation_data.get("current_diagnostic") else "no"
-                        )
+        if evaluation.is_comment_without_review():
+            activity_text = "commented on {}".format(self.label)
+        else:
+            activities = [
+                "Rating: {}".format(evaluation_data.get("rating")),
+                "Mode of pathogenicity: {}".format(
+                    evaluation_data.get("mode_of_pathogenicity")
+                ),
+                "Publications: {}".format(
+                    ", ".join(evaluation_data.get("publications"))
+                ),
+                "Phenotypes: {}".format(
+                    ", ".join(evaluation_data.get("phenotypes"))
+                ),
+                "Mode of inheritance: {}".format(evaluation_data.get("moi")),
+            ]
+            if evaluation_data.get("current_diagnostic"):
+                activities.append(
+                    "Current diagnostic: {}".format(
+                        "yes" if evaluation_data.get("current_diagnostic") else "no"
                     )
-                if evaluation_data.get("clinically_relevant"):
-                    activities.append(
-                        "Clinically relevant: {}".format(
-                            "yes"
-                            if evaluation_data.get("clinically_relevant")
-                            else "no"
-                        )
+                )
+            if evaluation_data.get("clinically_relevant"):
+                activities.append(
+                    "Clinically relevant: {}".format(
+                        "yes"
+                        if evaluation_data.get("clinically_relevant")
+                        else "no"
                     )
-                activity_text = "reviewed {}: {}".format(
-                    self.label, "; ".join(activities)
                 )
+            activity_text = "reviewed {}: {}".format(
+                self.label, "; ".join(activities)
+            )
 
-            self.panel.add_activity(user, activity_text, self)
-            return evaluation
+        return evaluation, comment, activity_text
 
     @property
     def gene_list_class(self):
@@ -0,0 +1,223 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Materialised list of entities in the active panels
+
+One row per entity type, name, visibility and tag. Rows with an empty `tag`
+list every entity regardless of tags. `panel_ids` keeps track of the panels
+the entity belongs to, so the rows can be refreshed when a panel changes.
+"""
+
+import zlib
+from collections import defaultdict
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import connection
+from django.db import models
+from django.db import transaction
+from model_utils import Choices
+
+from .genepanel import GenePanel
+
+# arbitrary namespace of the advisory locks on entity names
+CATALOGUE_LOCK = 724152
+
+
+class EntityCatalogueManager(models.Manager):
+    def get_entities(self, gel_reviewer=False, tag=None, name=None, entity_types=None):
+        """Entities ordered by name, case insensitive
+
+        `name` matches the beginning of the entity name, case insensitive.
+        """
+
+        if gel_reviewer:
+            visibility = EntityCatalogue.VISIBILITY.gel
+        else:
+            visibility = EntityCatalogue.VISIBILITY.public
+
+        qs = self.filter(visibility=visibility, tag=tag or "")
+        if name:
+            qs = qs.filter(sort_name__startswith=name.lower())
+        if entity_types:
+            qs = qs.filter(entity_type__in=entity_types)
+        return qs.order_by("sort_name")
+
+    def rebuild(self):
+        """Recreate the catalogue from the active panels"""
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # wait for refreshes in progress and block new ones
+                cursor.execute(
+                    "LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE".format(
+                        self.model._meta.db_table
+                    )
+                )
+            self.all().delete()
+            self.bulk_create(self._build_rows(), batch_size=5000)
+
+    def refresh_panel(self, panel_id):
+        """Refresh rows of the entities which are or were in the GenePanel"""
+
+        from .genepanelsnapshot import GenePanelSnapshot
+
+        names = set(
+            self.filter(panel_ids__contains=[panel_id]).values_list(
+                "entity_type", "name"
+            )
+        )
+        active_panel = (
+            GenePanelSnapshot.objects.filter(panel_id=panel_id)
+            .order_by("-major_version", "-minor_version", "-modified", "-pk")
+            .first()
+        )
+        if active_panel:
+            names.update(
+                ("gene", symbol)
+                for symbol in active_panel.genepanelentrysnapshot_set.values_list(
+                    "gene_core__gene_symbol", flat=True
+                )
+            )
+            names.update(
+                ("str", name) for name in active_panel.str_set.values_list("name", flat=True)
+            )
+            names.update(
+                ("region", name)
+                for name in active_panel.region_set.values_list("name", flat=True)
+            )
+
+        self.refresh(names)
+
+    def refresh(self, names):
+        """Recreate rows for the list of (entity_type, name) tuples"""
+
+        if not names:
+            return
+
+        names_by_type = defaultdict(set)
+        for entity_type, name in names:
+            names_by_type[entity_type].add(name)
+
+        with transaction.atomic():
+            self._lock(names)
+            for entity_type, type_names in names_by_type.items():
+                self.filter(entity_type=entity_type, name__in=type_names).delete()
+            self.bulk_create(self._build_rows(names_by_type), batch_size=5000)
+
+    def _lock(self, names):
+        """Lock the entity names until the end of the transaction
+
+        Refreshes of panels sharing entities would otherwise insert the same
+        rows. Locks are taken in the same order to avoid deadlocks.
+        """
+
+        keys = sorted(
+            {
+                zlib.crc32("{}:{}".format(entity_type, name).encode()) - 2 ** 31
+                for entity_type, name in names
+            }
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(pg_advisory_xact_lock(%s, key)) "
+                "FROM (SELECT unnest(%s::int[]) AS key ORDER BY 1) keys",
+                [CATALOGUE_LOCK, keys],
+            )
+
+    def _build_rows(self, names_by_type=None):
+        from .genepanelsnapshot import GenePanelSnapshot
+        from .genepanelentrysnapshot import GenePanelEntrySnapshot
+        from .strs import STR
+        from .region import Region
+
+        active_panels = GenePanelSnapshot.objects.get_active(
+            all=True, internal=True
+        ).values_list("pk", flat=True)
+
+        sources = [
+            (
+                "gene",
+                GenePanelEntrySnapshot.objects.filter(gene_core__active=True),
+                "gene_core__gene_symbol",
+            ),
+            ("str", STR.objects.all(), "name"),
+            ("region", Region.objects.all(), "name"),
+        ]
+
+        public_statuses = [GenePanel.STATUS.public, GenePanel.STATUS.promoted]
+        catalogue = defaultdict(set)
+        for entity_type, qs, name_field in sources:
+            qs = qs.filter(panel__in=active_panels)
+            if names_by_type is not None:
+                if not names_by_type.get(entity_type):
+                    continue
+                qs = qs.filter(**{name_field + "__in": names_by_type[entity_type]})
+
+            for name, panel_id, status, tag in qs.values_list(
+                name_field, "panel__panel_id", "panel__panel__status", "tags__name"
+            ).iterator():
+                visibilities = [EntityCatalogue.VISIBILITY.gel]
+                if status in public_statuses:
+                    visibilities.append(EntityCatalogue.VISIBILITY.public)
+
+                for visibility in visibilities:
+                    catalogue[(entity_type, name, visibility, "")].add(panel_id)
+                    if tag:
+                        catalogue[(entity_type, name, visibility, tag)].add(panel_id)
+
+        for (entity_type, name, visibility, tag), panel_ids in catalogue.items():
+            yield EntityCatalogue(
+                entity_type=entity_type,
+                name=name,
+                sort_name=name.lower(),
+                visibility=visibility,
+                tag=tag,
+                panel_ids=sorted(panel_ids),
+            )
+
+
+class EntityCatalogue(models.Model):
+    VISIBILITY = Choices(("public", "Public"), ("gel", "GEL reviewers"))
+
+    entity_type = models.CharField(max_length=16)
+    name = models.CharField(max_length=255)
+    sort_name = models.CharField(max_length=255)
+    visibility = models.CharField(max_length=16, choices=VISIBILITY)
+    tag = models.CharField(max_length=255, blank=True, default="")
+    panel_ids = ArrayField(models.IntegerField(), default=list)
+
+    objects = EntityCatalogueManager()
+
+    class Meta:
+        unique_together = [["entity_type", "name", "visibility", "tag"]]
+        indexes = [
+            models.Index(
+                fields=["visibility", "tag", "sort_name"],
+                name="panels_enti_visibil_sort_idx",
+            ),
+            GinIndex(fields=["panel_ids"], name="panels_enti_panel_ids_gin"),
+        ]
+
+    def __str__(self):
+        return "{} {}".format(self.entity_type, self.name)
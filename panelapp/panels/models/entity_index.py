@@ -0,0 +1,90 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Stable positions of entities in the panel membership bitsets
+
+Rows are only ever added, so the id of an entity type and name never
+changes and can be used as its bit position, see `panels.comparison`.
+"""
+
+from collections import defaultdict
+
+from django.db import connection
+from django.db import models
+from django.db import transaction
+
+
+class EntityIndexManager(models.Manager):
+    def positions(self, keys):
+        """Bit positions of (entity_type, name) keys, missing keys are added
+
+        :param keys: iterable of (entity_type, name) tuples
+        :return: dict with the keys and their positions
+        """
+
+        keys = set(keys)
+        if not keys:
+            return {}
+
+        # reads in a transaction use the primary database
+        with transaction.atomic():
+            positions = self._lookup(keys)
+            missing = keys - set(positions)
+            if missing:
+                entity_types, names = zip(*missing)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO {} (entity_type, name) "
+                        "SELECT * FROM unnest(%s::varchar[], %s::varchar[]) "
+                        "ON CONFLICT DO NOTHING".format(self.model._meta.db_table),
+                        [list(entity_types), list(names)],
+                    )
+                positions.update(self._lookup(missing))
+
+        return positions
+
+    def _lookup(self, keys):
+        names_by_type = defaultdict(list)
+        for entity_type, name in keys:
+            names_by_type[entity_type].append(name)
+
+        positions = {}
+        for entity_type, names in names_by_type.items():
+            for pk, name in self.filter(
+                entity_type=entity_type, name__in=names
+            ).values_list("pk", "name"):
+                positions[(entity_type, name)] = pk
+        return positions
+
+
+class EntityIndex(models.Model):
+    entity_type = models.CharField(max_length=16)
+    name = models.CharField(max_length=255)
+
+    objects = EntityIndexManager()
+
+    class Meta:
+        unique_together = [["entity_type", "name"]]
+
+    def __str__(self):
+        return "{} {}".format(self.entity_type, self.name)
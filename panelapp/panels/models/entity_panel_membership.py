@@ -0,0 +1,137 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Reverse index from entity names to the active panels they belong to
+
+Kept up to date together with the entity catalogue, it allows to list all
+panels for an entity with a single indexed query instead of going through
+the latest versions of all panels.
+"""
+
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.db import transaction
+from django.db.models import Q
+
+from .genepanel import GenePanel
+from .genepanelsnapshot import GenePanelSnapshot
+
+
+class EntityPanelMembershipManager(models.Manager):
+    def for_entity(self, name, statuses=None, entity_type=None):
+        """Memberships of an entity, `name` is either the entity name or the gene symbol"""
+
+        qs = self.filter(Q(entity_name=name) | Q(gene_symbol=name))
+        if statuses:
+            qs = qs.filter(panel_status__in=statuses)
+        if entity_type:
+            qs = qs.filter(entity_type=entity_type)
+        return qs
+
+    def rebuild(self):
+        """Recreate memberships for all active panels"""
+
+        with transaction.atomic():
+            self.all().delete()
+            for panel in GenePanelSnapshot.objects.get_active(all=True, internal=True):
+                self.bulk_create(self._build_rows(panel), batch_size=5000)
+
+    def refresh_panel(self, panel_id):
+        """Recreate memberships of the GenePanel.
+
+        Super panel names are stored with the child panel entities, so when
+        a super panel changes its child panels are refreshed too.
+        """
+
+        active_panel = (
+            GenePanelSnapshot.objects.filter(panel_id=panel_id)
+            .order_by("-major_version", "-minor_version", "-modified", "-pk")
+            .first()
+        )
+
+        with transaction.atomic():
+            self.filter(panel__panel_id=panel_id).delete()
+            if not active_panel:
+                return
+
+            if active_panel.is_super_panel:
+                for child_panel_id in active_panel.child_panels.values_list(
+                    "panel_id", flat=True
+                ):
+                    self.refresh_panel(child_panel_id)
+            elif active_panel.panel.status != GenePanel.STATUS.deleted:
+                self.bulk_create(self._build_rows(active_panel), batch_size=5000)
+
+    def _build_rows(self, panel):
+        superpanels = [
+            {"name": name, "status": status}
+            for name, status in panel.genepanelsnapshot_set.values_list(
+                "level4title__name", "panel__status"
+            ).distinct()
+        ]
+
+        for entity_type, entities, name_field in [
+            ("gene", panel.genepanelentrysnapshot_set.all(), "gene_core_id"),
+            ("str", panel.str_set.all(), "name"),
+            ("region", panel.region_set.all(), "name"),
+        ]:
+            for pk, name, gene_symbol, confidence_level, moi in entities.values_list(
+                "pk", name_field, "gene_core_id", "saved_gel_status", "moi"
+            ):
+                yield EntityPanelMembership(
+                    entity_type=entity_type,
+                    entity_id=pk,
+                    entity_name=name,
+                    gene_symbol=gene_symbol,
+                    panel=panel,
+                    panel_name=panel.panel.name,
+                    panel_status=panel.panel.status,
+                    confidence_level=confidence_level,
+                    moi=moi,
+                    superpanels=superpanels,
+                )
+
+
+class EntityPanelMembership(models.Model):
+    entity_type = models.CharField(max_length=16)
+    entity_id = models.IntegerField()
+    entity_name = models.CharField(max_length=255, db_index=True)
+    gene_symbol = models.CharField(max_length=255, null=True, db_index=True)
+    panel = models.ForeignKey(GenePanelSnapshot, on_delete=models.CASCADE)
+    panel_name = models.CharField(max_length=255)
+    panel_status = models.CharField(max_length=36)
+    confidence_level = models.IntegerField(null=True)
+    moi = models.CharField(max_length=255, null=True)
+    superpanels = JSONField(default=list)
+
+    objects = EntityPanelMembershipManager()
+
+    def __str__(self):
+        return "{} {} in {}".format(self.entity_type, self.entity_name, self.panel_name)
+
+    def superpanels_names(self, statuses):
+        return sorted(
+            superpanel["name"]
+            for superpanel in self.superpanels
+            if superpanel["status"] in statuses
+        )
@@ -138,7 +138,6 @@ class Evaluation(TimeStampedModel):
     def is_comment_without_review(self):
         if (
             self.rating
-            or self.comments.count == 0
             or self.moi
             or self.mode_of_pathogenicity
             or self.current_diagnostic
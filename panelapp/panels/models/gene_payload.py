@@ -0,0 +1,111 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Gene data copied to panel entities
+
+Entities keep a snapshot of `Gene.dict_tr()` which doesn't change when the
+Gene is updated. Instead of a copy in every entity row, the data is stored
+once per content hash and entities reference it with `gene_payload`.
+Payloads never change, so they are cached in the process once loaded.
+
+Only the entity tables reference payloads. `HistoricalSnapshot.data` is the
+serialised panel of a past version and still embeds the full gene data of
+each entity, so archived versions can be read without any join.
+"""
+
+import hashlib
+import json
+
+from django.contrib.postgres.fields import JSONField
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from .gene import Gene
+
+# loaded payloads, safe to keep as the content doesn't change for a hash.
+# Only used for reads, the rows might not exist if a transaction rolled back.
+_payloads_cache = {}
+CACHE_MAX_SIZE = 100000
+
+
+def canonical_json(data):
+    return json.dumps(
+        data, cls=DjangoJSONEncoder, sort_keys=True, separators=(",", ":")
+    )
+
+
+def payload_hash(data):
+    """SHA1 of the canonical JSON of the gene data"""
+
+    return hashlib.sha1(canonical_json(data).encode("utf-8")).hexdigest()
+
+
+class GenePayloadManager(models.Manager):
+    def for_data(self, data, gene_id=None):
+        """Payload for the gene data, created if it doesn't exist
+
+        :param data: dict from `Gene.dict_tr()`
+        :param gene_id: Gene the data was copied from
+        :return: GenePayload
+        """
+
+        content = canonical_json(data)
+        pk = hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+        # same values as loaded from the database, i.e. dates as strings
+        payload, _ = self.get_or_create(
+            pk=pk, defaults={"data": json.loads(content), "gene_id": gene_id}
+        )
+        self.remember(payload)
+        return payload
+
+    def remember(self, payload):
+        if len(_payloads_cache) >= CACHE_MAX_SIZE:
+            _payloads_cache.clear()
+        _payloads_cache[payload.pk] = payload.data
+
+    def resolve(self, pk):
+        """Gene data for the payload hash"""
+
+        if pk not in _payloads_cache:
+            self.remember(self.get(pk=pk))
+        return _payloads_cache[pk]
+
+    def warm(self, pks):
+        """Load the payloads which aren't cached in a single query"""
+
+        missing = set(pks) - set(_payloads_cache)
+        missing.discard(None)
+        for payload in self.filter(pk__in=missing):
+            self.remember(payload)
+
+
+class GenePayload(models.Model):
+    hash = models.CharField(max_length=40, primary_key=True)
+    gene = models.ForeignKey(Gene, null=True, blank=True, on_delete=models.SET_NULL)
+    data = JSONField(encoder=DjangoJSONEncoder)
+
+    objects = GenePayloadManager()
+
+    def __str__(self):
+        return "{} {}".format(self.data.get("gene_symbol"), self.hash)
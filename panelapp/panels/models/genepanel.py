@@ -21,7 +21,10 @@
 ## specific language governing permissions and limitations
 ## under the License.
 ##
+import uuid
+
 from django.db import models
+from django.db import transaction
 from django.db.models import Sum
 from django.db.models import Case
 from django.db.models import When
@@ -69,6 +72,8 @@ class GenePanel(TimeStampedModel):
     def approve(self):
         self.status = GenePanel.STATUS.public
         self.save()
+        self.record_status_change()
+        self.refresh_derived_data()
 
     def is_approved(self):
         return self.status in [GenePanel.STATUS.public, GenePanel.STATUS.promoted]
@@ -82,6 +87,49 @@ class GenePanel(TimeStampedModel):
     def reject(self):
         self.status = GenePanel.STATUS.internal
         self.save()
+        self.record_status_change()
+        self.refresh_derived_data()
+
+    def record_status_change(self):
+        """Let API clients know the panel visibility changed, see `PanelChange`"""
+
+        from .panel_change import PanelChange
+
+        PanelChange.objects.record(self.active_panel, PanelChange.KIND.status)
+
+    def refresh_derived_data(self):
+        """Refresh data derived from this panel after it changes
+
+        Panel memberships are updated straight away. Entities of this panel in
+        the catalogue are refreshed in the background once the change is
+        committed, as they are shared with all other panels, and so are the
+        downloads and related panels.
+        Data cached with the panel revision in the key goes stale.
+
+        :return: the new revision
+        """
+
+        from panels.models import EntityPanelMembership
+        from panels.tasks import update_entity_catalogue
+        from panels.tasks import schedule_panels_export
+        from panels.tasks import schedule_related_panels_update
+
+        EntityPanelMembership.objects.refresh_panel(self.pk)
+        transaction.on_commit(lambda: update_entity_catalogue.delay(self.pk))
+        schedule_panels_export()
+        schedule_related_panels_update()
+        return self.bump_revision()
+
+    def bump_revision(self):
+        """Store a new revision in the panel snapshots
+
+        The revision is part of the panel rows, so it's committed together
+        with the change and every process sees it whatever cache it uses.
+        """
+
+        revision = uuid.uuid4().hex
+        self.genepanelsnapshot_set.update(revision=revision)
+        return revision
 
     def get_absolute_url(self):
         return reverse("panels:detail", args=(self.pk,))
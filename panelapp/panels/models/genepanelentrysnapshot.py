@@ -26,13 +26,12 @@ from django.db.models import Subquery
 from django.db.models import Value as V
 from django.urls import reverse
 
-from django.core.serializers.json import DjangoJSONEncoder
-from django.contrib.postgres.fields import JSONField
 from django.contrib.postgres.fields import ArrayField
 
 from model_utils.models import TimeStampedModel
 
 from .gene import Gene
+from .gene_payload import GenePayload
 from .genepanel import GenePanel
 from .evidence import Evidence
 from .evaluation import Evaluation
@@ -108,6 +107,8 @@ class GenePanelEntrySnapshotManager(EntityManager):
                 "panel__level4title",
                 "panel__panel",
                 "panel__panel__types",
+                "panel__child_panels",
+                "gene_payload",
             )
             .order_by(
                 "panel_id",
@@ -134,7 +135,9 @@ class GenePanelEntrySnapshot(AbstractEntity, TimeStampedModel):
         ]
 
     panel = models.ForeignKey(GenePanelSnapshot, on_delete=models.CASCADE)
-    gene = JSONField(encoder=DjangoJSONEncoder)  # copy data from Gene.dict_tr
+    gene_payload = models.ForeignKey(
+        GenePayload, blank=True, null=True, on_delete=models.PROTECT
+    )  # copy of Gene.dict_tr, available as `gene`
     gene_core = models.ForeignKey(
         Gene, on_delete=models.PROTECT
     )  # reference to the original Gene
@@ -40,6 +40,7 @@ from django.contrib.postgres.fields import JSONField
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.aggregates import ArrayAgg
 from django.utils.functional import cached_property
 from model_utils.models import TimeStampedModel
@@ -47,8 +48,15 @@ from model_utils.models import TimeStampedModel
 from accounts.models import User
 from panels.tasks import email_panel_promoted
 from panels.exceptions import IsSuperPanelException
+from panels.exceptions import PanelVersionConflict
+from panels.locks import lock_panel
+from panels.locks import retry_panel_conflicts
+from panels.search import panel_name_filter
+from panels.search import search_panels
 from .activity import Activity
 from .genepanel import GenePanel
+from .panel_edit_session import PanelEditSession
+from .panel_change import PanelChange
 from .Level4Title import Level4Title
 from .trackrecord import TrackRecord
 from .evidence import Evidence
@@ -56,7 +64,7 @@ from .evaluation import Evaluation
 from .gene import Gene
 from .comment import Comment
 from .tag import Tag
-from panels.tasks import increment_panel_async
+from panels.tasks import schedule_super_panel_update
 
 
 class GenePanelSnapshotManager(models.Manager):
@@ -121,12 +129,7 @@ class GenePanelSnapshotManager(models.Manager):
             if name.isdigit():
                 filters = Q(panel_id=name)
             else:
-                filters = (
-                    Q(panel__old_pk=name)
-                    | Q(panel__name=name)
-                    | Q(old_panels__contains=[name])
-                    | Q(panel__name__icontains=name)
-                )
+                filters = panel_name_filter(name)
             qs = qs.filter(filters)
 
         return qs.prefetch_related(
@@ -175,37 +178,49 @@ class GenePanelSnapshotManager(models.Manager):
         if name.isdigit():
             filters = Q(panel_id=name)
         else:
-            filters = (
-                Q(panel__old_pk=name)
-                | Q(panel__name=name)
-                | Q(old_panels__contains=[name])
-                | Q(panel__name__icontains=name)
-            )
+            filters = panel_name_filter(name)
         qs = qs.filter(filters)
 
         return self.annotate_panels(
             qs.filter(major_version=major_version, minor_version=minor_version)
         )
 
+    def search(
+        self, query, all=False, deleted=False, internal=False, entities=True, fuzzy=True
+    ):
+        """Search active panels, best matches first
+
+        Matches panel names, Level4Title names and disease groups, old panel names
+        and, if `entities` is set, names and phenotypes of the panel entities.
+        Every panel is annotated with `search_rank` between 0 and 1.
+        """
+
+        return search_panels(
+            self.get_active(all=all, deleted=deleted, internal=internal),
+            query,
+            entities=entities,
+            fuzzy=fuzzy,
+        )
+
     def get_gene_panels(self, gene_symbol, all=False, internal=False):
         """Get all panels for a specific gene in Gene entities"""
 
         return self.get_active_annotated(all=all, internal=internal).filter(
-            genepanelentrysnapshot__gene__gene_symbol=gene_symbol
+            genepanelentrysnapshot__gene_core__gene_symbol=gene_symbol
         )
 
     def get_strs_panels(self, gene_symbol, all=False, internal=False):
         """Get all panels for a specific gene in STR entities"""
 
         return self.get_active_annotated(all=all, internal=internal).filter(
-            str__gene__gene_symbol=gene_symbol
+            str__gene_core__gene_symbol=gene_symbol
         )
 
     def get_region_panels(self, gene_symbol, all=False, internal=False):
         """Get all panels for a specific gene in Region entities"""
 
         return self.get_active_annotated(all=all, internal=internal).filter(
-            str__gene__gene_symbol=gene_symbol
+            str__gene_core__gene_symbol=gene_symbol
         )
 
     def get_shared_panels(self, gene_symbol, all=False, internal=False):
@@ -294,8 +309,10 @@ class GenePanelSnapshotManager(models.Manager):
             return []
 
         genes = [
-            (g.get("gene_symbol"), "Gene: {}".format(g.get("gene_symbol")))
-            for g in gps.cached_genes.values_list("gene", flat=True)
+            (symbol, "Gene: {}".format(symbol))
+            for symbol in gps.cached_genes.values_list(
+                "gene_core__gene_symbol", flat=True
+            )
         ]
         strs = [
             (n, "STR: {}".format(n))
@@ -329,6 +346,9 @@ class GenePanelSnapshot(TimeStampedModel):
     class Meta:
         get_latest_by = "created"
         ordering = ["-major_version", "-minor_version"]
+        indexes = [
+            GinIndex(fields=["old_panels"], name="panels_gene_old_panels_gin"),
+        ]
 
     objects = GenePanelSnapshotManager()
 
@@ -341,6 +361,8 @@ class GenePanelSnapshot(TimeStampedModel):
 
     child_panels = models.ManyToManyField("self", symmetrical=False)
     stats = JSONField(default=dict, blank=True)
+    # changes with any change of the panel, see `GenePanel.refresh_derived_data`
+    revision = models.CharField(max_length=32, blank=True, default="")
 
     def __str__(self):
         return "{} v{}.{}".format(
@@ -350,6 +372,22 @@ class GenePanelSnapshot(TimeStampedModel):
     def get_absolute_url(self):
         return reverse("panels:detail", args=(self.panel.pk,))
 
+    def save(self, *args, **kwargs):
+        # the revision is only changed by `GenePanel.bump_revision`, saving an
+        # instance loaded before that must not bring the old one back
+        if (
+            self.pk
+            and not self._state.adding
+            and not kwargs.get("force_insert")
+            and kwargs.get("update_fields") is None
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "revision"
+            ]
+        super().save(*args, **kwargs)
+
     @cached_property
     def signed_off(self):
         signed_off = None
@@ -537,18 +575,35 @@ class GenePanelSnapshot(TimeStampedModel):
         return out
 
     def _update_saved_stats(self, use_db=True, update_superpanels=True):
-        """Get the new values from the database"""
-        self.stats = self._get_stats(use_db=use_db)
-        self.save(update_fields=["stats"])
+        """Get the new values from the database
 
-        if update_superpanels:
-            for super_panel in self.genepanelsnapshot_set.all():
-                super_panel._update_saved_stats(use_db=use_db)
+        While an edit session is open the stats and super panels are updated
+        once it is sealed, data derived from the panel is refreshed straight away.
+        """
+
+        session_open = PanelEditSession.objects.filter(
+            panel_id=self.panel_id, sealed=None
+        ).exists()
+
+        if not session_open:
+            self.stats = self._get_stats(use_db=use_db)
+            self.save(update_fields=["stats"])
+        self.revision = self.panel.refresh_derived_data()
+
+        if update_superpanels and not session_open:
+            for super_panel_pk in self.genepanelsnapshot_set.values_list("pk", flat=True):
+                schedule_super_panel_update(super_panel_pk)
 
     @property
     def version(self):
         return "{}.{}".format(self.major_version, self.minor_version)
 
+    @cached_property
+    def edit_session(self):
+        """Open edit session of the panel, if any"""
+
+        return PanelEditSession.objects.get_open(self.panel_id)
+
     def update_child_panels(self):
         if not self.is_super_panel:
             return
@@ -568,33 +623,66 @@ class GenePanelSnapshot(TimeStampedModel):
         if panels_changed:
             self.child_panels.set(updated_child_panels)
 
+    @retry_panel_conflicts
     def increment_version(self, major=False, user=None, comment=None, include_superpanels=True):
         """Creates a new version of the panel.
 
         This script copies all genes, all information for these genes, and also
         you can add a comment and a user if it's a major version increment.
 
+        Concurrent increments of the same panel wait for each other, see
+        `panels.locks`.
+
         DO NOT use it inside the methods of either genes or GenePanelSnapshot.
         This has weird behaviour as self references still goes to the previous
         snapshot and not the new one.
         """
         from .historical_snapshot import HistoricalSnapshot
 
-        if self != self.panel.active_panel:
-            raise Exception("Cannot increment non recent version")
-
         with transaction.atomic():
-            HistoricalSnapshot.import_panel(self, comment=comment)
+            lock_panel(self.panel_id)
+
+            self.panel.__dict__.pop("active_panel", None)
+            if self != self.panel.active_panel:
+                raise Exception("Cannot increment non recent version")
+            # callers going through panel.active_panel get the incremented copy
+            self.panel.__dict__["active_panel"] = self
+
+            session = PanelEditSession.objects.get_open(self.panel_id)
+            if session and major:
+                # promoting the panel finishes the edit session, super panels
+                # get the major increment below
+                session.seal(user=user, propagate=False)
+                session = None
+            elif session and session.version_incremented:
+                # the version was already incremented in this edit session
+                session.record_change()
+                return self
+
+            # the version might have been incremented since self was loaded
+            current_version = GenePanelSnapshot.objects.values_list(
+                "major_version", "minor_version"
+            ).get(pk=self.pk)
+            self.major_version, self.minor_version = current_version
 
-            self.created = timezone.now()
-            self.modified = timezone.now()
+            HistoricalSnapshot.import_panel(self, comment=comment)
 
             if major:
-                self.major_version += 1
-                self.minor_version = 0
+                new_version = (self.major_version + 1, 0)
             else:
-                self.minor_version += 1
+                new_version = (self.major_version, self.minor_version + 1)
 
+            updated = GenePanelSnapshot.objects.filter(
+                pk=self.pk,
+                major_version=current_version[0],
+                minor_version=current_version[1],
+            ).update(major_version=new_version[0], minor_version=new_version[1])
+            if not updated:
+                raise PanelVersionConflict(self.panel_id)
+
+            self.created = timezone.now()
+            self.modified = timezone.now()
+            self.major_version, self.minor_version = new_version
             self.save()
 
             if not self.is_super_panel:
@@ -613,18 +701,29 @@ class GenePanelSnapshot(TimeStampedModel):
                     )
                     self.save()
 
-                # increment versions of any super panel
-                if include_superpanels:
-                    super_panel_ids = self.genepanelsnapshot_set.values_list('pk', flat=True)
-                    super_panels = self.genepanelsnapshot_set.get_active_annotated(all=True, deleted=True, internal=True).filter(pk__in=super_panel_ids)
-                    for panel in super_panels:
-                        if user:
-                            increment_panel_async(panel.pk, user_pk=user.pk, major=major, update_stats=False)
-                        else:
-                            increment_panel_async(panel.pk, major=major, update_stats=False)
+                # super panels are incremented when the edit session is sealed
+                if include_superpanels and not session:
+                    self.increment_super_panels(major=major)
+
+            if session:
+                session.record_change(version_incremented=True)
+
+            PanelChange.objects.record(
+                self, PanelChange.KIND.promoted if major else PanelChange.KIND.version
+            )
 
         return self
 
+    def increment_super_panels(self, major=False):
+        """Increment versions of any super panel, coalesced with other changes"""
+
+        super_panel_ids = self.genepanelsnapshot_set.values_list('pk', flat=True)
+        super_panels = GenePanelSnapshot.objects.get_active(
+            all=True, deleted=True, internal=True
+        ).filter(pk__in=super_panel_ids).values_list("pk", flat=True)
+        for panel_pk in super_panels:
+            schedule_super_panel_update(panel_pk, increment=True, major=major)
+
     @cached_property
     def contributors(self):
         """Returns a tuple with user data
@@ -691,10 +790,14 @@ class GenePanelSnapshot(TimeStampedModel):
         else:
             qs = self.genepanelentrysnapshot_set.all()
 
-        return qs.annotate(
-            entity_type=V("gene", output_field=models.CharField()),
-            entity_name=models.F("gene_core__gene_symbol"),
-        ).order_by("entity_name")
+        return (
+            qs.annotate(
+                entity_type=V("gene", output_field=models.CharField()),
+                entity_name=models.F("gene_core__gene_symbol"),
+            )
+            .prefetch_related("gene_payload")
+            .order_by("entity_name")
+        )
 
     @cached_property
     def cached_strs(self):
@@ -708,10 +811,14 @@ class GenePanelSnapshot(TimeStampedModel):
         else:
             qs = self.str_set.all()
 
-        return qs.annotate(
-            entity_type=V("str", output_field=models.CharField()),
-            entity_name=models.F("name"),
-        ).order_by("entity_name")
+        return (
+            qs.annotate(
+                entity_type=V("str", output_field=models.CharField()),
+                entity_name=models.F("name"),
+            )
+            .prefetch_related("gene_payload")
+            .order_by("entity_name")
+        )
 
     @cached_property
     def cached_regions(self):
@@ -725,10 +832,14 @@ class GenePanelSnapshot(TimeStampedModel):
         else:
             qs = self.region_set.all()
 
-        return qs.annotate(
-            entity_type=V("region", output_field=models.CharField()),
-            entity_name=models.F("name"),
-        ).order_by("entity_name")
+        return (
+            qs.annotate(
+                entity_type=V("region", output_field=models.CharField()),
+                entity_name=models.F("name"),
+            )
+            .prefetch_related("gene_payload")
+            .order_by("entity_name")
+        )
 
     @cached_property
     def current_genes(self):
@@ -747,10 +858,9 @@ class GenePanelSnapshot(TimeStampedModel):
 
     @cached_property
     def current_genes_count(self):
-        genes_list = [
-            g.get("gene_symbol")
-            for g in self.cached_genes.values_list("gene", flat=True)
-        ]
+        genes_list = list(
+            self.cached_genes.values_list("gene_core__gene_symbol", flat=True)
+        )
         return {gene: genes_list.count(gene) for gene in genes_list if gene}
 
     @cached_property
@@ -823,6 +933,10 @@ class GenePanelSnapshot(TimeStampedModel):
                 Case(When(evaluation__rating="RED", then=models.F("evaluation"))),
                 distinct=True,
             ),
+            number_of_amber_evaluations=Count(
+                Case(When(evaluation__rating="AMBER", then=models.F("evaluation"))),
+                distinct=True,
+            ),
             evaluators=ArrayAgg("evaluation__user_id"),
             number_of_evaluations=Count("evaluation", distinct=True),
         ).order_by("-saved_gel_status", "entity_name")
@@ -857,7 +971,13 @@ class GenePanelSnapshot(TimeStampedModel):
                 entity_type=V("gene", output_field=models.CharField()),
                 entity_name=models.F("gene_core__gene_symbol"),
             )
-            .prefetch_related("evidence", "tags", "panel__panel__types", "panel__child_panels",)
+            .prefetch_related(
+                "evidence",
+                "tags",
+                "panel__panel__types",
+                "panel__child_panels",
+                "gene_payload",
+            )
         )
 
         if self.is_super_panel:
@@ -900,7 +1020,13 @@ class GenePanelSnapshot(TimeStampedModel):
                 entity_type=V("str", output_field=models.CharField()),
                 entity_name=models.F("name"),
             )
-            .prefetch_related("evidence", "tags", "panel__panel__types", "panel__child_panels",)
+            .prefetch_related(
+                "evidence",
+                "tags",
+                "panel__panel__types",
+                "panel__child_panels",
+                "gene_payload",
+            )
         )
 
         if self.is_super_panel:
@@ -943,7 +1069,13 @@ class GenePanelSnapshot(TimeStampedModel):
                 entity_type=V("region", output_field=models.CharField()),
                 entity_name=models.F("name"),
             )
-            .prefetch_related("evidence", "tags", "panel__panel__types", "panel__child_panels")
+            .prefetch_related(
+                "evidence",
+                "tags",
+                "panel__panel__types",
+                "panel__child_panels",
+                "gene_payload",
+            )
         )
 
         if self.is_super_panel:
@@ -978,7 +1110,7 @@ class GenePanelSnapshot(TimeStampedModel):
             qs = getattr(self, "get_all_{}".format(method_type))
 
         if use_gene:
-            return qs.get(gene__gene_symbol=entity_name)
+            return qs.get(gene_core__gene_symbol=entity_name)
         else:
             return qs.get(name=entity_name)
 
@@ -993,10 +1125,9 @@ class GenePanelSnapshot(TimeStampedModel):
         if self.is_super_panel:
             raise IsSuperPanelException
 
-        return gene_symbol in [
-            symbol.get("gene_symbol")
-            for symbol in self.cached_genes.values_list("gene", flat=True)
-        ]
+        return gene_symbol in self.cached_genes.values_list(
+            "gene_core__gene_symbol", flat=True
+        )
 
     def get_str(self, name, prefetch_extra=False):
         """Get a STR."""
@@ -1057,9 +1188,12 @@ class GenePanelSnapshot(TimeStampedModel):
             if increment:
                 self = self.increment_version()
 
-            self.get_all_genes.get(gene__gene_symbol=gene_symbol).delete()
+            self.get_all_genes.get(gene_core__gene_symbol=gene_symbol).delete()
             self.clear_cache()
             self.clear_django_cache()
+            PanelChange.objects.record(
+                self, PanelChange.KIND.removed, entity_type="gene", entity_name=gene_symbol
+            )
 
             if user:
                 self.add_activity(
@@ -1084,6 +1218,9 @@ class GenePanelSnapshot(TimeStampedModel):
             self.cached_strs.get(name=str_name).delete()
             self.clear_cache()
             self.clear_django_cache()
+            PanelChange.objects.record(
+                self, PanelChange.KIND.removed, entity_type="str", entity_name=str_name
+            )
 
             if user:
                 self.add_activity(
@@ -1105,6 +1242,9 @@ class GenePanelSnapshot(TimeStampedModel):
             self.cached_regions.get(name=region_name).delete()
             self.clear_cache()
             self.clear_django_cache()
+            PanelChange.objects.record(
+                self, PanelChange.KIND.removed, entity_type="region", entity_name=region_name
+            )
 
             if user:
                 self.add_activity(
@@ -1313,6 +1453,7 @@ class GenePanelSnapshot(TimeStampedModel):
 
         gene.evidence_status(update=True)
         self._update_saved_stats()
+        PanelChange.objects.record(self, PanelChange.KIND.added, gene)
         return gene
 
     def update_gene(self, user, gene_symbol, gene_data, append_only=False):
@@ -1780,6 +1921,7 @@ class GenePanelSnapshot(TimeStampedModel):
                 self.clear_cache()
                 self.clear_django_cache()
                 self._update_saved_stats()
+                PanelChange.objects.record(self, PanelChange.KIND.added, new_gpes)
                 return new_gpes
             elif gene_name and gene.gene.get("gene_name") != gene_name:
                 logging.debug(
@@ -1793,6 +1935,7 @@ class GenePanelSnapshot(TimeStampedModel):
                 gene.save()
             self.clear_cache()
             self._update_saved_stats()
+            PanelChange.objects.record(self, PanelChange.KIND.updated, gene)
             return gene
         else:
             return False
@@ -1862,6 +2005,7 @@ class GenePanelSnapshot(TimeStampedModel):
 
         str_item.evidence_status(update=True)
         self._update_saved_stats()
+        PanelChange.objects.record(self, PanelChange.KIND.added, str_item)
         return str_item
 
     def update_str(
@@ -2450,6 +2594,7 @@ class GenePanelSnapshot(TimeStampedModel):
             str_item.save()
             self.clear_cache()
             self._update_saved_stats()
+            PanelChange.objects.record(self, PanelChange.KIND.updated, str_item)
             return str_item
         else:
             return False
@@ -2522,6 +2667,7 @@ class GenePanelSnapshot(TimeStampedModel):
 
         region.evidence_status(update=True)
         self._update_saved_stats()
+        PanelChange.objects.record(self, PanelChange.KIND.added, region)
         return region
 
     def update_region(
@@ -3135,6 +3281,7 @@ class GenePanelSnapshot(TimeStampedModel):
             region.save()
             self.clear_cache()
             self._update_saved_stats()
+            PanelChange.objects.record(self, PanelChange.KIND.updated, region)
             return region
         else:
             return False
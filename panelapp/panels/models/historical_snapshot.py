@@ -33,6 +33,9 @@ from webservices.utils import make_null, convert_moi, convert_gel_status
 import panelapp
 
 
+ENTITY_KEYS = ("genes", "strs", "regions")
+
+
 class HistoricalSnapshot(models.Model):
     panel = models.ForeignKey(GenePanel, on_delete=models.PROTECT)
     major_version = models.IntegerField(default=0, db_index=True)
@@ -40,7 +43,19 @@ class HistoricalSnapshot(models.Model):
     reason = models.TextField(null=True)
     schema_version = models.CharField(max_length=100)  # JSON schema version
     data = JSONField()
+    # panel fields of `data` without the entities, for listings
+    metadata = JSONField(null=True)
     signed_off_date = models.DateField(blank=True, null=True)
+    # when the version was created, it was active until the next version
+    version_created = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["panel", "version_created"],
+                name="panels_hist_panel_created_idx",
+            )
+        ]
 
     def __str__(self):
         return "{} v{}.{}".format(self.panel.name, self.major_version, self.minor_version)
@@ -256,13 +271,25 @@ class HistoricalSnapshot(models.Model):
         instance.panel = panel.panel
         instance.major_version = panel.major_version
         instance.minor_version = panel.minor_version
+        instance.version_created = panel.created
         instance.reason = comment
         instance.schema_version = panelapp.__version__
         instance.data = json.data
+        instance.metadata = cls.panel_metadata(instance.data)
 
         instance.save()
         return instance
 
+    @staticmethod
+    def panel_metadata(data):
+        """Panel data without genes, STRs and regions"""
+
+        return {
+            key: value
+            for key, value in data.items()
+            if key not in ENTITY_KEYS
+        }
+
     @staticmethod
     def ensemble(entity):
         ensemble = None
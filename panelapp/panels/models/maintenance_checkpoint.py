@@ -0,0 +1,49 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Progress of the batched maintenance tasks in `panels.maintenance`
+
+Each task keeps the highest primary key it has finished, so an interrupted
+run continues from there instead of starting over.
+"""
+
+from django.db import models
+from model_utils.models import TimeStampedModel
+
+
+class MaintenanceCheckpoint(TimeStampedModel):
+    name = models.CharField(max_length=128, unique=True)
+    last_pk = models.BigIntegerField(default=0)
+    processed = models.BigIntegerField(default=0)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return "{} up to {}".format(self.name, self.last_pk)
+
+    def reset(self):
+        self.last_pk = 0
+        self.processed = 0
+        self.finished = None
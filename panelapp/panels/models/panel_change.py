@@ -0,0 +1,208 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Append-only log of panel changes
+
+Every new panel version and every entity added, updated, removed or reviewed
+is recorded with an increasing sequence number, so API clients mirroring
+PanelApp can ask for changes after the last one they have seen instead of
+downloading all panels again.
+
+Changes are written without a sequence number as part of the panel change
+and numbered once they are committed, see `assign_sequences`. Numbering
+takes an advisory lock, so sequence numbers follow the order changes were
+numbered in and a client reading up to a sequence number never misses
+changes numbered later with lower numbers. The lock is only held by the
+numbering statement, edits of different panels don't wait for each other;
+the cost is one short serialised UPDATE per committed edit, and changes are
+listed a moment after they are committed. Readers are notified on the
+`panel_changes` channel, which lets API requests wait for new changes
+without polling the table. Webhook subscriptions get the changes after they
+are numbered, see `panels.webhooks`.
+"""
+
+import select
+import time
+
+from django.db import connection
+from django.db import models
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from model_utils import Choices
+
+from .genepanel import GenePanel
+
+
+CHANGES_CHANNEL = "panel_changes"
+# arbitrary key of the advisory lock which serialises numbering
+CHANGES_LOCK = 724151
+
+ASSIGN_SEQUENCES_SQL = """
+UPDATE panels_panelchange AS change SET sequence = numbered.sequence
+FROM (
+    SELECT id, (SELECT COALESCE(MAX(sequence), 0) FROM panels_panelchange)
+        + row_number() OVER (ORDER BY id) AS sequence
+    FROM panels_panelchange
+    WHERE sequence IS NULL
+) AS numbered
+WHERE change.id = numbered.id
+"""
+
+
+class PanelChangeManager(models.Manager):
+    def build(self, panel, kind, entity=None, entity_type="", entity_name=""):
+        """Unsaved change of the GenePanelSnapshot, optionally of one of its entities"""
+
+        if entity is not None:
+            entity_type = entity._entity_type
+            entity_name = entity.name
+
+        return self.model(
+            panel_id=panel.panel_id,
+            panel_version=panel.version,
+            kind=kind,
+            entity_type=entity_type,
+            entity_name=entity_name,
+        )
+
+    def record(self, panel, kind, entity=None, entity_type="", entity_name=""):
+        self.record_many(
+            [self.build(panel, kind, entity, entity_type, entity_name)]
+        )
+
+    def record_many(self, changes):
+        """Save the changes, they are numbered once the transaction is committed"""
+
+        if not changes:
+            return
+
+        self.bulk_create(changes)
+
+        from panels.tasks import schedule_webhook_delivery
+
+        def committed():
+            self.assign_sequences()
+            schedule_webhook_delivery()
+
+        transaction.on_commit(committed)
+
+    def assign_sequences(self):
+        """Number the committed changes which don't have a sequence number yet
+
+        Runs after each transaction recording changes. Readers call it too,
+        so changes are listed even if the process stopped before numbering.
+
+        returns:
+            int: number of changes numbered
+        """
+
+        if not self.filter(sequence__isnull=True).exists():
+            return 0
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHANGES_LOCK])
+                cursor.execute(ASSIGN_SEQUENCES_SQL)
+                numbered = cursor.rowcount
+                if numbered:
+                    cursor.execute("SELECT pg_notify(%s, '')", [CHANGES_CHANNEL])
+        return numbered
+
+    def numbered(self):
+        return self.filter(sequence__isnull=False)
+
+    def latest_sequence(self):
+        latest = self.numbered().order_by("-sequence")
+        return latest.values_list("sequence", flat=True).first() or 0
+
+    def visible_to_public(self):
+        return self.filter(
+            Q(panel__status=GenePanel.STATUS.public)
+            | Q(panel__status=GenePanel.STATUS.promoted)
+        )
+
+    def visible_to_gel(self):
+        return self.exclude(panel__status=GenePanel.STATUS.deleted)
+
+    def wait(self, queryset, timeout):
+        """Wait up to `timeout` seconds for the queryset to have results
+
+        Listens to notifications from writers, so it must run outside of
+        a transaction.
+
+        returns:
+            bool: True if the queryset has results
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute("LISTEN {}".format(CHANGES_CHANNEL))
+
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                if queryset.exists():
+                    return True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+
+                pg_connection = connection.connection
+                if select.select([pg_connection], [], [], remaining)[0]:
+                    pg_connection.poll()
+                    pg_connection.notifies.clear()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("UNLISTEN {}".format(CHANGES_CHANNEL))
+
+
+class PanelChange(models.Model):
+    KIND = Choices(
+        ("version", "New version"),
+        ("promoted", "Promoted"),
+        ("status", "Status changed"),
+        ("added", "Entity added"),
+        ("updated", "Entity updated"),
+        ("removed", "Entity removed"),
+        ("reviewed", "Entity reviewed"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    sequence = models.BigIntegerField(null=True, blank=True, unique=True)
+    created = models.DateTimeField(default=timezone.now)
+    panel = models.ForeignKey(
+        GenePanel, on_delete=models.CASCADE, related_name="changes"
+    )
+    panel_version = models.CharField(max_length=16)
+    kind = models.CharField(max_length=16, choices=KIND)
+    entity_type = models.CharField(max_length=16, blank=True)
+    entity_name = models.CharField(max_length=255, blank=True)
+
+    objects = PanelChangeManager()
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return "{} {} {}".format(self.pk, self.kind, self.panel_id)
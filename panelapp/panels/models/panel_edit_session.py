@@ -0,0 +1,141 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Edit sessions batch many changes of a panel into a single version
+
+While a session is open the first change increments the panel version
+and creates the historical snapshot as usual, following changes are made
+in the same version. The panel stats and super panels are updated once the
+session is sealed, either by the curator or after it was left idle for
+`PANEL_EDIT_SESSION_TIMEOUT` seconds. Panel memberships, the panel revision
+and the background exports follow every change, see
+`GenePanel.refresh_derived_data`.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from model_utils.models import TimeStampedModel
+
+from accounts.models import User
+from panels.exceptions import IsSuperPanelException
+from .genepanel import GenePanel
+
+
+class PanelEditSessionManager(models.Manager):
+    def get_open(self, panel_id):
+        return self.filter(panel_id=panel_id, sealed=None).first()
+
+    def open(self, panel, user):
+        """Open an edit session for the GenePanel, or return the open one
+
+        :param panel: GenePanel
+        :param user: User editing the panel
+        :return: tuple (PanelEditSession, created)
+        """
+
+        if panel.active_panel.is_super_panel:
+            raise IsSuperPanelException
+
+        # only one session can be open per panel, enforced by a partial unique index
+        return self.get_or_create(panel=panel, sealed=None, defaults={"user": user})
+
+    def expired(self):
+        """Open sessions without changes for `PANEL_EDIT_SESSION_TIMEOUT` seconds"""
+
+        cutoff = timezone.now() - timedelta(
+            seconds=settings.PANEL_EDIT_SESSION_TIMEOUT
+        )
+        return self.filter(sealed=None, modified__lt=cutoff)
+
+
+class PanelEditSession(TimeStampedModel):
+    panel = models.ForeignKey(
+        GenePanel, on_delete=models.CASCADE, related_name="edit_sessions"
+    )
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    version_incremented = models.BooleanField(default=False)
+    changes = models.PositiveIntegerField(default=0)
+    sealed = models.DateTimeField(null=True, blank=True)
+
+    objects = PanelEditSessionManager()
+
+    class Meta:
+        ordering = ["-created"]
+
+    def __str__(self):
+        return "Edit session {} of panel {}".format(self.pk, self.panel_id)
+
+    @property
+    def is_open(self):
+        return self.sealed is None
+
+    @property
+    def expires(self):
+        return self.modified + timedelta(seconds=settings.PANEL_EDIT_SESSION_TIMEOUT)
+
+    def record_change(self, version_incremented=False):
+        """Count a change made in the session and keep it from expiring"""
+
+        values = {"changes": F("changes") + 1, "modified": timezone.now()}
+        if version_incremented:
+            values["version_incremented"] = True
+        PanelEditSession.objects.filter(pk=self.pk).update(**values)
+
+    def seal(self, user=None, propagate=True):
+        """Close the session and apply the updates deferred while it was open
+
+        :param user: User sealing the session, None if it expired
+        :param propagate: increment super panels versions if the panel version
+            was incremented, False if the caller increments them
+        :return: True if the session was sealed, False if it was already closed
+        """
+
+        with transaction.atomic():
+            session = PanelEditSession.objects.select_for_update().get(pk=self.pk)
+            if not session.is_open:
+                return False
+            session.sealed = timezone.now()
+            session.save(update_fields=["sealed"])
+
+        self.sealed = session.sealed
+        self.changes = session.changes
+        self.version_incremented = session.version_incremented
+
+        panel = GenePanel.objects.get(pk=self.panel_id).active_panel
+        if self.version_incremented and propagate:
+            panel.increment_super_panels()
+        panel._update_saved_stats()
+
+        if user:
+            panel.add_activity(
+                user,
+                "finished edit session with {} changes in version {}".format(
+                    self.changes, panel.version
+                ),
+            )
+        return True
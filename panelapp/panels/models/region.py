@@ -32,8 +32,6 @@ from django.db import models
 from django.db.models import Subquery
 from django.db.models import Count
 from django.db.models import Value as V
-from django.core.serializers.json import DjangoJSONEncoder
-from django.contrib.postgres.fields import JSONField
 from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.fields import IntegerRangeField
 from django.core import validators
@@ -44,6 +42,7 @@ from model_utils import Choices
 from .entity import AbstractEntity
 from .entity import EntityManager
 from .gene import Gene
+from .gene_payload import GenePayload
 from .genepanel import GenePanel
 from .evidence import Evidence
 from .evaluation import Evaluation
@@ -120,6 +119,8 @@ class RegionManager(EntityManager):
                 "panel__level4title",
                 "panel__panel",
                 "panel__panel__types",
+                "panel__child_panels",
+                "gene_payload",
             )
             .order_by("panel_id", "-panel__major_version", "-panel__minor_version")
         )
@@ -220,9 +221,9 @@ class Region(AbstractEntity, TimeStampedModel):
         default=VARIANT_TYPES.small,
     )
 
-    gene = JSONField(
-        encoder=DjangoJSONEncoder, blank=True, null=True
-    )  # copy data from Gene.dict_tr
+    gene_payload = models.ForeignKey(
+        GenePayload, blank=True, null=True, on_delete=models.PROTECT
+    )  # copy of Gene.dict_tr, available as `gene`
     gene_core = models.ForeignKey(
         Gene, blank=True, null=True, on_delete=models.PROTECT
     )  # reference to the original Gene
@@ -0,0 +1,191 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Panels related to each other by the entities they share
+
+Overlaps are computed for all pairs of active panels at once from the
+entity panel memberships. Each entity is weighted by its rating (green genes
+weight the most) and panels are scored by the cosine similarity of their
+weighted entities. Only the top scoring panels are kept for each panel.
+
+Public users only see related panels which are public, so the rows are
+computed once for GEL reviewers and once for public panels.
+"""
+
+from django.db import connection
+from django.db import models
+from django.db import transaction
+from model_utils import Choices
+
+from .genepanel import GenePanel
+
+
+RELATED_PANELS_SQL = """
+WITH members AS (
+    SELECT DISTINCT ON (s.panel_id, m.entity_type, m.entity_name)
+        s.panel_id,
+        m.entity_type,
+        m.entity_name,
+        m.confidence_level,
+        CASE
+            WHEN m.confidence_level >= 3 THEN 1.0
+            WHEN m.confidence_level = 2 THEN 0.5
+            ELSE 0.1
+        END AS weight
+    FROM panels_entitypanelmembership m
+    JOIN panels_genepanelsnapshot s ON s.id = m.panel_id
+    WHERE m.panel_status IN %(statuses)s
+    ORDER BY s.panel_id, m.entity_type, m.entity_name, m.confidence_level DESC NULLS LAST
+),
+norms AS (
+    SELECT panel_id, sqrt(sum(weight * weight)) AS norm
+    FROM members
+    GROUP BY panel_id
+),
+pairs AS (
+    SELECT
+        a.panel_id,
+        b.panel_id AS related_id,
+        count(*) AS shared_entities,
+        count(*) FILTER (
+            WHERE a.entity_type = 'gene'
+            AND a.confidence_level >= 3
+            AND b.confidence_level >= 3
+        ) AS shared_green_genes,
+        sum(a.weight * b.weight) AS dot
+    FROM members a
+    JOIN members b
+        ON b.entity_type = a.entity_type
+        AND b.entity_name = a.entity_name
+        AND b.panel_id <> a.panel_id
+    GROUP BY a.panel_id, b.panel_id
+),
+scored AS (
+    SELECT p.*, p.dot / (na.norm * nb.norm) AS score
+    FROM pairs p
+    JOIN norms na ON na.panel_id = p.panel_id
+    JOIN norms nb ON nb.panel_id = p.related_id
+),
+ranked AS (
+    SELECT scored.*, row_number() OVER (
+        PARTITION BY panel_id
+        ORDER BY score DESC, shared_entities DESC, related_id
+    ) AS rank
+    FROM scored
+)
+SELECT panel_id, related_id, rank, score, shared_entities, shared_green_genes
+FROM ranked
+WHERE rank <= %(top_k)s
+"""
+
+
+class RelatedPanelManager(models.Manager):
+    def for_panel(self, panel_id, gel_reviewer=False):
+        """Related panels of the GenePanel ordered by rank"""
+
+        if gel_reviewer:
+            visibility = RelatedPanel.VISIBILITY.gel
+        else:
+            visibility = RelatedPanel.VISIBILITY.public
+
+        return (
+            self.filter(panel_id=panel_id, visibility=visibility)
+            .select_related("related")
+            .order_by("rank")
+        )
+
+    def rebuild(self, top_k):
+        """Recompute the `top_k` related panels of every active panel"""
+
+        rows = list(self._build_rows(top_k))
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rows, batch_size=5000)
+
+    def _build_rows(self, top_k):
+        visibilities = [
+            (
+                RelatedPanel.VISIBILITY.gel,
+                [
+                    GenePanel.STATUS.promoted,
+                    GenePanel.STATUS.public,
+                    GenePanel.STATUS.retired,
+                    GenePanel.STATUS.internal,
+                ],
+            ),
+            (
+                RelatedPanel.VISIBILITY.public,
+                [GenePanel.STATUS.public, GenePanel.STATUS.promoted],
+            ),
+        ]
+
+        for visibility, statuses in visibilities:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    RELATED_PANELS_SQL, {"statuses": tuple(statuses), "top_k": top_k}
+                )
+                for (
+                    panel_id,
+                    related_id,
+                    rank,
+                    score,
+                    shared_entities,
+                    shared_green_genes,
+                ) in cursor.fetchall():
+                    yield RelatedPanel(
+                        panel_id=panel_id,
+                        related_id=related_id,
+                        visibility=visibility,
+                        rank=rank,
+                        score=score,
+                        shared_entities=shared_entities,
+                        shared_green_genes=shared_green_genes,
+                    )
+
+
+class RelatedPanel(models.Model):
+    VISIBILITY = Choices(("public", "Public"), ("gel", "GEL reviewers"))
+
+    panel = models.ForeignKey(
+        GenePanel, on_delete=models.CASCADE, related_name="related_panels"
+    )
+    related = models.ForeignKey(GenePanel, on_delete=models.CASCADE, related_name="+")
+    visibility = models.CharField(max_length=16, choices=VISIBILITY)
+    rank = models.PositiveIntegerField()
+    score = models.FloatField()
+    shared_entities = models.PositiveIntegerField()
+    shared_green_genes = models.PositiveIntegerField()
+
+    objects = RelatedPanelManager()
+
+    class Meta:
+        ordering = ["panel", "visibility", "rank"]
+        indexes = [
+            models.Index(
+                fields=["panel", "visibility", "rank"],
+                name="panels_rela_panel_rank_idx",
+            )
+        ]
+
+    def __str__(self):
+        return "{} related to {}".format(self.related_id, self.panel_id)
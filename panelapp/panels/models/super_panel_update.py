@@ -0,0 +1,75 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Pending version increments of super panels
+
+Child panel changes are coalesced into a single super panel version, see
+`panels.tasks.schedule_super_panel_update`. The pending increment is written
+in the same transaction as the child change, so it is seen by the Celery
+worker which increments the version whichever process scheduled it.
+"""
+
+from django.db import connection
+from django.db import models
+
+from .genepanel import GenePanel
+
+
+class SuperPanelUpdateManager(models.Manager):
+    def request(self, panel_pk, major=False):
+        """Request a version increment of the super panel GenePanelSnapshot `panel_pk`"""
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO {table} (panel_id, major, created) "
+                "SELECT panel_id, %s, now() FROM panels_genepanelsnapshot WHERE id = %s "
+                "ON CONFLICT (panel_id) DO UPDATE SET major = {table}.major OR EXCLUDED.major".format(
+                    table=self.model._meta.db_table
+                ),
+                [major, panel_pk],
+            )
+
+    def pop(self, panel_id):
+        """Remove the pending increment of the GenePanel and return it, None if there is none
+
+        Must be called in a transaction, the row stays locked until it is committed
+        so increments requested meanwhile aren't lost.
+        """
+
+        pending = self.select_for_update().filter(panel_id=panel_id).first()
+        if pending:
+            pending.delete()
+        return pending
+
+
+class SuperPanelUpdate(models.Model):
+    panel = models.OneToOneField(
+        GenePanel, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    major = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    objects = SuperPanelUpdateManager()
+
+    def __str__(self):
+        return "{} increment of {}".format("Major" if self.major else "Minor", self.panel_id)
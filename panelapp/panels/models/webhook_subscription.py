@@ -0,0 +1,133 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Webhook subscriptions to panel changes
+
+Subscribers get batches of `PanelChange` events POSTed to their URL, see
+`panels.webhooks`. The change log doubles as the outbox: changes are written
+in the same transaction as the panel versions and each subscription keeps
+the sequence number of the last event delivered to it.
+"""
+
+import secrets
+
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from model_utils.models import TimeStampedModel
+
+from accounts.models import User
+from .genepanel import GenePanel
+from .panel_change import PanelChange
+
+
+def default_events():
+    return [PanelChange.KIND.version, PanelChange.KIND.promoted]
+
+
+def generate_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookSubscriptionManager(models.Manager):
+    def due(self, now):
+        return self.filter(active=True).filter(
+            models.Q(next_attempt__isnull=True) | models.Q(next_attempt__lte=now)
+        )
+
+    def covering(self, panel, kind):
+        """Active subscriptions which receive `kind` changes of the GenePanel"""
+
+        if panel.status == GenePanel.STATUS.deleted:
+            return self.none()
+
+        subscriptions = self.filter(active=True, events__contains=[kind]).filter(
+            models.Q(panels=panel) | models.Q(panels__isnull=True)
+        )
+        if panel.status not in [GenePanel.STATUS.public, GenePanel.STATUS.promoted]:
+            subscriptions = subscriptions.filter(include_internal=True)
+        return subscriptions.distinct()
+
+
+class WebhookSubscription(TimeStampedModel):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="webhook_subscriptions",
+        help_text="Account of the integration, not emailed about events it receives",
+    )
+    url = models.URLField(max_length=500)
+    secret = models.CharField(
+        max_length=128,
+        default=generate_secret,
+        help_text="Key of the HMAC SHA256 signature in X-PanelApp-Signature",
+    )
+    events = ArrayField(
+        models.CharField(max_length=16, choices=PanelChange.KIND),
+        default=default_events,
+    )
+    panels = models.ManyToManyField(
+        GenePanel, blank=True, help_text="Only changes of these panels, all if empty"
+    )
+    include_internal = models.BooleanField(
+        default=False, help_text="Include changes of panels which aren't public"
+    )
+    active = models.BooleanField(default=True)
+    batch_size = models.PositiveIntegerField(default=100)
+    max_deliveries_per_minute = models.PositiveIntegerField(default=60)
+    # deliveries in the current minute, shared by all workers
+    rate_limit_window = models.DateTimeField(null=True, blank=True)
+    rate_limit_count = models.PositiveIntegerField(default=0)
+
+    last_sequence = models.BigIntegerField(
+        null=True, blank=True, help_text="Last change delivered"
+    )
+    last_delivery = models.DateTimeField(null=True, blank=True)
+    failures = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    objects = WebhookSubscriptionManager()
+
+    def __str__(self):
+        return self.url
+
+    def save(self, *args, **kwargs):
+        # new subscriptions receive changes made from now on
+        if self.last_sequence is None:
+            PanelChange.objects.assign_sequences()
+            self.last_sequence = PanelChange.objects.latest_sequence()
+        super().save(*args, **kwargs)
+
+    def pending_changes(self):
+        if self.include_internal:
+            changes = PanelChange.objects.visible_to_gel()
+        else:
+            changes = PanelChange.objects.visible_to_public()
+
+        changes = changes.filter(sequence__gt=self.last_sequence, kind__in=self.events)
+        panel_ids = list(self.panels.values_list("pk", flat=True))
+        if panel_ids:
+            changes = changes.filter(panel_id__in=panel_ids)
+        return changes.order_by("sequence")
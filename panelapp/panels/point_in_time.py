@@ -0,0 +1,162 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Content of panels as of a point in time
+
+A version of a panel was active from its creation until the next version was
+created. Current versions are `GenePanelSnapshot`s, previous ones are kept in
+`HistoricalSnapshot` with the time the version was created, so the version
+active at a time is the latest one created before it.
+
+Edits made without incrementing the version (e.g. in edit sessions) are
+part of the version as it was when the next version was created.
+"""
+
+import json
+from collections import namedtuple
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.dateparse import parse_datetime
+
+from panels.models import GenePanelSnapshot
+from panels.models import HistoricalSnapshot
+
+
+PanelVersion = namedtuple("PanelVersion", ["panel_id", "version", "snapshot"])
+
+
+def parse_timestamp(value):
+    """Datetime from an ISO 8601 date or datetime, dates mean the end of the day
+
+    returns:
+        datetime or None if the value can't be parsed
+    """
+
+    try:
+        timestamp = parse_datetime(value)
+        if timestamp is None:
+            date = parse_date(value)
+            if date is None:
+                return None
+            timestamp = datetime.combine(date + timedelta(days=1), time()) - timedelta(
+                microseconds=1
+            )
+    except ValueError:
+        return None
+
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
+
+
+def resolve_versions(timestamp, panels):
+    """Versions of the panels active at `timestamp`
+
+    args:
+        timestamp (datetime): point in time
+        panels (list): current GenePanelSnapshots of the panels
+
+    returns:
+        tuple: list of PanelVersion in the order of `panels` and the list of
+            panel ids which didn't exist at that time
+    """
+
+    previous = {
+        snapshot.panel_id: snapshot
+        for snapshot in HistoricalSnapshot.objects.filter(
+            panel_id__in=[panel.panel_id for panel in panels],
+            version_created__lte=timestamp,
+        )
+        .defer("data")
+        .order_by("panel_id", "-version_created", "-major_version", "-minor_version")
+        .distinct("panel_id")
+    }
+
+    versions = []
+    missing = []
+    for panel in panels:
+        if panel.created <= timestamp:
+            versions.append(PanelVersion(panel.panel_id, panel.version, panel))
+        elif panel.panel_id in previous:
+            snapshot = previous[panel.panel_id]
+            versions.append(
+                PanelVersion(
+                    panel.panel_id,
+                    "{}.{}".format(snapshot.major_version, snapshot.minor_version),
+                    snapshot,
+                )
+            )
+        else:
+            missing.append(panel.panel_id)
+    return versions, missing
+
+
+def version_content(version):
+    """API v1 JSON of the panel version with its entities, cached per version"""
+
+    from api.v1.serializers import PanelSerializer
+
+    snapshot = version.snapshot
+    if isinstance(snapshot, HistoricalSnapshot):
+        key = "panels:as_of:{}:{}".format(version.panel_id, version.version)
+    else:
+        # current versions can still change
+        key = "panels:as_of:{}:{}:{}".format(
+            version.panel_id, version.version, snapshot.revision
+        )
+
+    content = cache.get(key)
+    if content is None:
+        if isinstance(snapshot, HistoricalSnapshot):
+            data = HistoricalSnapshot.objects.values_list("data", flat=True).get(
+                pk=snapshot.pk
+            )
+        else:
+            panel = GenePanelSnapshot.objects.get_active_annotated(
+                all=True, deleted=True, internal=True
+            ).get(pk=snapshot.pk)
+            data = PanelSerializer(panel, include_entities=True).data
+        content = json.dumps(data, cls=DjangoJSONEncoder)
+        if settings.PANELS_AS_OF_CACHE_TIMEOUT:
+            cache.set(key, content, settings.PANELS_AS_OF_CACHE_TIMEOUT)
+    return content
+
+
+def bundle_chunks(timestamp, versions, missing):
+    """JSON bundle with the content of all panel versions, in chunks to stream"""
+
+    yield '{{"as_of": {}, "missing": {}, "panels": ['.format(
+        json.dumps(timestamp, cls=DjangoJSONEncoder), json.dumps(missing)
+    )
+    for index, version in enumerate(versions):
+        if index:
+            yield ","
+        yield version_content(version)
+    yield "]}"
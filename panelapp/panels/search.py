@@ -0,0 +1,156 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Ranked search over panels and the entities they contain.
+
+All lookups here are backed by the `pg_trgm` indexes created in
+`panels/migrations/0080_search_indexes.py`: substring (`icontains`) and
+similarity (`trigram_similar`) matches on upper-cased columns use the GIN
+indexes instead of scanning the tables. Old panel names are matched exactly
+with the GIN index on the `old_panels` array.
+"""
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import models
+from django.db.models import Case
+from django.db.models import FloatField
+from django.db.models import Q
+from django.db.models import Value
+from django.db.models import When
+from django.db.models.functions import Greatest
+from django.db.models.functions import Upper
+
+#: Rank given to the panels matched only via one of their entities
+ENTITY_MATCH_RANK = 0.5
+
+
+class ArrayToString(models.Func):
+    """Space separated array items.
+
+    Uses `panelapp_array_to_string` SQL function which is `array_to_string`
+    marked as IMMUTABLE, so the expression can be indexed.
+    """
+
+    function = "panelapp_array_to_string"
+    template = "%(function)s(%(expressions)s::text[])"
+    output_field = models.TextField()
+
+
+def panel_name_filter(name):
+    """Match panel by its old pk, name, one of its old names or part of the name"""
+
+    return (
+        Q(panel__old_pk=name)
+        | Q(panel__name=name)
+        | Q(old_panels__contains=[name])
+        | Q(panel__name__icontains=name)
+    )
+
+
+def entities_filter(query):
+    """Match panels which contain an entity with this name or phenotype"""
+
+    from panels.models import Gene
+    from panels.models import GenePanelEntrySnapshot
+    from panels.models import STR
+    from panels.models import Region
+
+    gene_symbols = Gene.objects.filter(gene_symbol__iexact=query).values("pk")
+
+    filters = Q()
+    for model in [GenePanelEntrySnapshot, STR, Region]:
+        entity_filters = Q(gene_core_id__in=gene_symbols) | Q(
+            phenotypes_text__icontains=query
+        )
+        if model != GenePanelEntrySnapshot:
+            entity_filters |= Q(name__icontains=query)
+
+        entities = model.objects.annotate(
+            phenotypes_text=ArrayToString("phenotypes")
+        ).filter(entity_filters)
+        filters |= Q(pk__in=entities.values("panel_id"))
+
+    return filters
+
+
+def search_panels(qs, query, entities=True, fuzzy=True):
+    """Filter and rank GenePanelSnapshot queryset by the search query
+
+    Args:
+        qs: GenePanelSnapshot queryset, usually active panels
+        query (str): search term
+        entities (bool): also match panels by their entities names and phenotypes
+        fuzzy (bool): include names similar to the query, not only the ones containing it
+
+    Returns:
+        Queryset annotated with `search_rank`, best matches first
+    """
+
+    qs = qs.annotate(
+        search_panel_name=Upper("panel__name"),
+        search_title=Upper("level4title__name"),
+        search_old_panels=ArrayToString("old_panels"),
+    )
+
+    filters = (
+        panel_name_filter(query)
+        | Q(level4title__name__icontains=query)
+        | Q(level4title__level2title__icontains=query)
+        | Q(level4title__level3title__icontains=query)
+        | Q(search_old_panels__icontains=query)
+    )
+    if fuzzy:
+        filters |= Q(search_panel_name__trigram_similar=query) | Q(
+            search_title__trigram_similar=query
+        )
+
+    ranks = [
+        Case(
+            When(
+                Q(panel__old_pk=query) | Q(panel__name__iexact=query),
+                then=Value(1.0),
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        TrigramSimilarity("search_panel_name", query),
+        TrigramSimilarity("search_title", query),
+        TrigramSimilarity("search_old_panels", query),
+    ]
+
+    if entities:
+        entity_filters = entities_filter(query)
+        filters |= entity_filters
+        ranks.append(
+            Case(
+                When(entity_filters, then=Value(ENTITY_MATCH_RANK)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+    return (
+        qs.filter(filters)
+        .annotate(search_rank=Greatest(*ranks, output_field=FloatField()))
+        .order_by("-search_rank", "level4title__name")
+    )
@@ -167,13 +167,26 @@ def email_panel_promoted(panel_pk):
     """Emails everyone who contributed to the panel about the new major version"""
 
     from panels.models import GenePanel
+    from panels.models import PanelChange
+    from panels.models import WebhookSubscription
 
     active_panel = GenePanel.objects.get(pk=panel_pk).active_panel
 
     subject = "A panel you reviewed has been promoted"
     messages = []
 
+    # integrations are notified by their webhooks instead
+    webhook_users = set(
+        WebhookSubscription.objects.covering(
+            active_panel.panel, PanelChange.KIND.promoted
+        )
+        .filter(user__isnull=False)
+        .values_list("user_id", flat=True)
+    )
+
     for contributor in active_panel.contributors:
+        if contributor.pk in webhook_users:
+            continue
         if contributor.email:  # check if we have an email in the database
             text = render_to_string(
                 "panels/emails/panel_promoted.txt",
@@ -521,3 +534,184 @@ def background_copy_region(user_pk, region_name, source_panel_pk, target_panel_p
             exc_info=True
         )
         raise
+
+
+@shared_task
+def update_entity_catalogue(panel_pk=None):
+    """Refresh entity catalogue for the GenePanel
+
+    Panel memberships are refreshed with the panel changes, see
+    `GenePanel.refresh_derived_data`.
+
+    Args:
+        panel_pk: GenePanel ID, rebuilds the catalogue and memberships if not set
+    """
+
+    from panels.models import EntityCatalogue
+    from panels.models import EntityPanelMembership
+
+    if panel_pk:
+        EntityCatalogue.objects.refresh_panel(panel_pk)
+    else:
+        EntityCatalogue.objects.rebuild()
+        EntityPanelMembership.objects.rebuild()
+
+
+PANELS_EXPORT_SCHEDULED = "panels_export_scheduled"
+
+
+@shared_task
+def export_panels():
+    """Rebuild the prebuilt panel downloads, see `panels.exports`"""
+
+    from django.core.cache import cache
+    from panels.exports import export_panels
+
+    # changes made while exporting schedule another run
+    cache.delete(PANELS_EXPORT_SCHEDULED)
+    export_panels()
+
+
+def schedule_panels_export():
+    """Export panels once after a burst of changes
+
+    The export is delayed by `PANEL_EXPORTS_DEBOUNCE` seconds, changes made
+    in the meantime don't queue more exports. Disabled if set to 0.
+    """
+
+    from django.core.cache import cache
+
+    countdown = settings.PANEL_EXPORTS_DEBOUNCE
+    if countdown and cache.add(PANELS_EXPORT_SCHEDULED, True, countdown):
+        export_panels.apply_async(countdown=countdown)
+
+
+RELATED_PANELS_UPDATE_SCHEDULED = "related_panels_update_scheduled"
+
+
+@shared_task
+def update_related_panels():
+    """Recompute related panels of all active panels, see `RelatedPanel`"""
+
+    from django.core.cache import cache
+    from panels.models import RelatedPanel
+
+    # changes made while computing schedule another run
+    cache.delete(RELATED_PANELS_UPDATE_SCHEDULED)
+    RelatedPanel.objects.rebuild(settings.RELATED_PANELS_TOP_K)
+
+
+def schedule_related_panels_update():
+    """Update related panels once after a burst of changes
+
+    Delayed by `RELATED_PANELS_DEBOUNCE` seconds, disabled if set to 0.
+    """
+
+    from django.core.cache import cache
+
+    countdown = settings.RELATED_PANELS_DEBOUNCE
+    if countdown and cache.add(RELATED_PANELS_UPDATE_SCHEDULED, True, countdown):
+        update_related_panels.apply_async(countdown=countdown)
+
+
+WEBHOOK_DELIVERY_SCHEDULED = "webhook_delivery_scheduled"
+
+
+@shared_task
+def deliver_webhooks():
+    """Send pending panel changes to webhook subscriptions, see `panels.webhooks`"""
+
+    from django.core.cache import cache
+    from panels.webhooks import deliver_all
+
+    cache.delete(WEBHOOK_DELIVERY_SCHEDULED)
+    deliver_all()
+
+
+def schedule_webhook_delivery():
+    """Deliver webhooks shortly after panels change
+
+    Changes made in the next `WEBHOOK_DELIVERY_DELAY` seconds are sent in the
+    same batch. If set to 0 webhooks are only sent by the periodic task.
+    """
+
+    from django.core.cache import cache
+
+    countdown = settings.WEBHOOK_DELIVERY_DELAY
+    if countdown and cache.add(WEBHOOK_DELIVERY_SCHEDULED, True, countdown):
+        deliver_webhooks.apply_async(countdown=countdown)
+
+
+@shared_task
+def seal_expired_edit_sessions():
+    """Seal panel edit sessions left without changes, see `PanelEditSession`"""
+
+    from panels.models import PanelEditSession
+
+    for session in PanelEditSession.objects.expired():
+        session.seal()
+
+
+SUPER_PANEL_UPDATE_SCHEDULED = "super_panel_update_scheduled:{}"
+
+
+@shared_task
+def update_super_panel(panel_pk, increment=False, major=False):
+    """Increment the super panel version if requested and update its stats
+
+    Args:
+        panel_pk: GenePanelSnapshot ID of the super panel
+        increment: increment the version, also done if there is a pending `SuperPanelUpdate`
+        major: major version increment
+    """
+
+    from django.core.cache import cache
+    from panels.models import GenePanelSnapshot
+    from panels.models import SuperPanelUpdate
+
+    # changes made while updating schedule another run
+    cache.delete(SUPER_PANEL_UPDATE_SCHEDULED.format(panel_pk))
+
+    gps = GenePanelSnapshot.objects.get(pk=panel_pk)
+    if gps != gps.panel.active_panel:
+        gps = gps.panel.active_panel
+
+    with transaction.atomic():
+        pending = SuperPanelUpdate.objects.pop(gps.panel_id)
+        if pending:
+            increment = True
+            major = major or pending.major
+
+        if increment:
+            gps = gps.increment_version(major=major)
+    gps._update_saved_stats()
+
+
+def schedule_super_panel_update(panel_pk, increment=False, major=False):
+    """Update a super panel once after a burst of changes in its child panels
+
+    Changes in the `SUPER_PANEL_UPDATE_DEBOUNCE` seconds after the first one
+    are coalesced into a single version increment and stats update. The
+    increment is stored in `SuperPanelUpdate` as part of the current
+    transaction and the update is scheduled once it is committed. The cache
+    only avoids scheduling the task for every change, processes not sharing
+    the cache may schedule extra runs which just update the stats. If set
+    to 0 the super panel is updated for every change.
+    """
+
+    from django.core.cache import cache
+    from panels.models import SuperPanelUpdate
+
+    countdown = settings.SUPER_PANEL_UPDATE_DEBOUNCE
+    if not countdown:
+        update_super_panel.delay(panel_pk, increment=increment, major=major)
+        return
+
+    if increment:
+        SuperPanelUpdate.objects.request(panel_pk, major=major)
+
+    def schedule():
+        if cache.add(SUPER_PANEL_UPDATE_SCHEDULED.format(panel_pk), True, countdown):
+            update_super_panel.apply_async((panel_pk,), countdown=countdown)
+
+    transaction.on_commit(schedule)
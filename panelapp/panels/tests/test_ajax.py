@@ -27,6 +27,7 @@ from panels.tests.factories import GenePanelEntrySnapshotFactory
 from panels.models import GenePanel
 from panels.models import TrackRecord
 from panels.models import Evidence
+from panels.models import PanelChange
 
 
 class AjaxGenePanelEntrySnapshotTest(LoginGELUser):
@@ -71,6 +72,15 @@ class AjaxGenePanelEntrySnapshotTest(LoginGELUser):
         res, gene = self.helper_clear("clear_entity_mode_of_pathogenicity")
         assert gene.mode_of_pathogenicity == ""
 
+    def test_clear_records_change(self):
+        res, gene = self.helper_clear("clear_entity_phenotypes")
+        change = PanelChange.objects.get(
+            panel=gene.panel.panel, kind=PanelChange.KIND.updated
+        )
+        assert change.entity_type == "gene"
+        assert change.entity_name == gene.name
+        assert change.panel_version == gene.panel.version
+
     def test_clear_sources(self):
         res, gene = self.helper_clear("clear_entity_sources")
         assert gene.evidence.count() == 3
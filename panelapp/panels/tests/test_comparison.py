@@ -0,0 +1,152 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.urls import reverse_lazy
+from accounts.tests.setup import LoginGELUser
+from panels.comparison import PanelComparison
+from panels.comparison import bit_positions
+from panels.comparison import popcount
+from panels.comparison import to_bitset
+from panels.forms import CompareManyPanelsForm
+from panels.models import EntityIndex
+from panels.models import GenePanel
+from panels.tests.factories import GeneFactory
+from panels.tests.factories import GenePanelSnapshotFactory
+from panels.tests.factories import GenePanelEntrySnapshotFactory
+from panels.tests.factories import STRFactory
+
+
+class BitsetTest(SimpleTestCase):
+    def test_bitset(self):
+        positions = [0, 3, 8, 63, 64, 1000]
+        bitset = to_bitset(positions)
+        self.assertEqual(list(bit_positions(bitset)), positions)
+        self.assertEqual(popcount(bitset), len(positions))
+        self.assertEqual(to_bitset([]), 0)
+        self.assertEqual(list(bit_positions(0)), [])
+
+
+class PanelComparisonTest(LoginGELUser):
+    def setUp(self):
+        super().setUp()
+        self.genes = GeneFactory.create_batch(4)
+        self.panels = GenePanelSnapshotFactory.create_batch(
+            3, panel__status=GenePanel.STATUS.public
+        )
+        members = [[0, 1, 2], [1, 2, 3], [2]]
+        for panel, indexes in zip(self.panels, members):
+            for index in indexes:
+                GenePanelEntrySnapshotFactory(panel=panel, gene_core=self.genes[index])
+        self.str = STRFactory(panel=self.panels[0])
+
+    def symbols(self, entities):
+        return sorted(e["entity_name"] for e in entities if e["entity_type"] == "gene")
+
+    def test_operations(self):
+        comparison = PanelComparison(self.panels)
+        ids = [panel.panel_id for panel in self.panels]
+
+        self.assertEqual(
+            self.symbols(comparison.entities(comparison.intersection(ids))),
+            [self.genes[2].gene_symbol],
+        )
+        self.assertEqual(
+            self.symbols(comparison.entities(comparison.union(ids))),
+            sorted(gene.gene_symbol for gene in self.genes),
+        )
+        self.assertEqual(
+            self.symbols(comparison.entities(comparison.difference(ids[:2], ids[2:]))),
+            [self.genes[1].gene_symbol],
+        )
+
+        union = comparison.entities(comparison.union(ids))
+        self.assertIn(
+            {"entity_type": "str", "entity_name": self.str.name, "panels": [ids[0]]},
+            union,
+        )
+
+        overlap = comparison.overlaps()[0]
+        self.assertEqual(overlap["panels"], ids[:2])
+        self.assertEqual(overlap["shared"], 2)
+        self.assertEqual(overlap["jaccard"], round(2 / 5, 4))
+
+    def test_entity_types(self):
+        comparison = PanelComparison(self.panels, entity_types=["str"])
+        self.assertEqual(
+            comparison.entities(comparison.union()),
+            [
+                {
+                    "entity_type": "str",
+                    "entity_name": self.str.name,
+                    "panels": [self.panels[0].panel_id],
+                }
+            ],
+        )
+
+    def test_positions_stable(self):
+        PanelComparison(self.panels)
+        positions = dict(
+            ((entity_type, name), pk)
+            for pk, entity_type, name in EntityIndex.objects.values_list(
+                "pk", "entity_type", "name"
+            )
+        )
+        self.assertEqual(EntityIndex.objects.positions(positions.keys()), positions)
+
+    def test_compare_many_panels_view(self):
+        url = reverse_lazy("panels:compare_many_panels")
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(res.context["comparison"])
+
+        res = self.client.get(
+            url,
+            {
+                "panels": [self.panels[0].pk, self.panels[1].pk],
+                "exclude": [self.panels[2].pk],
+                "operation": "intersection",
+            },
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            self.symbols(res.context["comparison"]), [self.genes[1].gene_symbol]
+        )
+
+    @patch.object(CompareManyPanelsForm, "max_panels", 2)
+    def test_compare_many_panels_view_limit(self):
+        res = self.client.get(
+            reverse_lazy("panels:compare_many_panels"),
+            {
+                "panels": [self.panels[0].pk, self.panels[1].pk],
+                "exclude": [self.panels[2].pk],
+                "operation": "intersection",
+            },
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertIsNone(res.context["comparison"])
+        self.assertIn(
+            "At most 2 panels can be compared", res.context["form"].non_field_errors()
+        )
@@ -0,0 +1,141 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+from unittest.mock import patch
+from django.urls import reverse_lazy
+from accounts.tests.setup import LoginGELUser
+from panels.models import EntityCatalogue
+from panels.models import EntityPanelMembership
+from panels.models import GenePanel
+from panels.tests.factories import GenePanelEntrySnapshotFactory
+from panels.tests.factories import GenePanelSnapshotFactory
+from panels.tests.factories import STRFactory
+from panels.tests.factories import TagFactory
+
+
+class EntityCatalogueTest(LoginGELUser):
+    def setUp(self):
+        super().setUp()
+        self.tag = TagFactory()
+        self.gpes = GenePanelEntrySnapshotFactory(
+            panel__panel__status=GenePanel.STATUS.public
+        )
+        self.gpes.tags.add(self.tag)
+        self.str_item = STRFactory(panel__panel__status=GenePanel.STATUS.internal)
+        EntityCatalogue.objects.rebuild()
+
+    def test_visibility(self):
+        public = list(
+            EntityCatalogue.objects.get_entities().values_list("entity_type", "name")
+        )
+        self.assertEqual(public, [("gene", self.gpes.gene_core.gene_symbol)])
+
+        gel = list(
+            EntityCatalogue.objects.get_entities(gel_reviewer=True).values_list(
+                "entity_type", "name"
+            )
+        )
+        self.assertIn(("str", self.str_item.name), gel)
+        self.assertIn(("gene", self.gpes.gene_core.gene_symbol), gel)
+
+    def test_tag_filter(self):
+        tagged = EntityCatalogue.objects.get_entities(
+            gel_reviewer=True, tag=self.tag.name
+        ).values_list("name", flat=True)
+        self.assertEqual(list(tagged), [self.gpes.gene_core.gene_symbol])
+
+    def test_refresh_panel(self):
+        gene_symbol = self.gpes.gene_core.gene_symbol
+        panel = self.gpes.panel
+        panel.delete_gene(gene_symbol, increment=False)
+        EntityCatalogue.objects.refresh_panel(panel.panel_id)
+
+        self.assertFalse(EntityCatalogue.objects.filter(name=gene_symbol).exists())
+        self.assertTrue(EntityCatalogue.objects.filter(name=self.str_item.name).exists())
+
+    def test_refreshed_after_commit(self):
+        gene_symbol = self.gpes.gene_core.gene_symbol
+        with patch("panels.models.genepanel.transaction.on_commit") as on_commit:
+            self.gpes.panel.delete_gene(gene_symbol)
+
+        # memberships are refreshed with the change, the catalogue once committed
+        self.assertFalse(EntityPanelMembership.objects.for_entity(gene_symbol).exists())
+        self.assertTrue(EntityCatalogue.objects.filter(name=gene_symbol).exists())
+        for call in on_commit.call_args_list:
+            call[0][0]()
+        self.assertFalse(EntityCatalogue.objects.filter(name=gene_symbol).exists())
+
+    def test_entities_list(self):
+        res = self.client.get(reverse_lazy("panels:entities_list"))
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, self.gpes.gene_core.gene_symbol)
+        self.assertContains(res, self.str_item.name)
+
+    def test_entities_list_filters(self):
+        gene_symbol = self.gpes.gene_core.gene_symbol
+        url = reverse_lazy("panels:entities_list")
+
+        res = self.client.get(url, {"name": gene_symbol[:2].lower()})
+        self.assertIn(("gene", gene_symbol, gene_symbol), res.context_data["entities"])
+
+        res = self.client.get(url, {"entity_type": "str"})
+        self.assertEqual(
+            list(res.context_data["entities"]),
+            [("str", self.str_item.name, self.str_item.name)],
+        )
+
+    def test_entities_list_paginated(self):
+        with patch("panels.views.entities.EntitiesListView.paginate_by", 1):
+            res = self.client.get(reverse_lazy("panels:entities_list"), {"page": 2})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.context_data["entities"]), 1)
+        self.assertEqual(res.context_data["paginator"].count, 2)
+
+
+class EntityPanelMembershipTest(LoginGELUser):
+    def test_super_panel_names(self):
+        gpes = GenePanelEntrySnapshotFactory(
+            panel__panel__status=GenePanel.STATUS.public
+        )
+        parent = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        parent.child_panels.set([gpes.panel])
+        parent._update_saved_stats()
+
+        membership = EntityPanelMembership.objects.for_entity(
+            gpes.gene_core.gene_symbol
+        ).get()
+        self.assertEqual(membership.panel_id, gpes.panel.pk)
+        self.assertEqual(membership.confidence_level, gpes.saved_gel_status)
+        self.assertEqual(
+            membership.superpanels_names([GenePanel.STATUS.public]),
+            [parent.level4title.name],
+        )
+
+        res = self.client.get(
+            reverse_lazy(
+                "panels:entity_detail", kwargs={"slug": gpes.gene_core.gene_symbol}
+            )
+        )
+        self.assertEqual(
+            res.context_data["entries"][0].superpanels_names, [parent.level4title.name]
+        )
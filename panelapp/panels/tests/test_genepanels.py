@@ -21,8 +21,11 @@
 ## specific language governing permissions and limitations
 ## under the License.
 ##
+import gzip
 import os
+import tempfile
 from django.core import mail
+from django.core.files.storage import default_storage
 from django.test import Client
 from django.urls import reverse_lazy
 from faker import Factory
@@ -30,7 +33,13 @@ from accounts.tests.setup import LoginGELUser
 from panels.models import GenePanel
 from panels.models import GenePanelEntrySnapshot
 from panels.models import HistoricalSnapshot
+from panels.exports import ALL_PANELS
+from panels.exports import panel_tsv_name
+from panels.gene_matrix import export_gene_matrix
+from panels.gene_matrix import get_manifest
+from panels.gene_matrix import load_matrix
 from panels.tasks import email_panel_promoted
+from panels.tasks import export_panels
 from panels.tests.factories import GeneFactory
 from panels.tests.factories import STRFactory
 from panels.tests.factories import EvidenceFactory
@@ -490,6 +499,117 @@ class GenePanelTest(LoginGELUser):
         res = self.client.get(reverse_lazy("panels:download_panels"))
         self.assertEqual(res.status_code, 200)
 
+    def test_download_all_panels_export(self):
+        gps = GenePanelSnapshotFactory()
+        GenePanelEntrySnapshotFactory.create_batch(2, panel=gps)
+
+        with tempfile.TemporaryDirectory() as media_root:
+            with tempfile.TemporaryDirectory() as private_root:
+                with self.settings(
+                    MEDIA_ROOT=media_root, EXPORTS_PRIVATE_ROOT=private_root
+                ):
+                    res = self.client.get(reverse_lazy("panels:download_panels"))
+                    self.assertEqual(res.status_code, 200)
+                    self.assertNotIn("Last-Modified", res)
+
+                    export_panels()
+                    # internal panels and emails aren't saved in the public storage
+                    self.assertFalse(
+                        os.path.exists(os.path.join(media_root, ALL_PANELS))
+                    )
+                    self.assertTrue(
+                        os.path.exists(os.path.join(private_root, ALL_PANELS))
+                    )
+
+                    res = self.client.get(reverse_lazy("panels:download_panels"))
+                    self.assertEqual(res.status_code, 200)
+                    self.assertIn("Last-Modified", res)
+                    content = b"".join(res.streaming_content).decode()
+                    self.assertIn(gps.level4title.name, content)
+
+                    res = self.client.get(
+                        reverse_lazy("panels:download_panels"),
+                        HTTP_IF_MODIFIED_SINCE=res["Last-Modified"],
+                    )
+                    self.assertEqual(res.status_code, 304)
+
+    def test_download_panel_tsv_export(self):
+        gps = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        GenePanelEntrySnapshotFactory.create_batch(2, panel=gps)
+        url = reverse_lazy("panels:download_panel_tsv", args=(gps.panel.pk, "01234"))
+
+        with tempfile.TemporaryDirectory() as media_root:
+            with self.settings(MEDIA_ROOT=media_root, EXPORTS_PRIVATE_ROOT=media_root):
+                res = self.client.get(url)
+                self.assertNotIn("Last-Modified", res)
+                generated = res.content
+
+                export_panels()
+                name = panel_tsv_name(gps.panel.active_panel)
+                self.assertTrue(os.path.exists(os.path.join(media_root, name)))
+
+                res = self.client.get(url)
+                self.assertIn("Last-Modified", res)
+                self.assertEqual(b"".join(res.streaming_content), generated)
+
+                # changed panels are generated until they are exported again
+                gps.panel.bump_revision()
+                del gps.panel.active_panel
+                res = self.client.get(url)
+                self.assertNotIn("Last-Modified", res)
+
+                export_panels()
+                self.assertFalse(os.path.exists(os.path.join(media_root, name)))
+                self.assertTrue(
+                    os.path.exists(
+                        os.path.join(media_root, panel_tsv_name(gps.panel.active_panel))
+                    )
+                )
+
+    def test_gene_matrix_export(self):
+        gps = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        gpes = GenePanelEntrySnapshotFactory.create_batch(2, panel=gps)
+
+        with tempfile.TemporaryDirectory() as media_root:
+            with self.settings(MEDIA_ROOT=media_root, EXPORTS_PRIVATE_ROOT=media_root):
+                self.assertEqual(
+                    self.client.get(
+                        reverse_lazy("panels:download_gene_matrix", args=("tsv",))
+                    ).status_code,
+                    404,
+                )
+
+                self.assertTrue(export_gene_matrix())
+                self.assertFalse(export_gene_matrix())
+
+                manifest = get_manifest(default_storage)
+                with gzip.open(os.path.join(media_root, manifest["binary"])) as f:
+                    matrix = load_matrix(f)
+                self.assertEqual(matrix["panels"][-1]["id"], gps.panel.pk)
+                start, end = matrix["offsets"][-2:]
+                self.assertEqual(
+                    sorted(matrix["genes"][row][1] for row in matrix["rows"][start:end]),
+                    sorted(entry.gene_core.gene_symbol for entry in gpes),
+                )
+
+                with gzip.open(
+                    os.path.join(media_root, manifest["tsv"]), "rt"
+                ) as f:
+                    content = f.read()
+                self.assertIn(gpes[0].gene_core.gene_symbol, content)
+
+                res = self.client.get(
+                    reverse_lazy("panels:download_gene_matrix", args=("tsv",))
+                )
+                self.assertEqual(res.status_code, 302)
+                self.assertIn(manifest["version"], res.url)
+
+                gps.increment_version()
+                self.assertTrue(export_gene_matrix())
+                self.assertNotEqual(
+                    get_manifest(default_storage)["version"], manifest["version"]
+                )
+
     def test_email_panel_promoted(self):
         gpes = GenePanelEntrySnapshotFactory()
         email_panel_promoted(gpes.panel.panel.pk)
@@ -23,6 +23,7 @@
 ##
 from random import randint
 from django.urls import reverse_lazy
+from datetime import timedelta
 from django.utils import timezone
 from django.db.models import Q
 from django.contrib.postgres.aggregates import ArrayAgg
@@ -37,6 +38,8 @@ from panels.models import Evidence
 from panels.models import GenePanel
 from panels.models import Evaluation
 from panels.models import HistoricalSnapshot
+from panels.models import PanelEditSession
+from panels.models import EntityPanelMembership
 from panels.tests.factories import GeneFactory
 from panels.tests.factories import RegionFactory
 from panels.tests.factories import GenePanelSnapshotFactory
@@ -161,6 +164,108 @@ class GenePanelSnapshotTest(LoginGELUser):
         assert res.status_code == 302
         assert number_of_genes + 1 == new_current_number
 
+    def test_edit_session_single_version(self):
+        gps = GenePanelSnapshotFactory()
+        super_panel = GenePanelSnapshotFactory()
+        super_panel.child_panels.set([gps])
+        url = reverse_lazy("panels:edit_session", kwargs={"pk": gps.panel.pk})
+        self.client.post(url)
+        self.assertIsNotNone(PanelEditSession.objects.get_open(gps.panel.pk))
+
+        add_url = reverse_lazy(
+            "panels:add_entity", kwargs={"pk": gps.panel.pk, "entity_type": "gene"}
+        )
+        for gene in GeneFactory.create_batch(3):
+            gene_data = {
+                "gene": gene.pk,
+                "source": choice(Evidence.DROPDOWN_SOURCES),
+                "phenotypes": fake.sentence(),
+                "rating": Evaluation.RATINGS.AMBER,
+                "moi": [x for x in Evaluation.MODES_OF_INHERITANCE][randint(1, 12)][0],
+                "mode_of_pathogenicity": [x for x in Evaluation.MODES_OF_PATHOGENICITY][
+                    randint(1, 2)
+                ][0],
+                "penetrance": GenePanelEntrySnapshot.PENETRANCE.Incomplete,
+            }
+            res = self.client.post(add_url, gene_data)
+            self.assertEqual(res.status_code, 302)
+
+        active = GenePanel.objects.get(pk=gps.panel.pk).active_panel
+        self.assertEqual(active.minor_version, gps.minor_version + 1)
+        self.assertEqual(HistoricalSnapshot.objects.filter(panel=gps.panel).count(), 1)
+        self.assertEqual(active.stats.get("number_of_genes", 0), 0)
+        self.assertEqual(
+            EntityPanelMembership.objects.filter(
+                panel=active, entity_type="gene"
+            ).count(),
+            3,
+        )
+        self.assertIsNotNone(active.revision)
+        super_version = GenePanel.objects.get(pk=super_panel.panel.pk).active_panel.version
+        self.assertEqual(super_version, super_panel.version)
+
+        self.client.post(url)
+        session = PanelEditSession.objects.get(panel=gps.panel)
+        self.assertIsNotNone(session.sealed)
+        self.assertEqual(session.changes, 3)
+
+        active = GenePanel.objects.get(pk=gps.panel.pk).active_panel
+        self.assertEqual(active.version, "{}.{}".format(gps.major_version, gps.minor_version + 1))
+        self.assertEqual(active.stats["number_of_genes"], 3)
+        super_active = GenePanel.objects.get(pk=super_panel.panel.pk).active_panel
+        self.assertNotEqual(super_active.version, super_panel.version)
+
+    def test_promote_with_edit_session(self):
+        gps = GenePanelSnapshotFactory()
+        super_panel = GenePanelSnapshotFactory()
+        super_panel.child_panels.set([gps])
+        session, _ = PanelEditSession.objects.open(gps.panel, self.gel_user)
+        gps.increment_version()
+
+        del gps.panel.active_panel
+        gps.panel.active_panel.increment_version(major=True, user=self.gel_user)
+
+        session.refresh_from_db()
+        self.assertIsNotNone(session.sealed)
+        super_active = GenePanel.objects.get(pk=super_panel.panel.pk).active_panel
+        self.assertEqual(super_active.version, "1.0")
+        self.assertEqual(
+            HistoricalSnapshot.objects.filter(panel=super_panel.panel).count(), 1
+        )
+
+    def test_increment_version_stale_instance(self):
+        gps = GenePanelSnapshotFactory()
+        stale = GenePanelSnapshot.objects.get(pk=gps.pk)
+
+        gps.increment_version()
+        stale.increment_version()
+
+        active = GenePanel.objects.get(pk=gps.panel.pk).active_panel
+        self.assertEqual(active.version, "0.2")
+        self.assertEqual(
+            sorted(
+                HistoricalSnapshot.objects.filter(panel=gps.panel).values_list(
+                    "minor_version", flat=True
+                )
+            ),
+            [0, 1],
+        )
+
+    def test_edit_session_expired(self):
+        gps = GenePanelSnapshotFactory()
+        session, _ = PanelEditSession.objects.open(gps.panel, self.gel_user)
+        gps.increment_version()
+
+        PanelEditSession.objects.filter(pk=session.pk).update(
+            modified=timezone.now() - timedelta(days=1)
+        )
+        from panels.tasks import seal_expired_edit_sessions
+
+        seal_expired_edit_sessions()
+        session.refresh_from_db()
+        self.assertIsNotNone(session.sealed)
+        self.assertIsNone(PanelEditSession.objects.get_open(gps.panel.pk))
+
     def test_gel_curator_gene_red(self):
         """When gene is added by a GeL currator it should be marked as red"""
 
@@ -30,6 +30,7 @@ from faker import Factory
 from accounts.tests.setup import LoginGELUser
 from panels.models.import_tools import update_gene_collection
 from panels.models import Gene
+from panels.models import GenePayload
 
 from panels.models import GenePanel
 from panels.models import GenePanelSnapshot
@@ -97,6 +98,22 @@ class GeneTest(LoginGELUser):
         res = self.client.get(reverse_lazy("panels:download_genes"))
         self.assertEqual(res.status_code, 200)
 
+    def test_aggregate_ratings_annotated(self):
+        gps = GenePanelSnapshotFactory()
+        GenePanelEntrySnapshotFactory.create_batch(3, panel=gps)
+
+        entries = list(gps.get_all_genes_extra)
+        with self.assertNumQueries(0):
+            annotated = [entry.aggregate_ratings() for entry in entries]
+
+        self.assertEqual(
+            annotated,
+            [
+                GenePanelEntrySnapshot.objects.get(pk=entry.pk).aggregate_ratings()
+                for entry in entries
+            ],
+        )
+
     def test_list_genes(self):
         GenePanelEntrySnapshotFactory.create_batch(3)
         r = self.client.get(reverse_lazy("panels:entities_list"))
@@ -342,3 +359,22 @@ class GeneTest(LoginGELUser):
         gps = GenePanelSnapshotFactory()
         res = self.client.get(f"/panels/{gps.panel.pk}/gene/HGNC:99999/")
         self.assertEqual(res.status_code, 404)
+
+    def test_gene_payload_shared(self):
+        gene = GeneFactory()
+        gpes = GenePanelEntrySnapshotFactory.create(gene_core=gene)
+        str_item = STRFactory.create(gene_core=gene)
+        GenePanelEntrySnapshotFactory.create(gene_core=gene)
+
+        self.assertEqual(GenePayload.objects.filter(gene=gene).count(), 1)
+        self.assertEqual(gpes.gene_payload_id, str_item.gene_payload_id)
+
+        gpes = GenePanelEntrySnapshot.objects.get(pk=gpes.pk)
+        self.assertEqual(gpes.gene["gene_symbol"], gene.gene_symbol)
+
+        gpes.gene["gene_name"] = "Updated name"
+        gpes.save()
+        gpes.refresh_from_db()
+        self.assertEqual(gpes.gene["gene_name"], "Updated name")
+        self.assertNotEqual(gpes.gene_payload_id, str_item.gene_payload_id)
+        self.assertEqual(GenePayload.objects.filter(gene=gene).count(), 2)
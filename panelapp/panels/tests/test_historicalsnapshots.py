@@ -22,7 +22,11 @@
 ## under the License.
 ##
 import json
+import tempfile
+from datetime import timedelta
+from django.core.management import call_command
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.test import Client
 from faker import Factory
 from random import choice
@@ -74,6 +78,16 @@ class HistoricalSnapshotTest(LoginGELUser):
         assert snap.major_version == gpes.major_version
         assert snap.minor_version == gpes.minor_version
 
+    def test_import_panel_metadata(self):
+        gps = GenePanelSnapshotFactory()
+        GenePanelEntrySnapshotFactory.create_batch(2, panel=gps)
+        snap = HistoricalSnapshot.import_panel(gps)
+
+        assert "genes" not in snap.metadata
+        assert "strs" not in snap.metadata
+        assert snap.metadata["name"] == snap.data["name"]
+        assert snap.metadata["version"] == snap.data["version"]
+
     def test_download_historical_snapshot_tsv(self):
         gps = GenePanelSnapshotFactory()
 
@@ -96,3 +110,77 @@ class HistoricalSnapshotTest(LoginGELUser):
 
         assert res.status_code == 200
 
+    def test_panels_as_of(self):
+        gps = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        genes = GenePanelEntrySnapshotFactory.create_batch(2, panel=gps)
+        other = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        before_change = timezone.now()
+        gps.delete_gene(genes[0].gene_core.gene_symbol)
+
+        url = reverse_lazy("api:v1:panels-as-of")
+        panels = "{},{}".format(gps.panel.pk, other.panel.pk)
+
+        res = self.client.get(url, {"date": before_change.isoformat(), "panels": panels})
+        self.assertEqual(res.status_code, 200)
+        data = json.loads(b"".join(res.streaming_content))
+        versions = {panel["id"]: panel for panel in data["panels"]}
+        self.assertEqual(versions[gps.panel.pk]["version"], "0.0")
+        self.assertEqual(len(versions[gps.panel.pk]["genes"]), 2)
+        self.assertEqual(data["missing"], [])
+
+        res = self.client.get(url, {"date": timezone.now().isoformat(), "panels": panels})
+        versions = {
+            panel["id"]: panel
+            for panel in json.loads(b"".join(res.streaming_content))["panels"]
+        }
+        self.assertEqual(versions[gps.panel.pk]["version"], "0.1")
+        self.assertEqual(len(versions[gps.panel.pk]["genes"]), 1)
+
+        earlier = (gps.created - timedelta(days=1)).date().isoformat()
+        res = self.client.get(url, {"date": earlier, "panels": panels})
+        data = json.loads(b"".join(res.streaming_content))
+        self.assertEqual(data["panels"], [])
+        self.assertEqual(sorted(data["missing"]), sorted([gps.panel.pk, other.panel.pk]))
+
+        self.assertEqual(self.client.get(url, {"panels": panels}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"date": earlier}).status_code, 400)
+
+        with tempfile.NamedTemporaryFile("r") as output:
+            call_command(
+                "panels_as_of",
+                before_change.isoformat(),
+                "--panel",
+                str(gps.panel.pk),
+                "--output",
+                output.name,
+            )
+            data = json.load(output)
+        self.assertEqual(data["panels"][0]["version"], "0.0")
+
+    def test_version_diff(self):
+        gps = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        genes = GenePanelEntrySnapshotFactory.create_batch(2, panel=gps)
+        deleted = genes[0].gene_core.gene_symbol
+        gps.delete_gene(deleted)
+
+        url = reverse_lazy("api:v1:panels-diff", args=(gps.panel.pk,))
+        res = self.client.get(url, {"from": "0.0", "to": "0.1"})
+        self.assertEqual(res.status_code, 200)
+        diff = res.json()
+        self.assertEqual(diff["from"], "0.0")
+        self.assertEqual(diff["to"], "0.1")
+        self.assertEqual([entity["entity_name"] for entity in diff["removed"]], [deleted])
+        self.assertEqual(diff["added"], [])
+        self.assertEqual(diff["summary"]["removed"], 1)
+
+        # the target version defaults to the current one
+        self.assertEqual(self.client.get(url, {"from": "0.0"}).json()["to"], "0.1")
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {"from": "9.9"}).status_code, 404)
+
+        res = self.client.get(
+            reverse_lazy("panels:panel_version_diff", args=(gps.panel.pk,)),
+            {"from": "0.0"},
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, deleted)
@@ -0,0 +1,59 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+from unittest.mock import patch
+from django.test import SimpleTestCase
+from django.test import override_settings
+from panels.exceptions import PanelVersionConflict
+from panels.locks import retry_panel_conflicts
+
+
+class RetryPanelConflictsTest(SimpleTestCase):
+    @override_settings(PANEL_LOCK_RETRIES=3)
+    @patch("panels.locks.time.sleep")
+    def test_retry(self, sleep):
+        calls = []
+
+        @retry_panel_conflicts
+        def edit():
+            calls.append(1)
+            if len(calls) < 3:
+                raise PanelVersionConflict(1)
+            return "done"
+
+        self.assertEqual(edit(), "done")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+        first, second = [c[0][0] for c in sleep.call_args_list]
+        self.assertLess(first, second)
+
+    @override_settings(PANEL_LOCK_RETRIES=1)
+    @patch("panels.locks.time.sleep")
+    def test_retries_exhausted(self, sleep):
+        @retry_panel_conflicts
+        def edit():
+            raise PanelVersionConflict(1)
+
+        with self.assertRaises(PanelVersionConflict):
+            edit()
+        self.assertEqual(sleep.call_count, 1)
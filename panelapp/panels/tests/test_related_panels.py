@@ -0,0 +1,102 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+from django.urls import reverse_lazy
+from accounts.tests.setup import LoginGELUser
+from panels.models import GenePanel
+from panels.models import RelatedPanel
+from panels.tasks import update_entity_catalogue
+from panels.tasks import update_related_panels
+from panels.tests.factories import GeneFactory
+from panels.tests.factories import GenePanelSnapshotFactory
+from panels.tests.factories import GenePanelEntrySnapshotFactory
+
+
+class RelatedPanelTest(LoginGELUser):
+    def setUp(self):
+        super().setUp()
+        self.genes = GeneFactory.create_batch(4)
+        self.panels = GenePanelSnapshotFactory.create_batch(
+            3, panel__status=GenePanel.STATUS.public
+        )
+        self.panels[2].panel.status = GenePanel.STATUS.internal
+        self.panels[2].panel.save()
+        members = [[0, 1, 2], [1, 2, 3], [2]]
+        for panel, indexes in zip(self.panels, members):
+            for index in indexes:
+                GenePanelEntrySnapshotFactory(panel=panel, gene_core=self.genes[index])
+
+        update_entity_catalogue()
+        update_related_panels()
+
+    def related_ids(self, panel, gel_reviewer):
+        return [
+            related.related_id
+            for related in RelatedPanel.objects.for_panel(
+                panel.panel_id, gel_reviewer=gel_reviewer
+            )
+        ]
+
+    def test_rebuild(self):
+        first, second, internal = [panel.panel_id for panel in self.panels]
+
+        self.assertEqual(self.related_ids(self.panels[0], True), [second, internal])
+        self.assertEqual(self.related_ids(self.panels[0], False), [second])
+        self.assertEqual(self.related_ids(self.panels[2], False), [])
+
+        related = RelatedPanel.objects.for_panel(first, gel_reviewer=True)
+        self.assertEqual([r.shared_entities for r in related], [2, 1])
+        self.assertEqual([r.rank for r in related], [1, 2])
+        self.assertGreater(related[0].score, related[1].score)
+
+    def test_top_k(self):
+        with self.settings(RELATED_PANELS_TOP_K=1):
+            update_related_panels()
+        self.assertEqual(
+            self.related_ids(self.panels[0], True), [self.panels[1].panel_id]
+        )
+
+    def test_panel_page(self):
+        url = reverse_lazy("panels:detail", args=(self.panels[0].panel.pk,))
+        res = self.client.get(url)
+        self.assertEqual(
+            [r.related_id for r in res.context["related_panels"]],
+            [self.panels[1].panel_id, self.panels[2].panel_id],
+        )
+
+    def test_api(self):
+        url = reverse_lazy("api:v1:panels-related", args=(self.panels[0].panel.pk,))
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [r["id"] for r in res.json()],
+            [self.panels[1].panel_id, self.panels[2].panel_id],
+        )
+        self.assertEqual(res.json()[0]["shared_entities"], 2)
+
+        self.client.logout()
+        res = self.client.get(url)
+        self.assertEqual([r["id"] for r in res.json()], [self.panels[1].panel_id])
+
+        url = reverse_lazy("api:v1:panels-related", args=(self.panels[2].panel.pk,))
+        self.assertEqual(self.client.get(url).status_code, 404)
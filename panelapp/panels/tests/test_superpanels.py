@@ -22,6 +22,9 @@
 ## under the License.
 ##
 from random import randint
+from unittest.mock import patch
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse_lazy
 from faker import Factory
 from accounts.tests.setup import LoginGELUser
@@ -31,6 +34,7 @@ from panels.models import GenePanelSnapshot
 from panels.models import Evidence
 from panels.models import GenePanel
 from panels.models import Evaluation
+from panels.tasks import update_super_panel
 from panels.tests.factories import GeneFactory
 from panels.tests.factories import GenePanelSnapshotFactory
 from panels.tests.factories import GenePanelEntrySnapshotFactory
@@ -374,3 +378,66 @@ class SuperPanelsTest(LoginGELUser):
         del parent2.panel.active_panel
         parent2 = parent2.panel.active_panel
         self.assertEqual(parent2.version, "0.3")
+
+    @override_settings(SUPER_PANEL_UPDATE_DEBOUNCE=60)
+    def test_coalesce_super_panel_updates(self):
+        parent = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        children = GenePanelSnapshotFactory.create_batch(
+            3, panel__status=GenePanel.STATUS.public
+        )
+        parent.child_panels.set(children)
+        cache.clear()
+
+        with patch("panels.tasks.transaction.on_commit", side_effect=lambda f: f()):
+            with patch("panels.tasks.update_super_panel.apply_async") as apply_async:
+                for child in children:
+                    child.increment_version()
+                    child.increment_version()
+
+        apply_async.assert_called_once_with((parent.pk,), countdown=60)
+        self.assertEqual(parent.panel.active_panel.version, parent.version)
+
+        update_super_panel(parent.pk)
+        del parent.panel.active_panel
+        self.assertEqual(parent.panel.active_panel.version, "0.1")
+
+    @override_settings(SUPER_PANEL_UPDATE_DEBOUNCE=60)
+    def test_super_panel_increment_scheduled_in_other_process(self):
+        parent = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        child = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        parent.child_panels.set([child])
+
+        with patch("panels.tasks.transaction.on_commit", side_effect=lambda f: f()):
+            with patch("panels.tasks.update_super_panel.apply_async"):
+                child.increment_version()
+                child.increment_version(major=True, user=self.gel_user)
+
+        # the worker doesn't share the cache of the web process
+        cache.clear()
+        update_super_panel(parent.pk)
+        parent.panel.clear_cache()
+        self.assertEqual(parent.panel.active_panel.version, "1.0")
+
+        # nothing left to increment
+        update_super_panel(parent.pk)
+        del parent.panel.active_panel
+        self.assertEqual(parent.panel.active_panel.version, "1.0")
+
+    def test_download_genes_lists_child_genes(self):
+        parent = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        child = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        gpes = GenePanelEntrySnapshotFactory(panel=child)
+        parent.child_panels.set([child])
+
+        res = self.client.get(reverse_lazy("panels:download_genes"))
+        self.assertEqual(res.status_code, 200)
+        rows = [
+            line.split("\t")
+            for line in b"".join(res.streaming_content).decode().splitlines()[1:]
+        ]
+        gene_rows = [row for row in rows if row[0] == gpes.gene.get("gene_symbol")]
+        self.assertEqual(len(gene_rows), 2)
+        self.assertEqual(
+            sorted(row[18] for row in gene_rows), sorted(["-", str(parent.panel.pk)])
+        )
+        self.assertTrue(all(row[1] == str(child.panel.pk) for row in gene_rows))
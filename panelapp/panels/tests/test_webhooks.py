@@ -0,0 +1,172 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+import json
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+
+from django.core import mail
+from django.core.cache import cache
+
+from accounts.tests.setup import LoginGELUser
+from panels.models import GenePanel
+from panels.models import PanelChange
+from panels.models import WebhookSubscription
+from panels.tasks import email_panel_promoted
+from panels.tests.factories import GenePanelSnapshotFactory
+from panels.tests.factories import GenePanelEntrySnapshotFactory
+from panels.webhooks import deliver_all
+from panels.webhooks import sign
+
+
+class WebhookReceiver(BaseHTTPRequestHandler):
+    """Local stand-in for a subscriber, records requests and replies with `status`"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append((dict(self.headers), body))
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class WebhookTest(LoginGELUser):
+    def setUp(self):
+        super().setUp()
+        self.server = HTTPServer(("127.0.0.1", 0), WebhookReceiver)
+        self.server.requests = []
+        self.server.status = 200
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.gps = GenePanelSnapshotFactory(panel__status=GenePanel.STATUS.public)
+        self.internal = GenePanelSnapshotFactory(
+            panel__status=GenePanel.STATUS.internal
+        )
+        self.subscription = WebhookSubscription.objects.create(
+            url="http://127.0.0.1:{}/hook".format(self.server.server_port),
+            batch_size=2,
+        )
+
+    def events(self):
+        return [
+            event
+            for _, body in self.server.requests
+            for event in json.loads(body)["events"]
+        ]
+
+    def test_deliver_batches(self):
+        for _ in range(3):
+            self.gps = self.gps.increment_version()
+        self.internal.increment_version()
+        GenePanelEntrySnapshotFactory(panel=self.gps)
+
+        self.assertEqual(deliver_all(), 3)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(
+            [(e["panel_id"], e["kind"]) for e in self.events()],
+            [(self.gps.panel.pk, "version")] * 3,
+        )
+
+        headers, body = self.server.requests[0]
+        self.assertEqual(
+            headers["X-PanelApp-Signature"],
+            sign(self.subscription.secret, headers["X-PanelApp-Timestamp"], body),
+        )
+
+        self.subscription.refresh_from_db()
+        self.assertEqual(
+            self.subscription.last_sequence,
+            PanelChange.objects.filter(kind="version", panel=self.gps.panel)
+            .order_by("-sequence")
+            .first()
+            .sequence,
+        )
+        self.assertEqual(deliver_all(), 0)
+
+    def test_retry_with_backoff(self):
+        self.server.status = 500
+        self.gps.increment_version()
+
+        self.assertEqual(deliver_all(), 0)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.failures, 1)
+        self.assertIsNotNone(self.subscription.next_attempt)
+
+        # not due until the backoff has passed
+        self.server.status = 200
+        self.assertEqual(deliver_all(), 0)
+        self.assertEqual(len(self.server.requests), 1)
+
+        WebhookSubscription.objects.update(next_attempt=None)
+        self.assertEqual(deliver_all(), 1)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.failures, 0)
+
+    def test_rate_limit(self):
+        WebhookSubscription.objects.update(max_deliveries_per_minute=1)
+        for _ in range(3):
+            self.gps = self.gps.increment_version()
+
+        self.assertEqual(deliver_all(), 2)
+        self.assertEqual(len(self.server.requests), 1)
+
+        # other workers don't share the cache
+        cache.clear()
+        WebhookSubscription.objects.update(next_attempt=None)
+        deliver_all()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_promoted_email_skipped_for_subscribers(self):
+        gpes = GenePanelEntrySnapshotFactory(
+            panel__panel__status=GenePanel.STATUS.public
+        )
+        contributors = [c for c in gpes.panel.contributors if c.email]
+        WebhookSubscription.objects.update(user=contributors[0])
+
+        email_panel_promoted(gpes.panel.panel.pk)
+        self.assertEqual(len(mail.outbox), len(contributors) - 1)
+
+    def test_promoted_email_sent_if_subscription_excludes_panel(self):
+        gpes = GenePanelEntrySnapshotFactory(
+            panel__panel__status=GenePanel.STATUS.public
+        )
+        contributors = [c for c in gpes.panel.contributors if c.email]
+        WebhookSubscription.objects.update(user=contributors[0])
+        self.subscription.panels.set([self.gps.panel])
+
+        email_panel_promoted(gpes.panel.panel.pk)
+        self.assertEqual(len(mail.outbox), len(contributors))
+
+        mail.outbox = []
+        self.subscription.panels.clear()
+        GenePanel.objects.filter(pk=gpes.panel.panel.pk).update(
+            status=GenePanel.STATUS.internal
+        )
+        email_panel_promoted(gpes.panel.panel.pk)
+        self.assertEqual(len(mail.outbox), len(contributors))
@@ -38,6 +38,8 @@ from .views import GenePanelView
 from .views import PanelsIndexView
 from .views import UpdatePanelView
 from .views import PromotePanelView
+from .views import PanelEditSessionView
+from .views import PanelVersionDiffView
 from .views import PanelAddEntityView
 from .views import PanelEditEntityView
 from .views import PanelMarkNotReadyView
@@ -48,10 +50,12 @@ from .views import DownloadPanelTSVView
 from .views import DownloadPanelVersionTSVView
 from .views import MarkGeneNotReadyView
 from .views import ComparePanelsView
+from .views import CompareManyPanelsView
 from .views import CompareGeneView
 from .views import CopyReviewsView
 from .views import DownloadAllGenes
 from .views import DownloadAllPanels
+from .views import DownloadGeneMatrix
 from .views import ActivityListView
 from .views import CopyGeneView
 from .views import CopySTRView
@@ -97,6 +101,9 @@ urlpatterns = [
     path("reports/<path:path>", ReportProxyView.as_view(), name="report_proxy"),
     url(r"^$", PanelsIndexView.as_view(), name="index"),
     url(r"^compare/$", ComparePanelsView.as_view(), name="compare_panels_form"),
+    url(
+        r"^compare/many/$", CompareManyPanelsView.as_view(), name="compare_many_panels"
+    ),
     url(
         r"^compare/(?P<panel_1_id>[0-9]+)/(?P<panel_2_id>[0-9]+)$",
         ComparePanelsView.as_view(),
@@ -117,6 +124,11 @@ urlpatterns = [
     url(r"^(?P<pk>[0-9]+)/$", GenePanelView.as_view(), name="detail"),
     url(r"^(?P<pk>[0-9]+)/update$", UpdatePanelView.as_view(), name="update"),
     url(r"^(?P<pk>[0-9]+)/promote$", PromotePanelView.as_view(), name="promote"),
+    url(
+        r"^(?P<pk>[0-9]+)/edit_session$",
+        PanelEditSessionView.as_view(),
+        name="edit_session",
+    ),
     url(
         r"^(?P<pk>[0-9]+)/(?P<entity_type>({types}))/add".format(types=entity_types),
         PanelAddEntityView.as_view(),
@@ -139,6 +151,11 @@ urlpatterns = [
         DownloadPanelVersionTSVView.as_view(),
         name="download_old_panel_tsv",
     ),
+    url(
+        r"^(?P<pk>[0-9]+)/diff/$",
+        PanelVersionDiffView.as_view(),
+        name="panel_version_diff",
+    ),
     url(
         r"^(?P<pk>[0-9]+)/gene/HGNC:(?P<hgnc_id>\d+)/(?P<suffix>.*)$",
         PanelGeneByHgncIdRedirectView.as_view(),
@@ -362,5 +379,10 @@ urlpatterns = [
     url(r"^download_regions/", DownloadAllRegions.as_view(), name="download_regions"),
     url(r"^upload_panel/", AdminUploadPanelsView.as_view(), name="upload_panels"),
     url(r"^download_panel/", DownloadAllPanels.as_view(), name="download_panels"),
+    url(
+        r"^download_gene_matrix/(?P<file_format>tsv|binary|manifest)/$",
+        DownloadGeneMatrix.as_view(),
+        name="download_gene_matrix",
+    ),
     url(r"^upload_reviews/", AdminUploadReviewsView.as_view(), name="upload_reviews"),
 ]
@@ -0,0 +1,207 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Changes between two versions of a panel
+
+Versions are compared in their API v1 representation, the live version is
+serialised and the previous ones are read from `HistoricalSnapshot`.
+Entities are matched by type and name:
+
+    {
+        "panel_id": 1, "from": "3.12", "to": "4.0",
+        "panel": {"name": {"from": "Old name", "to": "New name"}},
+        "added": [{"entity_type": "gene", "entity_name": "BRCA1", ...}],
+        "removed": [...],
+        "changed": [{"entity_type": "gene", "entity_name": "BRCA2",
+                     "changes": {"confidence_level": {"from": "2", "to": "3"},
+                                 "phenotypes": {"added": [...], "removed": [...]}}}],
+        "summary": {"added": 1, "removed": 0, "changed": 1, "rating_changed": 1},
+    }
+
+Diffs are cached per version pair, with the panel revision in the key when
+the live version is compared as it can still change.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from panels.models import HistoricalSnapshot
+from panels.models.historical_snapshot import ENTITY_KEYS
+from panels.point_in_time import PanelVersion
+from panels.point_in_time import version_content
+
+
+# fields repeated in every entity or changing with the panel version
+IGNORED_ENTITY_FIELDS = {"entity_type", "entity_name", "panel", "gene_data"}
+IGNORED_PANEL_FIELDS = {"id", "hash_id", "version", "version_created", "stats"}
+# fields compared as sets of values
+LIST_FIELDS = {"phenotypes", "publications", "evidence", "tags"}
+SUMMARY_FIELDS = ("entity_type", "entity_name", "confidence_level", "mode_of_inheritance")
+
+
+class VersionNotFound(Exception):
+    pass
+
+
+def get_version(panel, version):
+    """PanelVersion of the current GenePanelSnapshot `panel` with version "major.minor"
+
+    raises:
+        VersionNotFound: if the panel doesn't have this version
+    """
+
+    if version == panel.version:
+        return PanelVersion(panel.panel_id, version, panel)
+
+    try:
+        major_version, minor_version = (int(part) for part in version.split("."))
+    except ValueError:
+        raise VersionNotFound(version)
+
+    snapshot = (
+        HistoricalSnapshot.objects.filter(
+            panel_id=panel.panel_id,
+            major_version=major_version,
+            minor_version=minor_version,
+        )
+        .defer("data")
+        .first()
+    )
+    if not snapshot:
+        raise VersionNotFound(version)
+    return PanelVersion(panel.panel_id, version, snapshot)
+
+
+def _entities(data):
+    return {
+        (entity["entity_type"], entity["entity_name"]): entity
+        for key in ENTITY_KEYS
+        for entity in data.get(key) or []
+    }
+
+
+def _diff_value(field, old, new):
+    if (
+        field in LIST_FIELDS
+        and isinstance(old or [], list)
+        and isinstance(new or [], list)
+    ):
+        old_values = [json.dumps(value, sort_keys=True) for value in old or []]
+        new_values = [json.dumps(value, sort_keys=True) for value in new or []]
+        added = [json.loads(value) for value in new_values if value not in old_values]
+        removed = [json.loads(value) for value in old_values if value not in new_values]
+        if added or removed:
+            return {"added": added, "removed": removed}
+        return None
+    if old != new:
+        return {"from": old, "to": new}
+    return None
+
+
+def _diff_fields(old, new, ignored):
+    changes = {}
+    for field in sorted(set(old) | set(new)):
+        if field in ignored:
+            continue
+        change = _diff_value(field, old.get(field), new.get(field))
+        if change is not None:
+            changes[field] = change
+    return changes
+
+
+def diff_data(old_data, new_data):
+    """Changeset between two API v1 panel representations"""
+
+    old_entities = _entities(old_data)
+    new_entities = _entities(new_data)
+
+    def summary(entity):
+        return {field: entity.get(field) for field in SUMMARY_FIELDS}
+
+    added = [
+        summary(new_entities[key])
+        for key in sorted(new_entities.keys() - old_entities.keys())
+    ]
+    removed = [
+        summary(old_entities[key])
+        for key in sorted(old_entities.keys() - new_entities.keys())
+    ]
+    changed = []
+    for key in sorted(old_entities.keys() & new_entities.keys()):
+        changes = _diff_fields(
+            old_entities[key], new_entities[key], IGNORED_ENTITY_FIELDS
+        )
+        if changes:
+            changed.append(
+                {"entity_type": key[0], "entity_name": key[1], "changes": changes}
+            )
+
+    return {
+        "panel": _diff_fields(
+            {k: v for k, v in old_data.items() if k not in ENTITY_KEYS},
+            {k: v for k, v in new_data.items() if k not in ENTITY_KEYS},
+            IGNORED_PANEL_FIELDS,
+        ),
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "summary": {
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "rating_changed": sum(
+                1 for entity in changed if "confidence_level" in entity["changes"]
+            ),
+        },
+    }
+
+
+def diff_versions(from_version, to_version):
+    """Cached changeset between two PanelVersions of the same panel"""
+
+    key = "panels:diff:{}:{}:{}".format(
+        from_version.panel_id, from_version.version, to_version.version
+    )
+    for version in (from_version, to_version):
+        if not isinstance(version.snapshot, HistoricalSnapshot):
+            key = "{}:{}".format(key, version.snapshot.revision)
+            break
+
+    diff = cache.get(key)
+    if diff is None:
+        diff = dict(
+            {
+                "panel_id": from_version.panel_id,
+                "from": from_version.version,
+                "to": to_version.version,
+            },
+            **diff_data(
+                json.loads(version_content(from_version)),
+                json.loads(version_content(to_version)),
+            )
+        )
+        if settings.PANEL_DIFF_CACHE_TIMEOUT:
+            cache.set(key, diff, settings.PANEL_DIFF_CACHE_TIMEOUT)
+    return diff
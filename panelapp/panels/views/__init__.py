@@ -26,16 +26,20 @@ from .panels import AdminUploadGenesView
 from .panels import AdminUploadPanelsView
 from .panels import AdminUploadReviewsView
 from .panels import DownloadAllPanels
+from .panels import DownloadGeneMatrix
 from .panels import ActivityListView
 from .panels import CreatePanelView
 from .panels import GenePanelView
 from .panels import PanelsIndexView
 from .panels import UpdatePanelView
 from .panels import PromotePanelView
+from .panels import PanelEditSessionView
+from .panels import PanelVersionDiffView
 from .panels import OldCodeURLRedirect
 from .genes import DownloadPanelTSVView
 from .genes import DownloadPanelVersionTSVView
 from .genes import ComparePanelsView
+from .genes import CompareManyPanelsView
 from .genes import CompareGeneView
 from .genes import CopyReviewsView
 from .genes import DownloadAllGenes
@@ -24,6 +24,7 @@
 from django.http import Http404
 from django.contrib import messages
 from django.core.cache import cache
+from django.db.models import F
 from django.views.generic import DetailView
 from django.views.generic import RedirectView
 from django.views.generic import CreateView
@@ -35,8 +36,6 @@ from django.shortcuts import redirect
 from django.shortcuts import get_list_or_404
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.db.models import Q
-from django.contrib.postgres.aggregates import ArrayAgg
 from panelapp.mixins import GELReviewerRequiredMixin
 from panelapp.mixins import VerifiedReviewerRequiredMixin
 from panels.forms import GeneReviewForm
@@ -73,6 +72,8 @@ from panels.models import Region
 from panels.models import GenePanel
 from panels.models import GenePanelSnapshot
 from panels.models import GenePanelEntrySnapshot
+from panels.models import EntityCatalogue
+from panels.models import EntityPanelMembership
 
 
 class EchoWriter(object):
@@ -297,28 +298,32 @@ class GenePanelSpanshotView(EntityMixin, DetailView):
 
         ctx["panel_genes"] = list(
             self.panel.get_all_genes_extra.values(
-                "pk", "gene", "evaluators", "number_of_evaluations", "saved_gel_status"
+                "pk",
+                "evaluators",
+                "number_of_evaluations",
+                "saved_gel_status",
+                gene=F("gene_payload__data"),
             )
         )
         ctx["panel_strs"] = list(
             self.panel.get_all_strs_extra.values(
                 "pk",
-                "gene",
                 "name",
                 "evaluators",
                 "number_of_evaluations",
                 "saved_gel_status",
+                gene=F("gene_payload__data"),
             )
         )
         ctx["panel_regions"] = list(
             self.panel.get_all_regions_extra.values(
                 "pk",
-                "gene",
                 "name",
                 "verbose_name",
                 "evaluators",
                 "number_of_evaluations",
                 "saved_gel_status",
+                gene=F("gene_payload__data"),
             )
         )
 
@@ -644,6 +649,7 @@ class EntityDetailView(DetailView):
     model = Gene
     context_object_name = "gene"
     template_name = "panels/gene_detail.html"
+    use_replica = True
 
     def get_object(self, queryset=None):
         try:
@@ -670,67 +676,40 @@ class EntityDetailView(DetailView):
         )
 
         if is_admin_user:
+            panel_statuses = None
             statuses.append(GenePanel.STATUS.internal)
-
-        gps = list(
-            GenePanelSnapshot.objects.get_shared_panels(
-                self.kwargs["slug"], all=is_admin_user, internal=is_admin_user
-            ).values_list("pk", flat=True)
-        )
-
-        entries_genes = GenePanelEntrySnapshot.objects.get_gene_panels(self.kwargs["slug"], pks=gps).annotate(
-            superpanels_names=ArrayAgg("panel__genepanelsnapshot__level4title__name",
-            filter=Q(panel__genepanelsnapshot__panel__status__in=statuses),
-            distinct=True))
-
-        if isinstance(self.object, STR):
-            # we couldn't find a gene linked to this STR, lookup by name
-            entries_strs = STR.objects.get_str_panels(name=self.kwargs["slug"], pks=gps)
         else:
-            entries_strs = STR.objects.get_gene_panels(
-                gene_symbol=self.kwargs["slug"], pks=gps
-            )
-
-        entries_strs = entries_strs.annotate(superpanels_names=ArrayAgg("panel__genepanelsnapshot__level4title__name",
-                                           filter=Q(panel__genepanelsnapshot__panel__status__in=statuses),
-                                           distinct=True))
+            panel_statuses = statuses
 
-        if isinstance(self.object, Region):
-            # we couldn't find a gene linked to this STR, lookup by name
-            entries_regions = Region.objects.get_region_panels(
-                name=self.kwargs["slug"], pks=gps
+        memberships = {
+            (membership.entity_type, membership.entity_id): membership
+            for membership in EntityPanelMembership.objects.for_entity(
+                self.kwargs["slug"], statuses=panel_statuses
             )
-        else:
-            entries_regions = Region.objects.get_gene_panels(
-                gene_symbol=self.kwargs["slug"], pks=gps
+        }
+        gps = {m.panel_id for m in memberships.values()}
+
+        def get_entries(entity_type, entries):
+            entries = entries.filter(
+                pk__in=[
+                    pk for (m_type, pk) in memberships.keys() if m_type == entity_type
+                ]
             )
+            if tag_filter:
+                entries = entries.filter(tags__name=tag_filter)
 
-        entries_regions = entries_regions.annotate(
-                superpanels_names=ArrayAgg("panel__genepanelsnapshot__level4title__name",
-                                           filter=Q(panel__genepanelsnapshot__panel__status__in=statuses),
-                                           distinct=True))
-
-        if (
-            not self.request.user.is_authenticated
-            or not self.request.user.reviewer.is_GEL()
-        ):
-            entries_genes = entries_genes.filter(
-                Q(panel__panel__status=GenePanel.STATUS.public)
-                | Q(panel__panel__status=GenePanel.STATUS.promoted)
-            )
-            entries_strs = entries_strs.filter(
-                Q(panel__panel__status=GenePanel.STATUS.public)
-                | Q(panel__panel__status=GenePanel.STATUS.promoted)
-            )
-            entries_regions = entries_regions.filter(
-                Q(panel__panel__status=GenePanel.STATUS.public)
-                | Q(panel__panel__status=GenePanel.STATUS.promoted)
-            )
+            entries = list(entries)
+            for entry in entries:
+                entry.superpanels_names = memberships[
+                    (entity_type, entry.pk)
+                ].superpanels_names(statuses)
+            return entries
 
-        if tag_filter:
-            entries_genes = entries_genes.filter(tag__name=tag_filter)
-            entries_strs = entries_strs.filter(tag__name=tag_filter)
-            entries_regions = entries_regions.filter(tag__name=tag_filter)
+        entries_genes = get_entries(
+            "gene", GenePanelEntrySnapshot.objects.get_active(pks=gps)
+        )
+        entries_strs = get_entries("str", STR.objects.get_active(pks=gps))
+        entries_regions = get_entries("region", Region.objects.get_active(pks=gps))
 
         ctx["entries_genes"] = entries_genes
         ctx["entries_strs"] = entries_strs
@@ -778,53 +757,37 @@ class EntitiesListView(ListView):
     model = Gene
     context_object_name = "entities"
     template_name = "panels/gene_list.html"
+    paginate_by = 1000
+    entity_types = ["gene", "str", "region"]
+
+    def get_entity_types(self):
+        entity_types = [
+            entity_type
+            for entity_type in self.request.GET.getlist("entity_type")
+            if entity_type in self.entity_types
+        ]
+        return entity_types or self.entity_types
 
     def get_queryset(self, *args, **kwargs):
         is_admin_user = (
             self.request.user.is_authenticated and self.request.user.reviewer.is_GEL()
         )
         tag_filter = self.request.GET.get("tag", "")
+        entity_types = self.get_entity_types()
 
-        panel_ids = GenePanelSnapshot.objects.get_active(
-            all=is_admin_user, internal=is_admin_user
-        ).values_list("pk", flat=True)
-
-        qs = GenePanelEntrySnapshot.objects.filter(
-            gene_core__active=True, panel__in=panel_ids
-        )
-
-        strs_qs = STR.objects.filter(panel__in=panel_ids)
-        regions_qs = Region.objects.filter(panel__in=panel_ids)
-
-        if tag_filter:
-            qs = qs.filter(tags__name=tag_filter)
-            strs_qs = strs_qs.filter(tags__name=tag_filter)
-            regions_qs = regions_qs.filter(tags__name=tag_filter)
-
-        entities = []
-        for gene in (
-            qs.order_by()
-            .distinct("gene_core__gene_symbol")
-            .values_list("gene_core__gene_symbol", flat=True)
-            .iterator()
-        ):
-            entities.append(("gene", gene, gene))
-
-        for str_item in strs_qs.values_list("name", "name").iterator():
-            entities.append(("str", str_item[0], str_item[1]))
-
-        for region in regions_qs.values_list("name", "name").iterator():
-            entities.append(("region", region[0], region[1]))
-
-        entities = list(set(entities))
-
-        sorted_entities = sorted(entities, key=lambda i: i[1].lower())
-        return sorted_entities
+        return EntityCatalogue.objects.get_entities(
+            gel_reviewer=is_admin_user,
+            tag=tag_filter,
+            name=self.request.GET.get("name", "").strip(),
+            entity_types=entity_types if entity_types != self.entity_types else None,
+        ).values_list("entity_type", "name", "name")
 
     def get_context_data(self, *args, **kwargs):
         ctx = super().get_context_data(*args, **kwargs)
         ctx["tags"] = Tag.objects.all().order_by("name")
         ctx["tag_filter"] = self.request.GET.get("tag")
+        ctx["name_filter"] = self.request.GET.get("name", "").strip()
+        ctx["entity_types"] = self.get_entity_types()
         return ctx
 
 
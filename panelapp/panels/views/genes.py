@@ -28,6 +28,7 @@ from django.contrib import messages
 from django.views.generic.base import View
 from django.views.generic import FormView
 from django.views.generic import DetailView
+from django.views.generic import TemplateView
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.template.defaultfilters import pluralize
@@ -36,6 +37,7 @@ from django.http import StreamingHttpResponse
 
 from panelapp.mixins import GELReviewerRequiredMixin
 from panels.forms import ComparePanelsForm
+from panels.forms import CompareManyPanelsForm
 from panels.forms import CopyReviewsForm
 from panels.forms import CopyGeneForm
 
@@ -45,6 +47,12 @@ from panels.models import ProcessingRunCode
 from panels.models import HistoricalSnapshot
 from panels.mixins import PanelMixin
 from panels.utils import remove_non_ascii
+from panels.exports import write_panel_tsv
+from panels.exports import export_response
+from panels.exports import get_storage
+from panels.exports import panel_tsv_name
+from panels.exports import all_genes_rows
+from panels.comparison import PanelComparison
 from .entities import EchoWriter
 
 
@@ -56,257 +64,27 @@ class DownloadPanelTSVMixin(PanelMixin, DetailView):
 
     def process(self):
         self.object = self.get_object()
-
-        panel_name = self.object.panel.name
-        version = self.object.version
+        panel_name = remove_non_ascii(self.object.panel.name, replacemenet="_")
+
+        # whole public panels are prebuilt, see `panels.exports`
+        if self.get_categories() == "01234":
+            storage = get_storage()
+            name = panel_tsv_name(self.object)
+            if storage.exists(name):
+                return export_response(
+                    self.request,
+                    storage,
+                    name,
+                    panel_name + ".tsv",
+                    "text/tab-separated-values",
+                )
 
         response = HttpResponse(content_type="text/tab-separated-values")
-        panel_name = remove_non_ascii(panel_name, replacemenet="_")
         response["Content-Disposition"] = (
             'attachment; filename="' + panel_name + '.tsv"'
         )
         writer = csv.writer(response, delimiter="\t")
-
-        writer.writerow(
-            (
-                "Entity Name",
-                "Entity type",
-                "Gene Symbol",
-                "Sources(; separated)",
-                "Level4",
-                "Level3",
-                "Level2",
-                "Model_Of_Inheritance",
-                "Phenotypes",
-                "Omim",
-                "Orphanet",
-                "HPO",
-                "Publications",
-                "Description",
-                "Flagged",
-                "GEL_Status",
-                "UserRatings_Green_amber_red",
-                "version",
-                "ready",
-                "Mode of pathogenicity",
-                "EnsemblId(GRch37)",
-                "EnsemblId(GRch38)",
-                "HGNC",
-                "Position Chromosome",
-                "Position GRCh37 Start",
-                "Position GRCh37 End",
-                "Position GRCh38 Start",
-                "Position GRCh38 End",
-                "STR Repeated Sequence",
-                "STR Normal Repeats",
-                "STR Pathogenic Repeats",
-                "Region Haploinsufficiency Score",
-                "Region Triplosensitivity Score",
-                "Region Required Overlap Percentage",
-                "Region Variant Type",
-                "Region Verbose Name",
-            )
-        )
-
-        categories = self.get_categories()
-        for gpentry in self.object.get_all_genes_extra:
-            if (
-                not gpentry.flagged
-                and gpentry.saved_gel_status > 0
-                and str(gpentry.status) in categories
-            ):
-                amber_perc, green_perc, red_prec = gpentry.aggregate_ratings()
-
-                ensembl_id_37 = "-"
-                try:
-                    ensembl_id_37 = (
-                        gpentry.gene.get("ensembl_genes", {})
-                        .get("GRch37", {})
-                        .get("82", {})
-                        .get("ensembl_id", "-")
-                    )
-                except AttributeError:
-                    pass
-
-                ensembl_id_38 = "-"
-                try:
-                    ensembl_id_38 = (
-                        gpentry.gene.get("ensembl_genes", {})
-                        .get("GRch38", {})
-                        .get("90", {})
-                        .get("ensembl_id", "-")
-                    )
-                except AttributeError:
-                    pass
-
-                evidence = ";".join([ev for ev in gpentry.entity_evidences if ev])
-                export_gpentry = (
-                    gpentry.gene.get("gene_symbol"),
-                    "gene",
-                    gpentry.gene.get("gene_symbol"),
-                    evidence,
-                    panel_name,
-                    self.object.level4title.level3title,
-                    self.object.level4title.level2title,
-                    gpentry.moi,
-                    ";".join(map(remove_non_ascii, gpentry.phenotypes)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.omim)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.orphanet)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.hpo)),
-                    ";".join(map(remove_non_ascii, gpentry.publications))
-                    if gpentry.publications
-                    else "",
-                    "",
-                    str(gpentry.flagged),
-                    str(gpentry.saved_gel_status),
-                    ";".join(map(str, [green_perc, amber_perc, red_prec])),
-                    str(version),
-                    gpentry.ready,
-                    gpentry.mode_of_pathogenicity,
-                    ensembl_id_37,
-                    ensembl_id_38,
-                    gpentry.gene.get("hgnc_id", "-"),
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                )
-                writer.writerow(export_gpentry)
-
-        for strentry in self.object.get_all_strs_extra:
-            if (
-                not strentry.flagged
-                and strentry.saved_gel_status > 0
-                and str(strentry.status) in categories
-            ):
-                amber_perc, green_perc, red_prec = strentry.aggregate_ratings()
-
-                evidence = ";".join(
-                    [evidence.name for evidence in strentry.evidence.all()]
-                )
-                export_strentry = (
-                    strentry.name,
-                    "str",
-                    strentry.gene.get("gene_symbol") if strentry.gene else "",
-                    evidence,
-                    panel_name,
-                    self.object.level4title.level3title,
-                    self.object.level4title.level2title,
-                    strentry.moi,
-                    ";".join(map(remove_non_ascii, strentry.phenotypes)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.omim)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.orphanet)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.hpo)),
-                    ";".join(map(remove_non_ascii, strentry.publications))
-                    if strentry.publications
-                    else "",
-                    "",
-                    str(strentry.flagged),
-                    str(strentry.saved_gel_status),
-                    ";".join(map(str, [green_perc, amber_perc, red_prec])),
-                    str(version),
-                    strentry.ready,
-                    "",
-                    strentry.gene.get("ensembl_genes", {})
-                    .get("GRch37", {})
-                    .get("82", {})
-                    .get("ensembl_id", "-")
-                    if strentry.gene
-                    else "",
-                    strentry.gene.get("ensembl_genes", {})
-                    .get("GRch38", {})
-                    .get("90", {})
-                    .get("ensembl_id", "-")
-                    if strentry.gene
-                    else "",
-                    strentry.gene.get("hgnc_id", "-") if strentry.gene else "",
-                    strentry.chromosome,
-                    strentry.position_37.lower if strentry.position_37 else "",
-                    strentry.position_37.upper if strentry.position_37 else "",
-                    strentry.position_38.lower,
-                    strentry.position_38.upper,
-                    strentry.repeated_sequence,
-                    strentry.normal_repeats,
-                    strentry.pathogenic_repeats,
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                )
-                writer.writerow(export_strentry)
-
-        for region in self.object.get_all_regions_extra:
-            if (
-                not region.flagged
-                and region.saved_gel_status > 0
-                and str(region.status) in categories
-            ):
-                amber_perc, green_perc, red_prec = region.aggregate_ratings()
-
-                evidence = ";".join(
-                    [evidence.name for evidence in region.evidence.all()]
-                )
-                export_region = (
-                    region.name,
-                    "region",
-                    region.gene.get("gene_symbol") if region.gene else "",
-                    evidence,
-                    panel_name,
-                    self.object.level4title.level3title,
-                    self.object.level4title.level2title,
-                    region.moi,
-                    ";".join(map(remove_non_ascii, region.phenotypes)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.omim)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.orphanet)),
-                    ";".join(map(remove_non_ascii, self.object.level4title.hpo)),
-                    ";".join(map(remove_non_ascii, region.publications))
-                    if region.publications
-                    else "",
-                    "",
-                    str(region.flagged),
-                    str(region.saved_gel_status),
-                    ";".join(map(str, [green_perc, amber_perc, red_prec])),
-                    str(version),
-                    region.ready,
-                    "",
-                    region.gene.get("ensembl_genes", {})
-                    .get("GRch37", {})
-                    .get("82", {})
-                    .get("ensembl_id", "-")
-                    if region.gene
-                    else "",
-                    region.gene.get("ensembl_genes", {})
-                    .get("GRch38", {})
-                    .get("90", {})
-                    .get("ensembl_id", "-")
-                    if region.gene
-                    else "",
-                    region.gene.get("hgnc_id", "-") if region.gene else "",
-                    region.chromosome,
-                    region.position_37.lower if region.position_37 else "",
-                    region.position_37.upper if region.position_37 else "",
-                    region.position_38.lower,
-                    region.position_38.upper,
-                    "",
-                    "",
-                    "",
-                    region.haploinsufficiency_score,
-                    region.triplosensitivity_score,
-                    region.required_overlap_percentage,
-                    region.type_of_variants,
-                    region.verbose_name,
-                )
-                writer.writerow(export_region)
+        write_panel_tsv(writer, self.object, self.get_categories())
 
         return response
 
@@ -432,6 +210,61 @@ class ComparePanelsView(FormView):
         return ctx
 
 
+class CompareManyPanelsView(TemplateView):
+    """Entities in any number of panels, optionally not in other panels"""
+
+    template_name = "panels/compare/compare_many_panels.html"
+
+    def get_form(self):
+        is_admin = (
+            self.request.user.is_authenticated and self.request.user.reviewer.is_GEL()
+        )
+        panels = GenePanelSnapshot.objects.get_active(all=is_admin, internal=is_admin)
+        data = self.request.GET if "panels" in self.request.GET else None
+        return CompareManyPanelsForm(data, panels=panels)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["form"] = form = self.get_form()
+        ctx["comparison"] = None
+
+        if form.is_bound and form.is_valid():
+            panels = list(form.cleaned_data["panels"])
+            exclude = list(form.cleaned_data["exclude"])
+            comparison = PanelComparison(
+                panels + exclude, entity_types=form.cleaned_data["entity_types"]
+            )
+            bitset = comparison.select(
+                [p.panel_id for p in panels],
+                [p.panel_id for p in exclude],
+                form.cleaned_data["operation"],
+            )
+            counts = comparison.counts()
+            overlaps = {
+                tuple(overlap["panels"]): overlap for overlap in comparison.overlaps()
+            }
+
+            ctx["panels"] = panels
+            ctx["comparison"] = [
+                dict(entity, in_panels=[p.panel_id in entity["panels"] for p in panels])
+                for entity in comparison.entities(bitset)
+            ]
+            ctx["overlaps"] = [
+                (
+                    panel,
+                    counts[panel.panel_id],
+                    [
+                        overlaps.get((panel.panel_id, other.panel_id))
+                        or overlaps.get((other.panel_id, panel.panel_id))
+                        for other in panels
+                    ],
+                )
+                for panel in panels
+            ]
+
+        return ctx
+
+
 class CompareGeneView(FormView):
     template_name = "panels/compare/compare_genes.html"
     form_class = ComparePanelsForm
@@ -571,82 +404,7 @@ class DownloadAllGenes(GELReviewerRequiredMixin, View):
             "Super Panel Version",
         )
 
-        for gps in GenePanelSnapshot.objects.get_active(
-            all=True, internal=True
-        ).iterator():
-            is_super_panel = gps.is_super_panel
-            super_panel_id = gps.panel_id
-            super_panel_name = gps.level4title.name
-            super_panel_version = gps.version
-
-            for entry in gps.get_all_genes_extra:
-                color = entry.entity_color_name
-
-                if isinstance(entry.phenotypes, list):
-                    phenotypes = ";".join(entry.phenotypes)
-                else:
-                    phenotypes = "-"
-
-                ensembl_id_37 = "-"
-                location_37 = "-"
-                try:
-                    ensembl_id_37 = (
-                        entry.gene.get("ensembl_genes", {})
-                        .get("GRch37", {})
-                        .get("82", {})
-                        .get("ensembl_id", "-")
-                    )
-                    location_37 = (
-                        entry.gene.get("ensembl_genes", {})
-                        .get("GRch37", {})
-                        .get("82", {})
-                        .get("location", "-")
-                    )
-                except AttributeError:
-                    pass
-
-                ensembl_id_38 = "-"
-                location_38 = "-"
-                try:
-                    ensembl_id_38 = (
-                        entry.gene.get("ensembl_genes", {})
-                        .get("GRch38", {})
-                        .get("90", {})
-                        .get("ensembl_id", "-")
-                    )
-                    location_38 = (
-                        entry.gene.get("ensembl_genes", {})
-                        .get("GRch38", {})
-                        .get("90", {})
-                        .get("location", "-")
-                    )
-                except AttributeError:
-                    pass
-
-                row = [
-                    entry.gene.get("gene_symbol"),
-                    entry.panel.panel.pk,
-                    entry.panel.level4title.name,
-                    entry.panel.version,
-                    str(entry.panel.panel.status).upper(),
-                    color,
-                    ";".join([ev for ev in entry.entity_evidences if ev]),
-                    entry.moi,
-                    entry.mode_of_pathogenicity,
-                    ";".join([tag for tag in entry.entity_tags if tag]),
-                    ensembl_id_37,
-                    ensembl_id_38,
-                    entry.gene.get("hgnc_id", "-"),
-                    entry.gene.get("biotype", "-"),
-                    phenotypes,
-                    location_37,
-                    location_38,
-                    ";".join([t.name for t in entry.panel.panel.types.all()]),
-                    super_panel_id if is_super_panel else "-",
-                    super_panel_name if is_super_panel else "-",
-                    super_panel_version if is_super_panel else "-",
-                ]
-                yield row
+        yield from all_genes_rows()
 
     def get(self, request, *args, **kwargs):
         pseudo_buffer = EchoWriter()
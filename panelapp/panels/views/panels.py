@@ -27,6 +27,7 @@ from django.db.models import Q, Count
 from django.contrib import messages
 from django.contrib.auth.models import Group
 from django.http import HttpResponse
+from django.http import Http404
 from django.core.exceptions import ValidationError
 from django.views.generic import ListView
 from django.views.generic import CreateView
@@ -59,7 +60,13 @@ from panels.models import Activity
 from panels.models import GenePanel
 from panels.models import GenePanelSnapshot
 from panels.models import GenePanelEntrySnapshot
+from panels.models import PanelEditSession
+from panels.models import RelatedPanel
+from panels.exceptions import IsSuperPanelException
 from panels.activity_patterns import ActivityPattern
+from panels import exports
+from panels import gene_matrix
+from panels import version_diff
 from .entities import EchoWriter
 
 
@@ -148,6 +155,7 @@ class UpdatePanelView(GELReviewerRequiredMixin, PanelMixin, UpdateView):
 
 class GenePanelView(DetailView):
     model = GenePanel
+    use_replica = True
 
     def get_context_data(self, *args, **kwargs):
         ctx = super().get_context_data(*args, **kwargs)
@@ -165,6 +173,11 @@ class GenePanelView(DetailView):
         if signed_off:
             ctx["signed_off"] = signed_off
         ctx["contributors"] = ctx["panel"].contributors
+        ctx["related_panels"] = RelatedPanel.objects.for_panel(
+            self.object.pk,
+            gel_reviewer=self.request.user.is_authenticated
+            and self.request.user.reviewer.is_GEL(),
+        )
         ctx["promote_panel_form"] = PromotePanelForm(
             instance=ctx["panel"],
             request=self.request,
@@ -173,6 +186,30 @@ class GenePanelView(DetailView):
         return ctx
 
 
+class PanelVersionDiffView(TemplateView):
+    template_name = "panels/panel_version_diff.html"
+
+    def get_context_data(self, *args, **kwargs):
+        ctx = super().get_context_data(*args, **kwargs)
+        panel = get_object_or_404(GenePanel, pk=self.kwargs["pk"]).active_panel
+        ctx["panel"] = panel
+        ctx["from_version"] = self.request.GET.get("from", "").strip()
+        ctx["to_version"] = self.request.GET.get("to", "").strip() or panel.version
+        ctx["diff"] = None
+
+        if ctx["from_version"]:
+            try:
+                versions = [
+                    version_diff.get_version(panel, version)
+                    for version in (ctx["from_version"], ctx["to_version"])
+                ]
+            except version_diff.VersionNotFound as e:
+                ctx["error"] = "Version {} not found".format(e)
+            else:
+                ctx["diff"] = version_diff.diff_versions(*versions)
+        return ctx
+
+
 class AdminContextMixin:
     def get_context_data(self, *args, **kwargs):
         ctx = super().get_context_data(*args, **kwargs)
@@ -255,6 +292,35 @@ class PromotePanelView(GELReviewerRequiredMixin, GenePanelView, UpdateView):
         return self.get_object().get_absolute_url()
 
 
+class PanelEditSessionView(GELReviewerRequiredMixin, PanelMixin, View):
+    """Start or finish an edit session, see `PanelEditSession`"""
+
+    def post(self, request, *args, **kwargs):
+        panel = self.get_object().panel
+        session = PanelEditSession.objects.get_open(panel.pk)
+
+        if session:
+            session.seal(user=request.user)
+            messages.success(
+                request,
+                "Edit session finished, {} changes saved in version {}".format(
+                    session.changes, panel.active_panel.version
+                ),
+            )
+        else:
+            try:
+                PanelEditSession.objects.open(panel, request.user)
+                panel.active_panel.add_activity(request.user, "started edit session")
+                messages.success(
+                    request,
+                    "Edit session started, changes will be saved in a single version",
+                )
+            except IsSuperPanelException:
+                messages.error(request, "Super panels can't be edited in a session")
+
+        return redirect(self.get_success_url())
+
+
 class ActivityListView(ListView):
     model = Activity
     context_object_name = "activities"
@@ -419,80 +485,31 @@ class ActivityListView(ListView):
 
 
 class DownloadAllPanels(GELReviewerRequiredMixin, View):
-    def panel_iterator(self, request):
-        yield (
-            "Level 4 title",
-            "Level 3 title",
-            "Level 2 title",
-            "URL",
-            "Current Version",
-            "Version time stamp",
-            "# rated genes/total genes",
-            "#reviewers",
-            "Reviewer name and affiliation (;)",
-            "Reviewer emails (;)",
-            "Status",
-            "Relevant disorders",
-            "Types",
-            "Signed Off",
-        )
+    """All panels TSV
 
-        panels = (
-            GenePanelSnapshot.objects.get_active_annotated(all=True, internal=True)
-            .prefetch_related(
-                "panel",
-                "level4title",
-                "panel__types",
-                "genepanelentrysnapshot_set",
-                "genepanelentrysnapshot_set__evaluation",
-                "genepanelentrysnapshot_set__evaluation__user",
-                "genepanelentrysnapshot_set__evaluation__user__reviewer",
-                "str_set__evaluation",
-                "str_set__evaluation__user",
-                "str_set__evaluation__user__reviewer",
-            )
-            .all()
-            .iterator()
-        )
+    Served from the nightly export in the private exports storage if it
+    exists, otherwise generated. Exports are streamed rather than redirected
+    to, as the file contains internal panels and reviewer emails.
+    """
 
-        for panel in panels:
-            rate = "{} of {} genes reviewed".format(
-                panel.stats.get("number_of_evaluated_genes"),
-                panel.stats.get("number_of_genes"),
-            )
-            reviewers = panel.contributors
-            contributors = [
-                "{} {} ({})".format(user.first_name, user.last_name, user.email)
-                if user.first_name
-                else user.username
-                for user in reviewers
-            ]
-
-            yield (
-                panel.level4title.name,
-                panel.level4title.level3title,
-                panel.level4title.level2title,
-                request.build_absolute_uri(
-                    reverse("panels:detail", args=(panel.panel.id,))
-                ),
-                panel.version,
-                panel.created,
-                rate,
-                len(reviewers),
-                ";".join(contributors),  # aff
-                ";".join([user.email for user in reviewers if user.email]),  # email
-                panel.panel.status.upper(),
-                ";".join(panel.old_panels),
-                ";".join(panel.panel.types.values_list("name", flat=True)),
-                "v{}.{} on {}".format(*panel.signed_off) if panel.panel.signed_off else ""
+    def get(self, request, *args, **kwargs):
+        storage = exports.get_private_storage()
+        if storage.exists(exports.ALL_PANELS):
+            modified = storage.get_modified_time(exports.ALL_PANELS)
+            return exports.export_response(
+                request,
+                storage,
+                exports.ALL_PANELS,
+                "All_panels_{}.tsv".format(modified.strftime("%Y%m%d-%H%M")),
+                "text/tab-separated-values",
             )
 
-    def get(self, request, *args, **kwargs):
         pseudo_buffer = EchoWriter()
         writer = csv.writer(pseudo_buffer, delimiter="\t")
+        base_url = request.build_absolute_uri("/").rstrip("/")
 
         response = StreamingHttpResponse(
-            (writer.writerow(row) for row in self.panel_iterator(request)),
+            (writer.writerow(row) for row in exports.all_panels_rows(base_url)),
             content_type="text/tab-separated-values",
         )
         attachment = "attachment; filename=All_panels_{}.tsv".format(
@@ -502,6 +519,24 @@ class DownloadAllPanels(GELReviewerRequiredMixin, View):
         return response
 
 
+class DownloadGeneMatrix(RedirectView):
+    """Redirect to the latest genes by panels matrix export
+
+    The matrix only has public panels, so it's served from the media storage
+    under its versioned file name, see `panels.gene_matrix`.
+    """
+
+    def get_redirect_url(self, *args, **kwargs):
+        storage = exports.get_storage()
+        manifest = gene_matrix.get_manifest(storage)
+        if not manifest:
+            raise Http404("The gene panel matrix hasn't been exported yet")
+
+        if kwargs["file_format"] == "manifest":
+            return storage.url(gene_matrix.MATRIX_MANIFEST)
+        return storage.url(manifest[kwargs["file_format"]])
+
+
 class OldCodeURLRedirect(RedirectView):
     """Redirect old code URLs to the new pks"""
 
@@ -31,7 +31,8 @@ from django.views import View
 from django.views.generic import FormView
 from django.shortcuts import redirect
 from panels.forms import CopyRegionForm
-from panels.models import GenePanelSnapshot, GenePanel
+from panels.models import GenePanel
+from panels.exports import all_regions_rows
 from .entities import EchoWriter
 from panelapp.mixins import GELReviewerRequiredMixin
 
@@ -71,79 +72,7 @@ class DownloadAllRegions(GELReviewerRequiredMixin, View):
             "Super Panel Version",
         )
 
-        for gps in GenePanelSnapshot.objects.get_active(
-            all=True, internal=True
-        ).iterator():
-            is_super_panel = gps.is_super_panel
-            super_panel_id = gps.panel_id
-            super_panel_name = gps.level4title.name
-            super_panel_version = gps.version
-
-            for entry in gps.get_all_regions_extra:
-                color = entry.entity_color_name
-
-                if isinstance(entry.phenotypes, list):
-                    phenotypes = ";".join(entry.phenotypes)
-                else:
-                    phenotypes = ""
-
-                row = [
-                    entry.name,
-                    entry.verbose_name,
-                    entry.chromosome,
-                    entry.position_37.lower if entry.position_37 else "",
-                    entry.position_37.upper if entry.position_37 else "",
-                    entry.position_38.lower,
-                    entry.position_38.upper,
-                    entry.haploinsufficiency_score
-                    if entry.haploinsufficiency_score
-                    else "",
-                    entry.triplosensitivity_score
-                    if entry.triplosensitivity_score
-                    else "",
-                    entry.required_overlap_percentage,
-                    entry.type_of_variants,
-                    entry.gene.get("gene_symbol") if entry.gene else "",
-                    gps.panel.pk,
-                    gps.level4title.name,
-                    gps.version,
-                    str(gps.panel.status).upper(),
-                    color,
-                    ";".join([evidence.name for evidence in entry.evidence.all()]),
-                    entry.moi,
-                    ";".join([tag.name for tag in entry.tags.all()]),
-                    entry.gene.get("ensembl_genes", {})
-                    .get("GRch37", {})
-                    .get("82", {})
-                    .get("ensembl_id", "")
-                    if entry.gene
-                    else "",
-                    entry.gene.get("ensembl_genes", {})
-                    .get("GRch38", {})
-                    .get("90", {})
-                    .get("ensembl_id", "")
-                    if entry.gene
-                    else "",
-                    entry.gene.get("biotype", "-") if entry.gene else "-",
-                    phenotypes,
-                    entry.gene.get("ensembl_genes", {})
-                    .get("GRch37", {})
-                    .get("82", {})
-                    .get("location", "")
-                    if entry.gene
-                    else "",
-                    entry.gene.get("ensembl_genes", {})
-                    .get("GRch38", {})
-                    .get("90", {})
-                    .get("location", "")
-                    if entry.gene
-                    else "",
-                    ";".join([t.name for t in entry.panel.panel.types.all()]),
-                    super_panel_id if is_super_panel else "-",
-                    super_panel_name if is_super_panel else "-",
-                    super_panel_version if is_super_panel else "-",
-                ]
-                yield row
+        yield from all_regions_rows()
 
     def get(self, request, *args, **kwargs):
         pseudo_buffer = EchoWriter()
@@ -0,0 +1,188 @@
+##
+## Copyright (c) 2016-2019 Genomics England Ltd.
+##
+## This file is part of PanelApp
+## (see https://panelapp.genomicsengland.co.uk).
+##
+## Licensed to the Apache Software Foundation (ASF) under one
+## or more contributor license agreements.  See the NOTICE file
+## distributed with this work for additional information
+## regarding copyright ownership.  The ASF licenses this file
+## to you under the Apache License, Version 2.0 (the
+## "License"); you may not use this file except in compliance
+## with the License.  You may obtain a copy of the License at
+##
+##   http://www.apache.org/licenses/LICENSE-2.0
+##
+## Unless required by applicable law or agreed to in writing,
+## software distributed under the License is distributed on an
+## "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+## KIND, either express or implied.  See the License for the
+## specific language governing permissions and limitations
+## under the License.
+##
+"""Deliver panel changes to webhook subscriptions
+
+Pending changes of each subscription are POSTed as JSON in batches of up to
+`batch_size` events:
+
+    {"subscription": 1, "cursor": 123, "events": [<PanelChange>, ...]}
+
+Requests are signed with the subscription secret, the receiver should compute
+HMAC SHA256 of `<X-PanelApp-Timestamp>.<body>` and compare it with the
+`X-PanelApp-Signature` header (`sha256=<hex digest>`).
+
+Any response other than 2xx is retried with exponential backoff, starting at
+`WEBHOOK_BACKOFF` seconds up to `WEBHOOK_MAX_BACKOFF`. Subscriptions are
+disabled after `WEBHOOK_MAX_FAILURES` failures in a row. Events are delivered
+at least once and in order, `cursor` can be used to discard duplicates.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from panels.models import WebhookSubscription
+
+logger = logging.getLogger(__name__)
+
+
+def sign(secret, timestamp, body):
+    """Signature of the request `body` (bytes) sent at `timestamp`"""
+
+    message = "{}.".format(timestamp).encode("utf-8") + body
+    return "sha256=" + hmac.new(
+        secret.encode("utf-8"), message, hashlib.sha256
+    ).hexdigest()
+
+
+def is_rate_limited(subscription):
+    """Count a delivery, True if the subscription had too many this minute
+
+    The counter is kept on the subscription row, which is locked while it's
+    delivered and saved with the delivery result.
+    """
+
+    window = timezone.now().replace(second=0, microsecond=0)
+    if subscription.rate_limit_window != window:
+        subscription.rate_limit_window = window
+        subscription.rate_limit_count = 0
+    if subscription.rate_limit_count >= subscription.max_deliveries_per_minute:
+        return True
+    subscription.rate_limit_count += 1
+    return False
+
+
+def post_events(subscription, changes):
+    from api.v1.serializers import PanelChangeSerializer
+
+    timestamp = int(time.time())
+    body = json.dumps(
+        {
+            "subscription": subscription.pk,
+            "cursor": changes[-1].sequence,
+            "events": PanelChangeSerializer(changes, many=True).data,
+        },
+        cls=DjangoJSONEncoder,
+    ).encode("utf-8")
+
+    response = requests.post(
+        subscription.url,
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "User-Agent": "PanelApp-Webhooks",
+            "X-PanelApp-Timestamp": str(timestamp),
+            "X-PanelApp-Signature": sign(subscription.secret, timestamp, body),
+        },
+        timeout=settings.WEBHOOK_TIMEOUT,
+    )
+    response.raise_for_status()
+
+
+def deliver(subscription):
+    """Send pending changes of the subscription until none are left
+
+    Stops at the first failure or when the subscription rate limit is reached.
+
+    returns:
+        int: number of events delivered
+    """
+
+    delivered = 0
+    while True:
+        changes = list(subscription.pending_changes()[: subscription.batch_size])
+        if not changes:
+            break
+        if is_rate_limited(subscription):
+            logger.info("Webhook %s rate limited", subscription.pk)
+            break
+
+        try:
+            post_events(subscription, changes)
+        except requests.RequestException as e:
+            subscription.failures += 1
+            subscription.last_error = str(e)[:1000]
+            backoff = min(
+                settings.WEBHOOK_BACKOFF * 2 ** (subscription.failures - 1),
+                settings.WEBHOOK_MAX_BACKOFF,
+            )
+            subscription.next_attempt = timezone.now() + timedelta(seconds=backoff)
+            if subscription.failures >= settings.WEBHOOK_MAX_FAILURES:
+                subscription.active = False
+                logger.warning(
+                    "Webhook %s disabled after %s failures",
+                    subscription.pk,
+                    subscription.failures,
+                )
+            subscription.save()
+            break
+
+        delivered += len(changes)
+        subscription.last_sequence = changes[-1].sequence
+        subscription.last_delivery = timezone.now()
+        subscription.failures = 0
+        subscription.next_attempt = None
+        subscription.last_error = ""
+        subscription.save()
+
+    return delivered
+
+
+def deliver_all():
+    """Deliver pending changes of all subscriptions which are due
+
+    Subscriptions being delivered by another worker are skipped.
+
+    returns:
+        int: number of events delivered
+    """
+
+    from panels.models import PanelChange
+
+    # changes of processes which stopped before numbering them
+    PanelChange.objects.assign_sequences()
+
+    delivered = 0
+    for pk in WebhookSubscription.objects.due(timezone.now()).values_list(
+        "pk", flat=True
+    ):
+        with transaction.atomic():
+            subscription = (
+                WebhookSubscription.objects.due(timezone.now())
+                .select_for_update(skip_locked=True)
+                .filter(pk=pk)
+                .first()
+            )
+            if subscription:
+                delivered += deliver(subscription)
+    return delivered
@@ -32,6 +32,8 @@ from panels.tests.factories import STRFactory
 from panels.tests.factories import RegionFactory
 from panels.tests.factories import PanelTypeFactory
 from webservices.utils import convert_mop
+from webservices.utils import convert_moi
+from webservices.views import filter_entity_list
 
 
 class TestWebservices(TransactionTestCase):
@@ -138,6 +140,24 @@ class TestWebservices(TransactionTestCase):
         )
         self.assertEqual(r.status_code, 200)
 
+    def test_get_panel_old_name(self):
+        self.gpes.panel.old_panels = ["Some relevant disorder"]
+        self.gpes.panel.save()
+
+        r = self.client.get(
+            reverse_lazy("webservices:get_panel", args=("relevant disorder",))
+        )
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(
+            r.json()["result"]["SpecificDiseaseName"], self.gpes.panel.panel.name
+        )
+
+    def test_get_panel_disease_group_not_matched(self):
+        level2title = self.gpes.panel.level4title.level2title
+        r = self.client.get(reverse_lazy("webservices:get_panel", args=(level2title,)))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json(), ["Query Error: {} not found.".format(level2title)])
+
     def test_get_panel_name_deleted(self):
         r = self.client.get(
             reverse_lazy(
@@ -221,6 +241,35 @@ class TestWebservices(TransactionTestCase):
         api_time_detail = datetime.fromisoformat(r["result"]["Created"].replace("Z", "+00:00"))
         self.assertEqual(api_time_detail, expected_time)
 
+    def test_get_panel_confidence_filter(self):
+        self.gps.genepanelentrysnapshot_set.update(saved_gel_status=1)
+        self.gps.genepanelentrysnapshot_set.filter(pk=self.genes[0].pk).update(
+            saved_gel_status=3
+        )
+
+        url = reverse_lazy("webservices:get_panel", args=(self.gps.panel.pk,))
+        r = self.client.get("{}?LevelOfConfidence=HighEvidence".format(url))
+        self.assertEqual(r.status_code, 200)
+        genes = r.json()["result"]["Genes"]
+        self.assertEqual(
+            [g["GeneSymbol"] for g in genes], [self.genes[0].gene_core.gene_symbol]
+        )
+
+    def test_filter_entity_list_in_db(self):
+        genes = self.gps.get_all_genes_extra
+        gene = self.genes[0]
+        for filters in [
+            {"moi": [convert_moi(gene.moi)]},
+            {"mop": [convert_mop(gene.mode_of_pathogenicity)]},
+            {"penetrance": ["Complete"]},
+            {"conf_level": ["HighEvidence", "NoList"]},
+            {"evidence": [gene.evidence.first().name]},
+        ]:
+            self.assertEqual(
+                sorted(e.pk for e in filter_entity_list(genes, **filters)),
+                sorted(e.pk for e in filter_entity_list(list(genes), **filters)),
+            )
+
     def test_get_search_gene(self):
         url = reverse_lazy(
             "webservices:search_genes", args=(self.gpes.gene_core.gene_symbol,)
@@ -21,6 +21,9 @@
 ## specific language governing permissions and limitations
 ## under the License.
 ##
+from django.db.models import Q
+
+
 def convert_moi(moi, back=False):
     short_terms = {
         "MONOALLELIC, autosomal or pseudoautosomal, NOT imprinted": "monoallelic_not_imprinted",
@@ -137,3 +140,65 @@ def make_null(value):
 
 def filter_empty(value):
     return bool(value)
+
+
+CONFIDENCE_LEVEL_FILTERS = {
+    "HighEvidence": Q(saved_gel_status__gt=2),
+    "ModerateEvidence": Q(saved_gel_status=2),
+    "LowEvidence": Q(saved_gel_status=1) | Q(saved_gel_status__lt=0),
+    "NoList": Q(saved_gel_status=0),
+}
+
+
+def stored_values(values, convert):
+    """Values stored in the database which `convert` maps to one of the `values`"""
+
+    candidates = set(values) | {convert(value, back=True) for value in values}
+    return [candidate for candidate in candidates if convert(candidate) in values]
+
+
+def entity_list_filters(
+    model,
+    moi=None,
+    mop=None,
+    penetrance=None,
+    conf_level=None,
+    evidence=None,
+    haploinsufficiency_score=None,
+    triplosensitivity_score=None,
+):
+    """Translate WebServices filters into a Q object for the entity model
+
+    Entities with empty MOI, MOP or penetrance aren't filtered out by these values.
+    """
+
+    from panels.models import Region
+
+    filters = Q()
+
+    if moi is not None:
+        filters &= Q(moi__isnull=True) | Q(moi__in=stored_values(moi, convert_moi))
+    if mop is not None:
+        filters &= Q(mode_of_pathogenicity__isnull=True) | Q(
+            mode_of_pathogenicity__in=stored_values(mop, convert_mop)
+        )
+    if penetrance is not None:
+        filters &= Q(penetrance__isnull=True) | Q(penetrance__in=penetrance)
+    if conf_level is not None:
+        conf_filters = Q(pk__in=[])
+        for level in conf_level:
+            if level in CONFIDENCE_LEVEL_FILTERS:
+                conf_filters |= CONFIDENCE_LEVEL_FILTERS[level]
+        filters &= conf_filters
+    if evidence is not None:
+        filters &= Q(
+            pk__in=model.objects.filter(evidence__name__in=evidence).values("pk")
+        )
+
+    if model is Region:
+        if haploinsufficiency_score:
+            filters &= Q(haploinsufficiency_score__in=haploinsufficiency_score)
+        if triplosensitivity_score:
+            filters &= Q(triplosensitivity_score__in=triplosensitivity_score)
+
+    return filters
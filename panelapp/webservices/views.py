@@ -24,17 +24,20 @@
 from django.conf import settings
 from django.db import DatabaseError
 from django.db.models import Q
+from django.db.models import QuerySet
 from django.utils.functional import cached_property
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import permissions
 from rest_framework import pagination
 from rest_framework import generics
+from panelapp.db_routers import replica_view
 from .utils import convert_moi
 from .utils import convert_mop
 from .utils import convert_evidences
 from .utils import convert_gel_status
 from .utils import convert_confidence_level
+from .utils import entity_list_filters
 
 from panels.models import GenePanel
 from panels.models import GenePanelSnapshot
@@ -42,6 +45,7 @@ from panels.models import GenePanelEntrySnapshot
 from panels.models import STR
 from panels.models import Region
 from panels.models import HistoricalSnapshot
+from panels.search import ArrayToString
 from .serializers import PanelSerializer
 from .serializers import GenesSerializer
 from .serializers import EntitySerializer
@@ -58,6 +62,21 @@ def filter_entity_list(
     haploinsufficiency_score=None,
     triplosensitivity_score=None,
 ):
+    if isinstance(entity_list, QuerySet):
+        return entity_list.filter(
+            entity_list_filters(
+                entity_list.model,
+                moi=moi,
+                mop=mop,
+                penetrance=penetrance,
+                conf_level=conf_level,
+                evidence=evidence,
+                haploinsufficiency_score=haploinsufficiency_score,
+                triplosensitivity_score=triplosensitivity_score,
+            )
+        )
+
+    # super panels entities are already loaded as a list
     final_list = []
     for entity in entity_list:
         filters = True
@@ -80,7 +99,7 @@ def filter_entity_list(
         ):
             filters = False
         if evidence is not None and not set(
-            [ev.name for ev in entity.evidence.all]
+            [ev.name for ev in entity.evidence.all()]
         ).intersection(set(evidence)):
             filters = False
 
@@ -101,6 +120,7 @@ def filter_entity_list(
     return final_list
 
 
+@replica_view
 @api_view(["GET"])
 @permission_classes((permissions.AllowAny,))
 def get_panel(request, panel_name):
@@ -170,27 +190,24 @@ def get_panel(request, panel_name):
         if not queryset_name_exact:
             queryset_name = queryset.filter(panel__name__icontains=panel_name)
             if not queryset_name:
-                queryset_old_names = queryset_name.filter(
-                    old_panels__icontains=panel_name
-                )
-                if not queryset_old_names:
+                # relevant disorders, same expression as the trigram index
+                queryset_name = queryset.annotate(
+                    old_panels_text=ArrayToString("old_panels")
+                ).filter(old_panels_text__icontains=panel_name)
+            if not queryset_name:
+                try:
                     try:
-                        try:
-                            int(panel_name)
-                            queryset_pk = queryset.filter(panel__pk=panel_name)
-                        except ValueError:
-                            queryset_pk = queryset.filter(panel__old_pk=panel_name)
-
-                        if not queryset_pk:
-                            return Response(
-                                {"Query Error: " + panel_name + " not found."}
-                            )
-                        else:
-                            queryset = queryset_pk
-                    except (DatabaseError, ValueError) as e:
+                        int(panel_name)
+                        queryset_pk = queryset.filter(panel__pk=panel_name)
+                    except ValueError:
+                        queryset_pk = queryset.filter(panel__old_pk=panel_name)
+
+                    if not queryset_pk:
                         return Response({"Query Error: " + panel_name + " not found."})
-                else:
-                    queryset = queryset_old_names
+                    else:
+                        queryset = queryset_pk
+                except (DatabaseError, ValueError) as e:
+                    return Response({"Query Error: " + panel_name + " not found."})
             else:
                 queryset = queryset_name
         else:
@@ -208,6 +225,7 @@ def get_panel(request, panel_name):
     return Response(serializer.data)
 
 
+@replica_view
 @api_view(["GET"])
 @permission_classes((permissions.AllowAny,))
 def list_panels(request):
@@ -232,6 +250,7 @@ def list_panels(request):
     return Response(serializer.data)
 
 
+@replica_view
 @api_view(["GET"])
 @permission_classes((permissions.AllowAny,))
 def search_by_gene(request, gene):
@@ -244,9 +263,9 @@ def search_by_gene(request, gene):
     if gene != "all":
         for g in gene.split(","):
             if not genes_qs:
-                genes_qs = Q(gene__gene_symbol=g)
+                genes_qs = Q(gene_core__gene_symbol=g)
             else:
-                genes_qs = genes_qs | Q(gene__gene_symbol=g)
+                genes_qs = genes_qs | Q(gene_core__gene_symbol=g)
 
     if "ModeOfInheritance" in request.GET:
         filters["moi__in"] = [
@@ -311,6 +330,7 @@ class EntitiesPagination(pagination.PageNumberPagination):
 class EntitiesListView(generics.ListAPIView):
     serializer_class = EntitySerializer
     pagination_class = EntitiesPagination
+    use_replica = True
 
     @cached_property
     def snapshot_ids(self):
@@ -41,7 +41,10 @@ setup(
             "faker==0.8.15",
             "factory_boy==2.11.1",
             "pytest-cov==2.5.1",
+            "orjson==3.8.0",
         ],
+        # installed in the production images, the API falls back to DRF JSON without it
+        "fast-json": ["orjson==3.8.0"],
     },
     install_requires=[
         "django==2.1.10",